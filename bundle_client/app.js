@@ -0,0 +1,182 @@
+// Eva's Theorie - offline versie (gegenereerd door eva_bundle.py)
+// Oefenen, Foutenbak en examen zonder server; voortgang in localStorage.
+"use strict";
+
+const STORE_KEY = "eva-progress";
+const DAY_MS = 24 * 3600 * 1000;
+const app = document.getElementById("app");
+let DATA = null;
+let byId = {};
+let state = null;
+let player = new Audio();
+
+// --- VOORTGANG ---
+
+function loadProgress() {
+  let saved;
+  try { saved = Object.assign({ score: 0, streak: 0, mistakes: {}, exams: [] }, JSON.parse(localStorage.getItem(STORE_KEY) || "{}")); }
+  catch (e) { return { score: 0, streak: 0, mistakes: {}, exams: [] }; }
+  // Oude voortgang: qid -> aantal keer goed, zonder moment; meteen weer aan de beurt
+  for (const [qid, m] of Object.entries(saved.mistakes)) if (typeof m === "number") saved.mistakes[qid] = { streak: m, due: 0 };
+  return saved;
+}
+let progress = loadProgress();
+function saveProgress() { localStorage.setItem(STORE_KEY, JSON.stringify(progress)); }
+
+function recordAnswer(qid, correct) {
+  // mistakes: qid -> {streak, due}; net als de app na GRADUATE_STREAK keer goed eruit, tot dan volgens review_days
+  const m = progress.mistakes[qid];
+  if (correct) {
+    progress.score += 1; progress.streak += 1;
+    if (m && ++m.streak >= DATA.graduate_streak) delete progress.mistakes[qid];
+    else if (m) m.due = Date.now() + DATA.review_days[Math.min(m.streak, DATA.review_days.length) - 1] * DAY_MS;
+  } else {
+    progress.streak = 0;
+    progress.mistakes[qid] = { streak: 0, due: Date.now() };
+  }
+  saveProgress();
+}
+
+function dueMistakes() {
+  // Zoals srs.due_mistakes in de app: alles wat aan de beurt is, vroegste eerst, zonder limiet
+  const now = Date.now();
+  return Object.entries(progress.mistakes).filter(([id, m]) => id in byId && m.due <= now)
+    .sort((a, b) => a[1].due - b[1].due).map(([id]) => id);
+}
+
+// --- AUDIO ---
+
+function playSequence(entries, onDone) {
+  // Stukken achter elkaar, net als de geplakte feedbackclip in de app
+  const clips = entries.filter((e) => e && e.src);
+  player.pause();
+  const next = () => {
+    const clip = clips.shift();
+    if (!clip) { if (onDone) onDone(); return; }
+    player = new Audio(clip.src);
+    player.onended = next;
+    player.onerror = next;
+    player.play().catch(next);
+  };
+  next();
+}
+
+function pick(list) { return list[Math.floor(Math.random() * list.length)]; }
+function shuffle(list) {
+  for (let i = list.length - 1; i > 0; i--) { const j = Math.floor(Math.random() * (i + 1)); [list[i], list[j]] = [list[j], list[i]]; }
+  return list;
+}
+function esc(text) { const d = document.createElement("div"); d.textContent = text == null ? "" : String(text); return d.innerHTML; }
+
+// --- SCHERMEN ---
+
+function dashboard() {
+  player.pause();
+  const open = dueMistakes().length;
+  const wins = progress.exams.filter((e) => e.passed).length;
+  app.innerHTML = `
+    <div class="card"><h2>Eva's Theorie</h2>
+      <p>⭐ ${progress.score} punten · 🔥 ${progress.streak} op rij · 🏆 ${wins} examens gehaald</p>
+      <p class="muted">${DATA.questions.length} vragen offline · export ${esc(DATA.generated)}</p></div>
+    <label class="muted">Hoeveel vragen wil je oefenen?
+      <select id="limit">${["5", "10", "20", "Alles"].map((v) => `<option>${v}</option>`).join("")}</select></label>
+    <button class="primary" id="practice">Start Oefenen</button>
+    <button id="mistakes">Foutenbak Herkans (${open})</button>
+    <button id="exam">Examen Simulatie</button>`;
+  const limit = () => { const v = document.getElementById("limit").value; return v === "Alles" ? Infinity : +v; };
+  document.getElementById("practice").onclick = () => startSession("practice", shuffle(DATA.questions.map((q) => q.id)).slice(0, limit()));
+  // De sessiegrootte geldt alleen voor oefenen; de Foutenbak neemt alle openstaande fouten, net als de app
+  document.getElementById("mistakes").onclick = () => startSession("mistakes", dueMistakes());
+  document.getElementById("exam").onclick = () => startSession("exam", drawExam());
+}
+
+function drawExam() {
+  // Zelfde quota als de app (effective_quotas is al bij de export uitgerekend)
+  const ids = [];
+  for (const [cat, n] of Object.entries(DATA.exam.quotas)) {
+    ids.push(...shuffle(DATA.questions.filter((q) => q.category === cat).map((q) => q.id)).slice(0, n));
+  }
+  return shuffle(ids);
+}
+
+function startSession(mode, ids) {
+  if (!ids.length) { app.innerHTML = `<div class="card"><p>${mode === "mistakes" ? "Foutenbak leeg! 🎉" : "Geen vragen gevonden!"}</p></div><button id="home">Terug</button>`; document.getElementById("home").onclick = dashboard; return; }
+  state = { mode, ids, index: 0, score: 0, answers: [] };
+  showQuestion();
+}
+
+function showQuestion() {
+  const q = byId[state.ids[state.index]];
+  const exam = state.mode === "exam";
+  app.innerHTML = `
+    <p class="muted">${exam ? "Examen" : state.mode === "mistakes" ? "Foutenbak" : "Oefenen"} · vraag ${state.index + 1} van ${state.ids.length}</p>
+    <div class="card">${q.image ? `<img src="${q.image}" alt="">` : ""}<p><b>${esc(q.question)}</b></p></div>
+    <div class="timer-container"><div class="timer-bar" id="timer"></div></div>
+    <div id="options">${q.options.map((o, i) => `<button data-i="${i}">${esc(o)}</button>`).join("")}</div>
+    <div id="feedback"></div>
+    <button id="home">🏠</button>`;
+  document.getElementById("home").onclick = dashboard;
+  state.started = null;
+  state.answered = false;
+  // Denktijd start pas als de vraag is voorgelezen
+  const startTimer = () => {
+    if (state.started !== null) return;
+    state.started = performance.now();
+    document.getElementById("timer").style.animation = `countdown ${q.timer}s linear forwards`;
+  };
+  playSequence([q.audio.question], startTimer);
+  if (!q.audio.question) startTimer();
+  document.querySelectorAll("#options button").forEach((b) => { b.onclick = () => answer(q, q.options[+b.dataset.i], b); });
+}
+
+function answer(q, option, button) {
+  if (state.answered) return;
+  state.answered = true;
+  const late = state.started === null ? false : (performance.now() - state.started) / 1000 > q.timer;
+  const correct = option === q.answer && !late;
+  document.getElementById("timer").style.animationPlayState = "paused";
+  recordAnswer(String(q.id), correct);
+  if (correct) state.score += 1;
+  state.answers.push({ id: q.id, correct });
+
+  const last = state.index + 1 >= state.ids.length;
+  const next = () => { state.index += 1; if (last) finish(); else showQuestion(); };
+  if (state.mode === "exam") { next(); return; }
+
+  document.querySelectorAll("#options button").forEach((b) => {
+    const o = q.options[+b.dataset.i];
+    if (o === q.answer) b.className = "right"; else if (b === button) b.className = "wrong";
+    b.disabled = true;
+  });
+  const fb = DATA.feedback;
+  const segments = late ? [fb.too_late] : correct ? [pick(fb.correct)] : [pick(fb.wrong), fb.wrong_suffix];
+  document.getElementById("feedback").innerHTML = `
+    <div class="card"><p><b>${esc(segments[0].text)}</b></p><p>${esc(q.explanation)}</p></div>
+    <button class="primary" id="next">${last ? "Afronden" : "Volgende ➡️"}</button>`;
+  playSequence([...segments.map((s) => s.audio), q.audio.explanation]);
+  document.getElementById("next").onclick = next;
+}
+
+function finish() {
+  player.pause();
+  const total = state.ids.length;
+  let verdict = "";
+  if (state.mode === "exam") {
+    const passed = state.score >= DATA.exam.pass_score;
+    progress.exams.push({ ts: Date.now(), score: state.score, total, passed });
+    saveProgress();
+    verdict = passed ? "🎉 GESLAAGD!" : `Helaas, je had er ${DATA.exam.pass_score} nodig.`;
+  }
+  app.innerHTML = `<div class="card"><h2>${state.score} / ${total}</h2><p>${verdict}</p></div><button class="primary" id="home">🏠 Terug</button>`;
+  document.getElementById("home").onclick = dashboard;
+}
+
+// --- START ---
+
+if ("serviceWorker" in navigator) navigator.serviceWorker.register("sw.js").catch(() => null);
+
+fetch("data.json").then((r) => r.json()).then((data) => {
+  DATA = data;
+  DATA.questions.forEach((q) => { byId[q.id] = q; });
+  dashboard();
+}).catch(() => { app.innerHTML = "<p>Kon de vragen niet laden. Open de bundel via een webserver (python -m http.server).</p>"; });
@@ -0,0 +1,44 @@
+// Eva's Theorie - service worker (gegenereerd door eva_bundle.py)
+// Cache-first: na de eerste keer openen komt alles uit de cache, ook zonder netwerk.
+const CACHE = "__VERSION__";
+const PRECACHE = __PRECACHE__;
+
+self.addEventListener("install", (event) => {
+  // Per bestand, zodat één ontbrekend bestand niet de hele installatie breekt
+  event.waitUntil(caches.open(CACHE).then((cache) =>
+    Promise.all(PRECACHE.map((url) => cache.add(url).catch(() => null)))
+  ).then(() => self.skipWaiting()));
+});
+
+self.addEventListener("activate", (event) => {
+  // Oude exports opruimen
+  event.waitUntil(caches.keys().then((keys) =>
+    Promise.all(keys.filter((k) => k.startsWith("eva-") && k !== CACHE).map((k) => caches.delete(k)))
+  ).then(() => self.clients.claim()));
+});
+
+// Safari speelt <audio> alleen met 206-antwoorden; uit de cache zelf knippen
+function rangeResponse(request, response) {
+  const m = /bytes=(\d*)-(\d*)/.exec(request.headers.get("range") || "");
+  if (!m) return response;
+  return response.arrayBuffer().then((buf) => {
+    const start = m[1] ? +m[1] : Math.max(0, buf.byteLength - +m[2]);
+    const end = m[1] && m[2] ? Math.min(+m[2], buf.byteLength - 1) : buf.byteLength - 1;
+    return new Response(buf.slice(start, end + 1), { status: 206, headers: {
+      "Content-Type": response.headers.get("Content-Type") || "audio/mpeg",
+      "Content-Range": `bytes ${start}-${end}/${buf.byteLength}`,
+      "Content-Length": String(end - start + 1),
+      "Accept-Ranges": "bytes" } });
+  });
+}
+
+self.addEventListener("fetch", (event) => {
+  if (event.request.method !== "GET") return;
+  event.respondWith(caches.match(event.request, { ignoreSearch: true, ignoreVary: true }).then((hit) => hit ? rangeResponse(event.request, hit) : fetch(event.request).then((response) => {
+    if (response.status === 200 && new URL(event.request.url).origin === self.location.origin) {
+      const copy = response.clone();
+      caches.open(CACHE).then((cache) => cache.put(event.request, copy));
+    }
+    return response;
+  })));
+});
@@ -14,22 +14,27 @@ Start via terminal: streamlit run eva_app.py
 """
 
 import streamlit as st
-import pandas as pd
 import random
 import time
 import os
-import json
-import tempfile
-import re
+import string
+import hashlib
 import urllib.parse
+import urllib.request
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-# --- LIBRARY SETUP ---
-try:
-    from gtts import gTTS
-    TTS_AVAILABLE = True
-except ImportError:
-    TTS_AVAILABLE = False
+from eva_audio import AudioStore, AudioPublisher, Prefetcher, split_sentences, concat_mp3, MixedSampleRates
+from eva_data import ExamPool, BankWatcher, EXAM_SIZE, EXAM_PASS_SCORE, EXAM_QUOTAS
+from eva_progress import ProgressJournal, apply_event, ratio, hardest_questions, histogram_percentile, RT_BUCKETS, SKEW_BUCKETS
+from eva_images import image_path, image_url, pollinations_url, drop_image, DEFAULT_PROMPT
+import eva_metrics
+from eva_metrics import span, timed
+from eva_tts import TTSChain
+from eva_reaction import reaction_timer, choose_reaction_time, state_key
+from eva_speech import FEEDBACK_TOO_LATE, FEEDBACK_CORRECT, FEEDBACK_WRONG, FEEDBACK_WRONG_SUFFIX, FEEDBACK_VOCABULARY
 
 # ----------------------------------------------------------------------
 # 1️⃣ CONFIGURATIE
@@ -44,8 +49,28 @@ st.set_page_config(
 
 # --- CONSTANTEN ---
 HISTORY_FILE = "progress.json"
+QUESTIONS_FILE = "vragen.csv"
+QUESTIONS_CACHE_FILE = "vragen.arrow"  # gecompileerde, memory-mapped versie van QUESTIONS_FILE
 APP_VERSION = "V70 (Random Buttons)"
-EXAM_PASS_SCORE = 18
+# Examenregels (EXAM_SIZE, EXAM_PASS_SCORE, EXAM_QUOTAS) staan in eva_data, gedeeld met eva_bundle
+
+# Stemmen op volgorde van voorkeur; de volgende neemt het over als de vorige faalt
+TTS_BACKENDS = os.environ.get("EVA_TTS_BACKENDS", "gtts,espeak").split(",")
+TTS_TIMEOUT = float(os.environ.get("EVA_TTS_TIMEOUT", "8"))  # sec per call, daarna de volgende stem
+TTS_BREAKER_FAILURES = 3
+TTS_BREAKER_COOLDOWN = 60
+TTS_LANG = "nl"
+# Audio cache op schijf (overleeft herstarts en deploys)
+AUDIO_CACHE_DIR = os.environ.get("EVA_AUDIO_CACHE_DIR", ".audio_cache")
+AUDIO_CACHE_MAX_MB = int(os.environ.get("EVA_AUDIO_CACHE_MB", "200"))
+# Afspeelbare kopieën onder static/audio (naam = hash van de bytes), als URL naar de browser
+STATIC_AUDIO_MAX_MB = int(os.environ.get("EVA_STATIC_AUDIO_MB", "200"))
+STATIC_AUDIO_MIN_AGE = 15 * 60  # sec; zo lang kan een open pagina een uitgedeelde URL nog laden
+STATIC_AUDIO_URL = "app/static/audio"
+PREFETCH_WORKERS = 2
+PREFETCH_MAX_PENDING = 8
+TTS_WORKERS = 4
+AUDIO_START_MARGIN = 0.5  # sec: laden + autoplay voordat de audio echt speelt
 
 REWARD_GIFS = [
     "https://media.giphy.com/media/l0MYt5jPR6QX5pnqM/giphy.gif", 
@@ -60,94 +85,334 @@ REWARD_GIFS = [
 # 2️⃣ TEKST & TIMING LOGICA
 # ----------------------------------------------------------------------
 
-def clean_text_for_speech(text):
-    if not text: return ""
-    clean = re.sub(r'[\*\_#`]', '', text)
-    clean = clean.replace(';', ',').replace(':', ',')
-    clean = clean.replace("km/u", "kilometer per uur")
-    clean = clean.replace("/", " of ")
-    clean = re.sub(r'\bA\b', 'optie A', clean)
-    clean = re.sub(r'\bB\b', 'optie B', clean)
-    clean = re.sub(r'\bC\b', 'optie C', clean)
-    return clean.strip()
-
 def estimate_speech_duration(text):
     """
-    Schatting: 0.45 sec per woord + buffer.
+    Schatting: 0.45 sec per woord + buffer. Alleen nog als de audio er niet is.
     """
     if not text: return 0
     words = len(text.split())
     duration = (words * 0.45) + 1.5 
     return round(duration, 1)
 
+# Feedbackteksten (FEEDBACK_*) staan in eva_speech, gedeeld met eva_bundle
+
 def get_dad_feedback(is_correct, explanation, is_too_late=False):
-    explanation = clean_text_for_speech(explanation)
-    
+    """
+    Feedback als losse stukken (intro, eventueel "fout", uitleg). Elk stuk heeft
+    zijn eigen audio in de cache, dus er is geen clip per intro×uitleg meer.
+    explanation = de voorleesversie (row['speech_explanation']).
+    """
     if is_too_late:
-        return f"Te laat! Je moet sneller beslissen Eef. De tijd ging in ná de vraag. {explanation}"
+        return [FEEDBACK_TOO_LATE, explanation]
 
     if is_correct:
-        intros = ["Kijk, dat is mijn dochter! Goed.", "Lekker bezig Eef!", "Hoppa! In the pocket.", "Zie je wel dat je het kan? 😉", "De poesjes zijn trots!", "Gas erop Eef, dit is goed!", "Keurig."]
-        return f"{random.choice(intros)} {explanation}"
+        return [random.choice(FEEDBACK_CORRECT), explanation]
     else:
-        intros = ["Kom op frikandel, even dat koppie erbij!", "Hé Truus, zat je te slapen?", "Serieus Eef? Zelfs de poesjes wisten deze.", "Nee joh, dat meen je niet.", "Ai ai ai... dat gaat geld kosten.", "Je rijdt nu als een dweil, Eef. Focus!", "Niet gokken Truus, nadenken!", "Fout! Opletten jij."]
-        return f"{random.choice(intros)} Het antwoord was fout. {explanation}"
+        return [random.choice(FEEDBACK_WRONG), FEEDBACK_WRONG_SUFFIX, explanation]
 
 def make_question_audio(row):
-    q = clean_text_for_speech(row['question'])
-    if "u " in q.lower(): q = q.replace("u ", "je ").replace("U ", "je ")
-    opt1 = clean_text_for_speech(str(row['opt1']))
-    opt2 = clean_text_for_speech(str(row['opt2']))
-    opt3 = clean_text_for_speech(str(row['opt3'])) if str(row['opt3']).lower() != 'nan' else ""
-    return f"Vraag: {q}. Is het: {opt1}? {opt2}? {opt3}"
+    # Voorgerekend bij het laden van de bank (eva_speech), hier alleen opzoeken
+    return row['speech_question']
 
 # ----------------------------------------------------------------------
 # 3️⃣ AUDIO ENGINE
 # ----------------------------------------------------------------------
 
-@st.cache_data
+@st.cache_resource
+def get_tts():
+    # Per proces, zodat de circuit breakers reruns en sessies overleven
+    return TTSChain.from_names(TTS_BACKENDS, timeout=TTS_TIMEOUT, failures=TTS_BREAKER_FAILURES, cooldown=TTS_BREAKER_COOLDOWN)
+
+TTS_AVAILABLE = get_tts().available
+TTS_ENGINE = get_tts().primary  # naamruimte van de audiocache
+
+@st.cache_resource
+def get_bank_watcher():
+    # Eén keer per proces: bank laden en vragen.csv in de gaten houden (hot reload)
+    store = get_audio_store()
+    return BankWatcher(QUESTIONS_FILE, QUESTIONS_CACHE_FILE,
+                       on_change=lambda diff, old, new: invalidate_changed_media(store, diff, old, new))
+
+@timed("load_data")
 def load_data():
-    if not os.path.exists('vragen.csv'): return pd.DataFrame()
-    try:
-        df = pd.read_csv('vragen.csv', sep=';', dtype=str)
-        df.columns = [c.strip().lower() for c in df.columns]
-        return df
-    except: return pd.DataFrame()
+    return get_bank_watcher().bank
 
-@st.cache_data(show_spinner=False)
+def invalidate_changed_media(store, diff, old, new):
+    """
+    Na een wijziging in vragen.csv: alleen audio en plaatjes weggooien waarvan
+    de brontekst echt anders is. Draait in de watcher-thread, dus geen st.* hier.
+    Alleen de hele clips: losse zinnen zijn op hun eigen tekst gesleuteld, kunnen
+    door andere vragen gedeeld worden en verlopen anders vanzelf via de LRU.
+    """
+    engines = [name.strip() for name in TTS_BACKENDS if name.strip()]
+    for qid in diff.changed | diff.removed:
+        before, after = old.get(qid), new.get(qid)
+        texts = set()
+        if after is None or make_question_audio(before) != make_question_audio(after):
+            texts.add(make_question_audio(before))
+        if after is None or before['speech_explanation'] != after['speech_explanation']:
+            texts.add(before['speech_explanation'])
+        for text in texts:
+            for engine in engines: store.delete(store.make_key(text, TTS_LANG, engine))
+        if after is None or before.get('image_desc') != after.get('image_desc'):
+            drop_image(qid)
+
+def sync_session_with_bank():
+    """
+    Lopende sessie repareren als er sinds de vorige rerun vragen uit de bank
+    verdwenen zijn: oefenlijst en examen. Het herhaalschema en de statistieken
+    blijven staan (er wordt niets definitief gewist); vragen die er niet meer
+    zijn worden bij het kiezen overgeslagen en komen terug als de bank ze weer heeft.
+    """
+    watcher = get_bank_watcher()
+    seen = st.session_state.bank_version
+    st.session_state.bank_version = watcher.version
+    if seen is None or seen == watcher.version: return
+    removed = watcher.removed_since(seen)
+    if removed is None:
+        # Verder achter dan de bewaarde diffs: alles wat de sessie kent tegen de bank houden
+        est = st.session_state.exam_state
+        known = set(st.session_state.practice_ids) | set(est['ids'] if est else ())
+        removed = {qid for qid in known if qid not in watcher.bank}
+    if not removed: return
+
+    ids = st.session_state.practice_ids
+    if any(qid in removed for qid in ids):
+        idx = st.session_state.current_index
+        if idx < len(ids) and ids[idx] in removed:
+            st.session_state.answered_question = False
+            st.session_state.question_start_time = 0
+        st.session_state.current_index = idx - sum(1 for qid in ids[:idx] if qid in removed)
+        st.session_state.practice_ids = [qid for qid in ids if qid not in removed]
+
+    est = st.session_state.exam_state
+    if est and any(qid in removed for qid in est['ids']):
+        if est['idx'] < len(est['ids']) and est['ids'][est['idx']] in removed:
+            st.session_state.question_start_time = 0
+        est['idx'] -= sum(1 for qid in est['ids'][:est['idx']] if qid in removed)
+        est['ids'] = [qid for qid in est['ids'] if qid not in removed]
+        for qid in removed:
+            est['answers'].pop(qid, None); est.get('details', {}).pop(qid, None)
+
+@st.cache_resource
+def get_audio_store():
+    return AudioStore(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB * 1024 * 1024)
+
+@st.cache_resource
+def get_audio_publisher():
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "audio")
+    return AudioPublisher(AudioStore(folder, STATIC_AUDIO_MAX_MB * 1024 * 1024, min_age=STATIC_AUDIO_MIN_AGE), STATIC_AUDIO_URL)
+
+@st.cache_resource
+def get_prefetcher():
+    return Prefetcher(PREFETCH_WORKERS, PREFETCH_MAX_PENDING)
+
+@st.cache_resource
+def get_tts_pool():
+    return ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="eva-tts")
+
+@timed("generate_audio_bytes")
 def generate_audio_bytes(text):
     if not TTS_AVAILABLE: return None
     if not text: return None
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as f:
-        output_file = f.name
-    
+    return synthesize_audio(get_audio_store(), text, get_tts_pool(), get_tts())
+
+@timed("generate_feedback_audio")
+def generate_feedback_audio(segments):
+    """
+    Feedbackclip uit losse, apart gecachete stukken, op MP3-frameniveau aan
+    elkaar geplakt. Een mislukt stuk valt weg; de rest speelt gewoon.
+    """
+    if not TTS_AVAILABLE: return None
+    store, pool, tts = get_audio_store(), get_tts_pool(), get_tts()
+    segments = [text for text in segments if text]
+    try:
+        return concat_mp3([synthesize_audio(store, text, pool, tts) for text in segments]) or None
+    except MixedSampleRates:
+        # Stukken uit verschillende stemmen: dan de hele feedback in één stem
+        return synthesize_one_voice(store, " ".join(segments), tts)
+
+@st.cache_resource(show_spinner=False)
+def prebuild_feedback_audio():
+    # Eén keer per proces, op de achtergrond (eigen thread, niet in de TTS-pool:
+    # synthesize_audio zet zelf zinnen in die pool en wacht erop)
+    if not TTS_AVAILABLE: return None
+    store, pool, tts = get_audio_store(), get_tts_pool(), get_tts()
+    def build():
+        for text in FEEDBACK_VOCABULARY: synthesize_audio(store, text, pool, tts)
+    worker = threading.Thread(target=build, name="eva-feedback-prebuild", daemon=True)
+    worker.start()
+    return worker
+
+def audio_source_key(*texts):
+    # Alleen clips die compleet in de voorkeursstem in de cache staan krijgen een vaste URL;
+    # fallback-audio wordt elke keer opnieuw bekeken, zodat de echte stem hem later vervangt
+    if not TTS_AVAILABLE: return None
+    store = get_audio_store()
+    keys = tuple(store.make_key(t, TTS_LANG, TTS_ENGINE) for t in texts if t)
+    return keys if keys and all(k in store for k in keys) else None
+
+def play_audio(source_key, load, autoplay=True):
+    """
+    Met static serving gaat alleen een URL naar de browser: die cachet de clip,
+    doet range-requests en deelt hem tussen sessies. Zonder (of als static/
+    niet schrijfbaar is) de bytes via st.audio, zoals vroeger.
+    """
+    loaded = []
+    def load_once():
+        if not loaded: loaded.append(load())
+        return loaded[0]
+
+    url = None
+    if static_serving_enabled():
+        publisher = get_audio_publisher()
+        try:
+            with span("publish_audio"):
+                url = publisher.url_for(source_key, load_once) if source_key else None
+                if url is None and load_once(): url = publisher.publish(load_once())
+        except OSError:
+            url = None
+    if url:
+        eva_metrics.count("eva_audio_served_total", mode="url")
+        st.markdown(AUDIO_TAG.format(url=url, autoplay=" autoplay" if autoplay else ""), unsafe_allow_html=True)
+        return True
+    data = load_once()
+    if not data: return False
+    eva_metrics.count("eva_audio_served_total", mode="inline")
+    st.audio(data, format='audio/mp3', start_time=0, autoplay=autoplay)
+    return True
+
+def get_speech_duration(text):
+    """
+    Echte speelduur uit de audiocache (gemeten uit de MP3-frames), anders de schatting.
+    """
+    if TTS_AVAILABLE and text:
+        store = get_audio_store()
+        measured = store.duration(store.make_key(text, TTS_LANG, TTS_ENGINE))
+        if measured: return round(measured + AUDIO_START_MARGIN, 1)
+    return estimate_speech_duration(text)
+
+# Geen st.* in de functies hieronder: ze draaien ook in de prefetch- en TTS-threads
+
+def get_chunk_audio(store, chunk, tts):
+    """
+    -> (audio, stem). Eerst de cache van de voorkeursstem, dan de keten
+    (die bij een fallback ook eerst de cache van die stem bekijkt).
+    """
+    data = store.get(store.make_key(chunk, TTS_LANG, tts.primary))
+    if data is not None:
+        eva_metrics.count("eva_tts_cache_total", result="hit", level="chunk")
+        return data, tts.primary
+    eva_metrics.count("eva_tts_cache_total", result="miss", level="chunk")
+    data, engine = tts.synthesize(chunk, TTS_LANG, cached=lambda name: store.get(store.make_key(chunk, TTS_LANG, name)))
+    if data is None:
+        eva_metrics.count("eva_tts_giveups_total")
+        return None, None
+    key = store.make_key(chunk, TTS_LANG, engine)
+    if key not in store: store.put(key, data)
+    return data, engine
+
+def synthesize_one_voice(store, text, tts):
+    # Hele tekst in één call, dus gegarandeerd één stem (en één samplerate)
+    data, engine = tts.synthesize(text, TTS_LANG, cached=lambda name: store.get(store.make_key(text, TTS_LANG, name)))
+    if data is None: return None
+    key = store.make_key(text, TTS_LANG, engine)
+    if key not in store: store.put(key, data)
+    return data
+
+def synthesize_audio(store, text, pool, tts):
+    """
+    Hele clip in één keer. Lange teksten worden per zin parallel gesynthetiseerd
+    en daarna geplakt: de wachttijd is die van de traagste zin in plaats van de
+    som. st.audio speelt pas af als de hele clip er is, dus gestreamd wordt er niet.
+    """
+    key = store.make_key(text, TTS_LANG, tts.primary)
+    data = store.get(key)
+    if data is not None:
+        eva_metrics.count("eva_tts_cache_total", result="hit", level="clip")
+        return data
+    eva_metrics.count("eva_tts_cache_total", result="miss", level="clip")
+
+    chunks = split_sentences(text)
+    if len(chunks) <= 1: return get_chunk_audio(store, text, tts)[0]
+    # Een mislukte zin kost alleen die zin, niet de hele clip
+    results = [fut.result() for fut in [pool.submit(get_chunk_audio, store, chunk, tts) for chunk in chunks]]
+    parts = [data for data, _ in results if data]
+    if not parts: return None
+    # Deels terugval naar een andere stem: niet mengen, de hele clip in één stem
+    if len({engine for data, engine in results if data}) > 1: return synthesize_one_voice(store, text, tts)
+    data = concat_mp3(parts)
+    # Alleen een complete clip in de voorkeursstem bewaren; fallback-audio wordt zo later vanzelf vervangen
+    if all(engine == tts.primary for _, engine in results): store.put(key, data)
+    return data or None
+
+@st.cache_resource(show_spinner=False)
+def static_serving_enabled():
+    try: return bool(st.get_option("server.enableStaticServing"))
+    except RuntimeError: return False
+
+def get_scenario_image_url(row):
+    # Lokaal voorgerenderd plaatje (python eva_images.py) heeft voorrang op de live generator
+    if static_serving_enabled() and os.path.exists(image_path(row['id'])):
+        return image_url(row['id'])
+    return pollinations_url(row.get('image_desc', DEFAULT_PROMPT))
+
+def is_local_image(url):
+    return url.startswith("app/static/")
+
+def warm_image(url):
+    # De generator rendert bij de eerste aanvraag; daarna komt het plaatje uit zijn cache
     try:
-        tts = gTTS(text=text, lang='nl')
-        tts.save(output_file)
-        if os.path.exists(output_file):
-            with open(output_file, "rb") as f: data = f.read()
-            os.remove(output_file)
-            return data
-    except:
-        if os.path.exists(output_file): os.remove(output_file)
-        return None
-    return None
+        with urllib.request.urlopen(url, timeout=30) as resp: resp.read()
+    except Exception as e:
+        eva_metrics.count("eva_image_warm_failures_total", error=type(e).__name__)
+
+def prefetch_question(row):
+    """
+    Zet audio + afbeelding van de volgende vraag klaar in de achtergrond.
+    """
+    pf = get_prefetcher()
+    owner = st.session_state.session_token
+    if TTS_AVAILABLE:
+        store = get_audio_store()
+        # Vraag én uitleg: de feedback na het antwoord is dan alleen nog plakken
+        for text in (make_question_audio(row), row['speech_explanation']):
+            if text: pf.submit(("audio", store.make_key(text, TTS_LANG, TTS_ENGINE)), owner, synthesize_audio, store, text, get_tts_pool(), get_tts())
+    img_url = get_scenario_image_url(row)
+    if is_local_image(img_url):
+        st.markdown(f'<link rel="preload" href="{img_url}" as="image">', unsafe_allow_html=True)
+    else:
+        pf.submit(("img", img_url), owner, warm_image, img_url)
+        st.markdown(f'<link rel="prefetch" href="{img_url}" as="image">', unsafe_allow_html=True)
+
+def claim_prefetched(row, question_text):
+    # Wacht op een lopende prefetch i.p.v. dezelfde tekst nog eens te synthetiseren
+    pf = get_prefetcher()
+    if TTS_AVAILABLE:
+        pf.claim(("audio", get_audio_store().make_key(question_text, TTS_LANG, TTS_ENGINE)))
+    img_url = get_scenario_image_url(row)
+    if not is_local_image(img_url): pf.claim(("img", img_url), timeout=0)
 
 # ----------------------------------------------------------------------
 # 4️⃣ OPSLAG & STATE
 # ----------------------------------------------------------------------
 
+@st.cache_resource
+def get_journal():
+    return ProgressJournal(HISTORY_FILE)
+
 def load_history():
-    default = {"total_score": 0, "mistakes_list": [], "exams_history": [], "streak": 0}
-    if os.path.exists(HISTORY_FILE):
-        try: return {**default, **json.load(open(HISTORY_FILE, 'r'))}
-        except: pass
-    return default
+    # Snapshot (progress.json) + journaal afspelen
+    return get_journal().load()
 
-def save_history(data):
-    try: json.dump(data, open(HISTORY_FILE, 'w'))
-    except: pass
+@timed("save_history")
+def save_history(data, event):
+    # Eén regel aan het journaal toevoegen (O(1), crash-veilig); data is al bijgewerkt via apply_event
+    try:
+        get_journal().append(event)
+    except OSError as e:
+        eva_metrics.count("eva_history_write_failures_total")
+        st.toast(f"⚠️ Voortgang niet opgeslagen: {e}")
 
 if 'user_data' not in st.session_state: st.session_state.user_data = load_history()
 if 'mode' not in st.session_state: st.session_state.mode = 'dashboard'
@@ -168,58 +433,144 @@ if 'current_session_score' not in st.session_state: st.session_state.current_ses
 if 'question_start_time' not in st.session_state: st.session_state.question_start_time = 0
 if 'audio_duration_cache' not in st.session_state: st.session_state.audio_duration_cache = 0
 if 'is_too_late' not in st.session_state: st.session_state.is_too_late = False
+if 'session_token' not in st.session_state: st.session_state.session_token = uuid.uuid4().hex
+if 'prefetch_mode' not in st.session_state: st.session_state.prefetch_mode = None
+if 'bank_version' not in st.session_state: st.session_state.bank_version = None
 
 # ----------------------------------------------------------------------
 # 5️⃣ UI & CSS (TIMER)
 # ----------------------------------------------------------------------
 
+THEMES = {
+    False: {"bg_color": "#fafafa", "text_color": "#262626", "card_bg": "#ffffff", "card_border": "#dbdbdb", "btn_bg": "#ffffff", "btn_hover": "#f0f0f0"},
+    True: {"bg_color": "#000000", "text_color": "#ffffff", "card_bg": "#121212", "card_border": "#363636", "btn_bg": "#262626", "btn_hover": "#333333"},
+}
+
+FONT_LINKS = """<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
+<link href="https://fonts.googleapis.com/css2?family=Roboto:wght@400;500;700&display=swap" rel="stylesheet">"""
+
+CSS_TEMPLATE = string.Template(""".stApp { background-color: $bg_color; font-family: 'Roboto', sans-serif; }
+#MainMenu, footer, header {display: none !important;}
+.block-container { max-width: 600px !important; padding-top: 1rem !important; padding-left: 10px !important; padding-right: 10px !important; margin: 0 auto !important; }
+.insta-card { background: $card_bg; border: 1px solid $card_border; border-radius: 8px; margin-bottom: 12px; overflow: hidden; width: 100%; box-sizing: border-box; }
+.card-header { display: flex; align-items: center; padding: 14px; border-bottom: 1px solid $card_border; }
+.avatar-small { width: 32px; height: 32px; border-radius: 50%; margin-right: 10px; background: linear-gradient(45deg, #f09433, #e6683c, #dc2743, #cc2366, #bc1888); padding: 2px; }
+.avatar-small img { border-radius: 50%; border: 2px solid $card_bg; width: 100%; height: 100%; object-fit: cover; }
+.question-content { font-size: 22px !important; font-weight: 700 !important; color: $text_color !important; margin-bottom: 10px; line-height: 1.4; display: block !important; opacity: 1 !important; text-align: left; }
+div.stButton > button { width: 100% !important; display: block !important; border-radius: 8px !important; background: $btn_bg !important; border: 1px solid $card_border !important; color: $text_color !important; font-weight: 600 !important; padding: 16px 0px !important; margin-bottom: 8px !important; text-align: center !important; font-size: 16px !important; min-height: 54px !important; white-space: normal !important; box-shadow: none !important; transition: all 0.1s !important; }
+div.stButton > button:hover { background: $btn_hover !important; border-color: #a8a8a8 !important; }
+div.stButton > button:active { transform: scale(0.98); background: #efefef !important; }
+.primary-btn > button { background: #0095f6 !important; color: white !important; border: none !important; }
+.primary-btn > button:hover { background: #0081d6 !important; }
+.profile-container { display: flex; padding: 20px 20px 0 20px; align-items: center; }
+.profile-pic-ring { width: 80px; height: 80px; border-radius: 50%; background: linear-gradient(45deg, #f09433, #e6683c, #dc2743, #cc2366, #bc1888); padding: 2px; margin-right: 20px; flex-shrink: 0; }
+.profile-pic-img { width: 100%; height: 100%; border-radius: 50%; border: 3px solid $card_bg; background: $btn_bg; }
+.profile-stats { display: flex; justify-content: space-around; flex-grow: 1; text-align: center; }
+.stat-val { font-weight: 700; font-size: 18px; color: $text_color; display: block; }
+.stat-lbl { font-size: 14px; color: $text_color; }
+.profile-bio { padding: 10px 20px 20px 20px; font-size: 14px; color: $text_color; line-height: 1.4; }
+.highlights-scroll { display: flex; gap: 15px; padding: 0 20px 10px 20px; overflow-x: auto; scrollbar-width: none; }
+.highlight-item { text-align: center; width: 64px; flex-shrink: 0; }
+.highlight-circle { width: 62px; height: 62px; border-radius: 50%; border: 1px solid $card_border; display: flex; align-items: center; justify-content: center; font-size: 24px; background: $btn_bg; margin: 0 auto 5px auto; }
+.highlight-title { font-size: 12px; color: $text_color; text-align: center; }
+.app-header { display: flex; justify-content: space-between; align-items: center; padding: 10px 0; border-bottom: 1px solid $card_border; background: $card_bg; margin-bottom: 10px; }
+.logo-font { font-family: 'Grand Hotel', cursive; font-size: 28px; color: $text_color; text-align: center; }
+.reward-overlay { text-align: center; margin: 20px 0; padding: 15px; background: $btn_bg; border-radius: 8px; border: 2px solid #e1306c; animation: bounceIn 0.8s; }
+@keyframes bounceIn { 0% {transform: scale(0.3);} 50% {transform: scale(1.05);} 100% {transform: scale(1);} }
+.timer-container { width: 100%; background-color: #e0e0e0; border-radius: 4px; height: 10px; margin-bottom: 10px; overflow: hidden; }
+.timer-bar { height: 100%; background-color: #0095f6; width: 100%; transform-origin: left; }
+.stExpander p, .stExpander label, .stExpander span, .stExpander div { color: $text_color !important; }
+div[data-baseweb="select"] span { color: $text_color !important; }""")
+
+PROFILE_CARD_TEMPLATE = """
+<div class="insta-card">
+<div class="profile-container">
+<div class="profile-pic-ring">
+<img src="https://api.dicebear.com/7.x/avataaars/svg?seed=Eva" class="profile-pic-img">
+</div>
+<div class="profile-stats">
+<div><span class="stat-val">{score}</span><span class="stat-lbl">posts</span></div>
+<div><span class="stat-val">{streak}</span><span class="stat-lbl">volgers</span></div>
+<div><span class="stat-val">{wins}</span><span class="stat-lbl">volgend</span></div>
+</div>
+</div>
+<div class="profile-bio">
+<span style="font-weight:700;">Eefje 🚘</span><br>
+Road to License ✨<br>
+<i>"Niet als een frikandel rijden!"</i> - Papa<br>
+<a href="#" style="color:#00376b; text-decoration:none;">www.cbr.nl</a>
+</div>
+</div>
+"""
+
+HIGHLIGHTS_HTML = """
+<div class="highlights-scroll">
+<div class="highlight-item"><div class="highlight-circle">⚠️</div><div class="highlight-title">Gevaar</div></div>
+<div class="highlight-item"><div class="highlight-circle">📚</div><div class="highlight-title">Kennis</div></div>
+<div class="highlight-item"><div class="highlight-circle">🧠</div><div class="highlight-title">Inzicht</div></div>
+<div class="highlight-item"><div class="highlight-circle">🏆</div><div class="highlight-title">Wins</div></div>
+</div>
+"""
+
+AUDIO_TAG = '<audio src="{url}" controls preload="auto"{autoplay} style="width:100%;"></audio>'
+
+# $-velden = thema (één keer per thema ingevuld), {}-velden = per vraag
+QUESTION_CARD_TEMPLATE = string.Template("""
+<div class="insta-card">
+<div class="card-header">
+<div class="avatar-small"><img src="https://api.dicebear.com/7.x/avataaars/svg?seed=Papa"></div>
+<div style="font-weight:600; font-size:14px; color:$text_color;">Papa & Fenna</div>
+<div style="margin-left:auto; color:#8e8e8e; font-size:12px;">{category} - ⏱️ {timer}s</div>
+</div>
+<img src="{img_url}" style="width:100%; display:block; min-height:200px; background-color: #eee;">
+<div style="padding:16px;">
+<div style="margin-bottom:8px;">
+<i class="far fa-heart" style="font-size:24px; margin-right:16px;"></i>
+<i class="far fa-comment" style="font-size:24px; margin-right:16px;"></i>
+<i class="far fa-paper-plane" style="font-size:24px;"></i>
+</div>
+<div class="question-content">{question}</div>
+</div>
+</div>
+""")
+
+@st.cache_resource(show_spinner=False)
+def get_theme_css(dark):
+    return CSS_TEMPLATE.substitute(THEMES[dark])
+
+@st.cache_resource(show_spinner=False)
+def get_theme_stylesheet_url(dark):
+    """
+    Schrijft de thema-CSS één keer naar static/ (naam met content-hash), zodat
+    een rerun alleen een <link> stuurt en de browser de CSS uit zijn cache haalt.
+    """
+    css = get_theme_css(dark)
+    name = f"eva-{'dark' if dark else 'light'}-{hashlib.sha1(css.encode('utf-8')).hexdigest()[:10]}.css"
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name)
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f: f.write(css)
+        os.replace(tmp, path)
+    return f"app/static/{name}"
+
+@st.cache_resource(show_spinner=False)
+def get_theme_head(dark):
+    # Wat er elke rerun naar de browser gaat: gecachte links of (zonder static serving) inline CSS
+    try:
+        if static_serving_enabled():
+            return f'{FONT_LINKS}\n<link rel="stylesheet" href="{get_theme_stylesheet_url(dark)}">'
+    except OSError:
+        pass
+    return f"{FONT_LINKS}\n<style>\n{get_theme_css(dark)}\n</style>"
+
+@st.cache_resource(show_spinner=False)
+def get_question_card_template(dark):
+    return QUESTION_CARD_TEMPLATE.substitute(THEMES[dark])
+
 def inject_custom_css():
-    dark = st.session_state.dark_mode
-    bg_color = "#000000" if dark else "#fafafa"
-    text_color = "#ffffff" if dark else "#262626"
-    card_bg = "#121212" if dark else "#ffffff"
-    card_border = "#363636" if dark else "#dbdbdb"
-    btn_bg = "#262626" if dark else "#ffffff"
-    btn_hover = "#333333" if dark else "#f0f0f0"
-    
-    st.markdown(f"""
-<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
-<link href="https://fonts.googleapis.com/css2?family=Roboto:wght@400;500;700&display=swap" rel="stylesheet">
-<style>
-.stApp {{ background-color: {bg_color}; font-family: 'Roboto', sans-serif; }}
-#MainMenu, footer, header {{display: none !important;}}
-.block-container {{ max-width: 600px !important; padding-top: 1rem !important; padding-left: 10px !important; padding-right: 10px !important; margin: 0 auto !important; }}
-.insta-card {{ background: {card_bg}; border: 1px solid {card_border}; border-radius: 8px; margin-bottom: 12px; overflow: hidden; width: 100%; box-sizing: border-box; }}
-.card-header {{ display: flex; align-items: center; padding: 14px; border-bottom: 1px solid {card_border}; }}
-.avatar-small {{ width: 32px; height: 32px; border-radius: 50%; margin-right: 10px; background: linear-gradient(45deg, #f09433, #e6683c, #dc2743, #cc2366, #bc1888); padding: 2px; }}
-.avatar-small img {{ border-radius: 50%; border: 2px solid {card_bg}; width: 100%; height: 100%; object-fit: cover; }}
-.question-content {{ font-size: 22px !important; font-weight: 700 !important; color: {text_color} !important; margin-bottom: 10px; line-height: 1.4; display: block !important; opacity: 1 !important; text-align: left; }}
-div.stButton > button {{ width: 100% !important; display: block !important; border-radius: 8px !important; background: {btn_bg} !important; border: 1px solid {card_border} !important; color: {text_color} !important; font-weight: 600 !important; padding: 16px 0px !important; margin-bottom: 8px !important; text-align: center !important; font-size: 16px !important; min-height: 54px !important; white-space: normal !important; box-shadow: none !important; transition: all 0.1s !important; }}
-div.stButton > button:hover {{ background: {btn_hover} !important; border-color: #a8a8a8 !important; }}
-div.stButton > button:active {{ transform: scale(0.98); background: #efefef !important; }}
-.primary-btn > button {{ background: #0095f6 !important; color: white !important; border: none !important; }}
-.primary-btn > button:hover {{ background: #0081d6 !important; }}
-.profile-container {{ display: flex; padding: 20px 20px 0 20px; align-items: center; }}
-.profile-pic-ring {{ width: 80px; height: 80px; border-radius: 50%; background: linear-gradient(45deg, #f09433, #e6683c, #dc2743, #cc2366, #bc1888); padding: 2px; margin-right: 20px; flex-shrink: 0; }}
-.profile-pic-img {{ width: 100%; height: 100%; border-radius: 50%; border: 3px solid {card_bg}; background: {btn_bg}; }}
-.profile-stats {{ display: flex; justify-content: space-around; flex-grow: 1; text-align: center; }}
-.stat-val {{ font-weight: 700; font-size: 18px; color: {text_color}; display: block; }}
-.stat-lbl {{ font-size: 14px; color: {text_color}; }}
-.profile-bio {{ padding: 10px 20px 20px 20px; font-size: 14px; color: {text_color}; line-height: 1.4; }}
-.highlights-scroll {{ display: flex; gap: 15px; padding: 0 20px 10px 20px; overflow-x: auto; scrollbar-width: none; }}
-.highlight-item {{ text-align: center; width: 64px; flex-shrink: 0; }}
-.highlight-circle {{ width: 62px; height: 62px; border-radius: 50%; border: 1px solid {card_border}; display: flex; align-items: center; justify-content: center; font-size: 24px; background: {btn_bg}; margin: 0 auto 5px auto; }}
-.highlight-title {{ font-size: 12px; color: {text_color}; text-align: center; }}
-.app-header {{ display: flex; justify-content: space-between; align-items: center; padding: 10px 0; border-bottom: 1px solid {card_border}; background: {card_bg}; margin-bottom: 10px; }}
-.logo-font {{ font-family: 'Grand Hotel', cursive; font-size: 28px; color: {text_color}; text-align: center; }}
-.reward-overlay {{ text-align: center; margin: 20px 0; padding: 15px; background: {btn_bg}; border-radius: 8px; border: 2px solid #e1306c; animation: bounceIn 0.8s; }}
-@keyframes bounceIn {{ 0% {{transform: scale(0.3);}} 50% {{transform: scale(1.05);}} 100% {{transform: scale(1);}} }}
-.timer-container {{ width: 100%; background-color: #e0e0e0; border-radius: 4px; height: 10px; margin-bottom: 10px; overflow: hidden; }}
-.timer-bar {{ height: 100%; background-color: #0095f6; width: 100%; transform-origin: left; }}
-.stExpander p, .stExpander label, .stExpander span, .stExpander div {{ color: {text_color} !important; }}
-div[data-baseweb="select"] span {{ color: {text_color} !important; }}
-</style>
-""", unsafe_allow_html=True)
+    st.markdown(get_theme_head(st.session_state.dark_mode), unsafe_allow_html=True)
 
 # ----------------------------------------------------------------------
 # 6️⃣ SCHERMEN
@@ -237,9 +588,10 @@ def render_navbar():
             st.session_state.dark_mode = not st.session_state.dark_mode
             st.rerun()
 
-def get_timer_html(seconds, delay_seconds):
+def get_timer_html(seconds, delay_seconds, question_id=""):
+    # data-q: per vraag andere HTML, anders herstart de animatie niet bij een fragment-rerun
     return f"""
-    <div class="timer-container">
+    <div class="timer-container" data-q="{question_id}">
         <div class="timer-bar" style="animation: countdown {seconds}s linear forwards; animation-delay: {delay_seconds}s;"></div>
     </div>
     <style>
@@ -254,26 +606,8 @@ def screen_dashboard():
     if st.session_state.trigger_balloons: st.session_state.trigger_balloons = False
     data = st.session_state.user_data
     
-    st.markdown(f"""
-<div class="insta-card">
-<div class="profile-container">
-<div class="profile-pic-ring">
-<img src="https://api.dicebear.com/7.x/avataaars/svg?seed=Eva" class="profile-pic-img">
-</div>
-<div class="profile-stats">
-<div><span class="stat-val">{data['total_score']}</span><span class="stat-lbl">posts</span></div>
-<div><span class="stat-val">{st.session_state.streak}</span><span class="stat-lbl">volgers</span></div>
-<div><span class="stat-val">{len([e for e in data['exams_history'] if e['passed']])}</span><span class="stat-lbl">volgend</span></div>
-</div>
-</div>
-<div class="profile-bio">
-<span style="font-weight:700;">Eefje 🚘</span><br>
-Road to License ✨<br>
-<i>"Niet als een frikandel rijden!"</i> - Papa<br>
-<a href="#" style="color:#00376b; text-decoration:none;">www.cbr.nl</a>
-</div>
-</div>
-""", unsafe_allow_html=True)
+    wins = data['stats']['exams_passed']  # lopende teller, geen scan door exams_history
+    st.markdown(PROFILE_CARD_TEMPLATE.format(score=data['total_score'], streak=st.session_state.streak, wins=wins), unsafe_allow_html=True)
     
     with st.expander("📲 Zet op je telefoon (App)"):
         st.markdown("""
@@ -285,14 +619,7 @@ Road to License ✨<br>
         2. Tik op **'App installeren'**.
         """)
 
-    st.markdown("""
-<div class="highlights-scroll">
-<div class="highlight-item"><div class="highlight-circle">⚠️</div><div class="highlight-title">Gevaar</div></div>
-<div class="highlight-item"><div class="highlight-circle">📚</div><div class="highlight-title">Kennis</div></div>
-<div class="highlight-item"><div class="highlight-circle">🧠</div><div class="highlight-title">Inzicht</div></div>
-<div class="highlight-item"><div class="highlight-circle">🏆</div><div class="highlight-title">Wins</div></div>
-</div>
-""", unsafe_allow_html=True)
+    st.markdown(HIGHLIGHTS_HTML, unsafe_allow_html=True)
 
     st.write("---") 
     
@@ -302,14 +629,17 @@ Road to License ✨<br>
     
     st.markdown('<div class="primary-btn">', unsafe_allow_html=True)
     if st.button("Start Oefenen"):
-        df = load_data()
+        bank = load_data()
         valid_cats = st.session_state.get('selected_categories', ["Gevaarherkenning", "Kennis", "Inzicht"])
-        mask = df['category'].apply(lambda x: any(c in str(x) for c in valid_cats))
-        filtered_df = df[mask]
+        ids = bank.ids_for_categories(valid_cats)
         
-        if not filtered_df.empty:
-            ids = filtered_df['id'].tolist()
+        if ids:
             random.shuffle(ids)
+            # Herhalingen die aan de beurt zijn (spaced repetition) eerst, daarna nieuwe vragen
+            in_cats = set(ids)
+            due = [qid for qid in st.session_state.user_data['srs'].due(time.time()) if qid in in_cats]
+            due_set = set(due)
+            ids = due + [qid for qid in ids if qid not in due_set]
             if session_choice != "Alles":
                 ids = ids[:int(session_choice)]
             st.session_state.practice_ids = ids
@@ -325,6 +655,11 @@ Road to License ✨<br>
     st.markdown('</div>', unsafe_allow_html=True)
 
     if st.button("Foutenbak Herkans"):
+        # Alle openstaande fouten, net als vroeger: de sessiegrootte geldt alleen voor oefenen
+        due_mistakes = st.session_state.user_data['srs'].due_mistakes(time.time())
+        st.session_state.practice_ids = load_data().filter_valid(due_mistakes)
+        st.session_state.current_session_score = 0
+        st.session_state.question_start_time = 0
         st.session_state.mode = 'mistakes'; st.session_state.current_index = 0; st.session_state.answered_question = False; st.rerun()
 
     if st.button("Examen Simulatie"): 
@@ -332,6 +667,9 @@ Road to License ✨<br>
         st.session_state.question_start_time = 0 # Reset timer voor examen start
         st.rerun()
 
+    if st.button("📊 Statistieken"):
+        st.session_state.mode = 'stats'; st.rerun()
+
     with st.expander("⚙️ Instellingen"):
         st.caption("Geluid")
         st.session_state.music_volume = st.slider("Volume", 0.0, 1.0, 0.3)
@@ -339,50 +677,43 @@ Road to License ✨<br>
         cats = ["Gevaarherkenning", "Kennis", "Inzicht"]
         st.session_state.selected_categories = st.multiselect("Selecteer categorieën:", cats, default=st.session_state.selected_categories)
         if st.button("🔊 Test Audio"):
-             data = generate_audio_bytes("Test 1 2 3.")
-             if data: st.audio(data, format="audio/mp3")
-             else: st.error("Audio motor niet beschikbaar.")
+             if not play_audio(audio_source_key("Test 1 2 3."), lambda: generate_audio_bytes("Test 1 2 3."), autoplay=False):
+                 st.error("Audio motor niet beschikbaar.")
+        pf = get_prefetcher().stats()
+        st.caption(f"Prefetch: {pf['hits']} hits · {pf['waits']} wachtend · {pf['misses']} missers")
+        st.caption("Stemmen: " + (" → ".join(f"{name} ({state})" for name, state in get_tts().stats().items()) or "geen"))
     
     st.caption(f"App Versie: {APP_VERSION} | © 2025 Papa & Eva")
 
     if not st.session_state.welcome_played:
         welkom_text = "Ha Eefje. Klaar om te knallen?"
-        audio_welkom = generate_audio_bytes(welkom_text)
-        if audio_welkom:
-            st.audio(audio_welkom, format='audio/mp3', start_time=0, autoplay=True)
+        play_audio(audio_source_key(welkom_text), lambda: generate_audio_bytes(welkom_text))
         st.session_state.welcome_played = True
 
-def screen_practice(df):
-    if st.session_state.trigger_balloons: st.balloons(); st.session_state.trigger_balloons = False
+def screen_practice(bank):
     is_mistakes = (st.session_state.mode == 'mistakes')
     
-    if is_mistakes:
-        q_ids = st.session_state.user_data['mistakes_list']
-        valid_q_ids = [qid for qid in q_ids if not df[df['id'] == str(qid)].empty]
-        if not valid_q_ids: 
-            st.success("Foutenbak leeg! 🎉"); st.button("Terug", on_click=lambda: setattr(st.session_state, 'mode', 'dashboard')); return
-        practice_list = valid_q_ids
-    else:
-        practice_list = st.session_state.practice_ids
+    practice_list = st.session_state.practice_ids
+    if is_mistakes and not practice_list:
+        st.success("Foutenbak leeg! 🎉"); st.button("Terug", on_click=lambda: setattr(st.session_state, 'mode', 'dashboard')); return
 
     if st.session_state.current_index >= len(practice_list):
         screen_session_done(len(practice_list))
         return
 
     current_id = practice_list[st.session_state.current_index]
-    row = df[df['id'] == str(current_id)].iloc[0]
+    with span("bank_lookup"): row = bank.get(current_id)
     
     question_text = make_question_audio(row)
     
     if not st.session_state.answered_question and st.session_state.question_start_time == 0:
-        duration = estimate_speech_duration(question_text)
+        claim_prefetched(row, question_text)
+        generate_audio_bytes(question_text)  # is hieronder toch nodig; daarna is de duur bekend
+        duration = get_speech_duration(question_text)
         st.session_state.audio_duration_cache = duration
         st.session_state.question_start_time = time.time()
 
-    try:
-        timer_seconds = int(row.get('timer', 15))
-    except:
-        timer_seconds = 15
+    timer_seconds = row.timer  # al een int: QuestionBank parst de timer bij het laden
     
     audio_delay = st.session_state.audio_duration_cache
 
@@ -392,82 +723,107 @@ def screen_practice(df):
     st.markdown(f"**Vraag {curr_q} van {total_q}**")
     st.progress(progress)
 
+    with span("render_html"):
+        ai_img_url = get_scenario_image_url(row)
+        card_html = get_question_card_template(st.session_state.dark_mode).format(
+            category=row['category'], timer=timer_seconds, img_url=ai_img_url, question=row['question'])
+        st.markdown(card_html, unsafe_allow_html=True)
+
     if not st.session_state.answered_question:
-        st.markdown(get_timer_html(timer_seconds, audio_delay), unsafe_allow_html=True)
+        # PREFETCH: volgende vraag alvast klaarzetten terwijl deze gelezen wordt
+        if st.session_state.current_index + 1 < len(practice_list):
+            next_row = bank.get(practice_list[st.session_state.current_index + 1])
+            if next_row is not None: prefetch_question(next_row)
 
-    img_prompt = urllib.parse.quote(row.get('image_desc', 'traffic situation car netherlands'))
-    ai_img_url = f"https://image.pollinations.ai/prompt/driver%20view%20inside%20car%20{img_prompt}?width=600&height=400&nologo=true"
-    card_bg = '#121212' if st.session_state.dark_mode else '#ffffff'
-    text_c = '#ffffff' if st.session_state.dark_mode else '#262626'
+    practice_answer_area(row, timer_seconds, audio_delay, question_text)
 
-    st.markdown(f"""
-<div class="insta-card">
-<div class="card-header">
-<div class="avatar-small"><img src="https://api.dicebear.com/7.x/avataaars/svg?seed=Papa"></div>
-<div style="font-weight:600; font-size:14px; color:{text_c};">Papa & Fenna</div>
-<div style="margin-left:auto; color:#8e8e8e; font-size:12px;">{row['category']} - ⏱️ {timer_seconds}s</div>
-</div>
-<img src="{ai_img_url}" style="width:100%; display:block; min-height:200px; background-color: #eee;">
-<div style="padding:16px;">
-<div style="margin-bottom:8px;">
-<i class="far fa-heart" style="font-size:24px; margin-right:16px;"></i>
-<i class="far fa-comment" style="font-size:24px; margin-right:16px;"></i>
-<i class="far fa-paper-plane" style="font-size:24px;"></i>
-</div>
-<div class="question-content">{row['question']}</div>
-</div>
-</div>
-""", unsafe_allow_html=True)
+def measure_thinking_time(qid, timer_seconds, audio_delay):
+    """
+    -> (denktijd, te_laat, skew). Browsermeting als die er is, anders de
+    servertijd min de geschatte voorleesduur (zoals altijd).
+    """
+    elapsed_total = time.time() - st.session_state.question_start_time
+    server_time = elapsed_total - audio_delay
+    thinking_time, skew = choose_reaction_time(st.session_state.get(state_key(qid)), qid, server_time, elapsed_total)
+    eva_metrics.count("eva_reaction_time_total", source="server" if skew is None else "client")
+    if skew is not None:
+        eva_metrics.observe("eva_reaction_skew_seconds", max(0.0, skew))
+        if server_time > timer_seconds >= thinking_time: eva_metrics.count("eva_late_rescued_total")
+    return thinking_time, thinking_time > timer_seconds, skew
 
-    audio_slot = st.empty()
+def answer_fields(qid, category, is_correct, thinking_time, is_too_late, skew, timer_seconds):
+    # Gedeeld door oefen- en examenantwoorden, zodat apply_event ze gelijk verwerkt
+    fields = {"qid": str(qid), "correct": is_correct and not is_too_late, "cat": category, "late": is_too_late,
+              "rt": round(thinking_time, 2)}
+    if skew is not None:
+        fields["skew"] = round(skew, 3)
+        fields["rescued"] = thinking_time + skew > timer_seconds and not is_too_late
+    return fields
 
-    if not st.session_state.answered_question:
-        with audio_slot:
-            audio_bytes = generate_audio_bytes(question_text)
-            if audio_bytes:
-                st.audio(audio_bytes, format='audio/mp3', start_time=0, autoplay=True)
+def record_practice_answer(row, opt, timer_seconds, audio_delay):
+    # on_click: draait vóór de (fragment-)rerun, dus de feedback staat er meteen
+    thinking_time, is_too_late, skew = measure_thinking_time(row['id'], timer_seconds, audio_delay)
+    
+    st.session_state.answered_question = True
+    st.session_state.selected_answer = str(opt)
+    st.session_state.is_too_late = is_too_late 
+    
+    data = st.session_state.user_data
+    is_correct_answer = (str(opt) == str(row['answer']))
+    
+    if is_correct_answer and not is_too_late:
+        st.session_state.streak += 1
+        st.session_state.current_session_score += 1
+        st.session_state.trigger_balloons = True
+    else:
+        st.session_state.streak = 0
+    
+    event = {"type": "answer", "ts": time.time(),
+             **answer_fields(row['id'], row['category'], is_correct_answer, thinking_time, is_too_late, skew, timer_seconds)}
+    apply_event(data, event)
+    save_history(data, event)
 
-        # BUTTONS SHUFFLE (V70 Feature integrated here)
-        options = [row['opt1'], row['opt2'], row['opt3']]
-        valid_opts = [str(o) for o in options if str(o).lower() != 'nan']
-        random.shuffle(valid_opts)
+def shuffled_options(row):
+    # Eén keer schudden per vraag: een fragment-rerun mag de knoppen niet laten verspringen
+    opts = row.options()
+    saved = st.session_state.get('option_order')
+    if saved and saved[0] == str(row['id']) and sorted(map(str, saved[1])) == sorted(map(str, opts)):
+        return list(saved[1])
+    random.shuffle(opts)
+    st.session_state.option_order = (str(row['id']), opts)
+    return list(opts)
 
-        for opt in valid_opts:
-            if st.button(str(opt), key=f"btn_{current_id}_{opt}"):
-                elapsed_total = time.time() - st.session_state.question_start_time
-                thinking_time = elapsed_total - audio_delay
-                is_too_late = thinking_time > timer_seconds
-                
-                st.session_state.answered_question = True
-                st.session_state.selected_answer = str(opt)
-                st.session_state.is_too_late = is_too_late 
-                
-                data = st.session_state.user_data
-                is_correct_answer = (str(opt) == str(row['answer']))
-                
-                if is_correct_answer and not is_too_late:
-                    data['total_score'] += 1
-                    st.session_state.streak += 1
-                    st.session_state.current_session_score += 1
-                    st.session_state.trigger_balloons = True
-                    if is_mistakes and str(current_id) in data['mistakes_list']: 
-                        data['mistakes_list'].remove(str(current_id))
-                else:
-                    st.session_state.streak = 0
-                    if str(current_id) not in data['mistakes_list']: 
-                        data['mistakes_list'].append(str(current_id))
-                
-                save_history(data)
-                st.rerun()
-    else:
+@st.fragment
+def practice_answer_area(row, timer_seconds, audio_delay, question_text):
+    """
+    Audio, timer, antwoordknoppen en feedback als fragment: een antwoord herlaadt
+    alleen dit stuk. CSS, navbar en kaart blijven staan tot "Volgende". Vraag-
+    en feedbackaudio delen één plek, dus de feedback vervangt de vraag.
+    """
+    with eva_metrics.rerun(st.session_state.session_token, st.session_state.mode, "fragment"):
+        audio_slot = st.empty()
+        if not st.session_state.answered_question:
+            with audio_slot: play_audio(audio_source_key(question_text), lambda: generate_audio_bytes(question_text))
+            st.markdown(get_timer_html(timer_seconds, audio_delay, row['id']), unsafe_allow_html=True)
+
+            # BUTTONS SHUFFLE (V70 Feature integrated here)
+            valid_opts = shuffled_options(row)
+
+            reaction_timer(row['id'], audio_delay, timer_seconds, valid_opts,
+                           lambda opt: record_practice_answer(row, opt, timer_seconds, audio_delay))
+            for opt in valid_opts:
+                st.button(str(opt), key=f"btn_{row['id']}_{opt}", on_click=record_practice_answer, args=(row, opt, timer_seconds, audio_delay))
+            return
+
+        if st.session_state.trigger_balloons: st.balloons(); st.session_state.trigger_balloons = False
         is_correct_answer = (st.session_state.selected_answer == str(row['answer']))
         is_too_late = st.session_state.is_too_late
-        fb_txt = get_dad_feedback(is_correct_answer, row['explanation'], is_too_late)
+        fb_parts = get_dad_feedback(is_correct_answer, row['speech_explanation'], is_too_late)
+        fb_txt = " ".join(p for p in fb_parts if p)
         
-        with audio_slot:
-            audio_fb_bytes = generate_audio_bytes(fb_txt)
-            if audio_fb_bytes:
-                st.audio(audio_fb_bytes, format='audio/mp3', start_time=0, autoplay=True)
+        if TTS_AVAILABLE:
+            get_prefetcher().claim(("audio", get_audio_store().make_key(row['speech_explanation'], TTS_LANG, TTS_ENGINE)))
+        with audio_slot: play_audio(audio_source_key(*fb_parts), lambda: generate_feedback_audio(fb_parts))
 
         if is_too_late:
             st.error(f"⏰ TE LAAT! {fb_txt}")
@@ -488,13 +844,8 @@ def screen_practice(df):
             st.session_state.audio_duration_cache = 0
             st.session_state.is_too_late = False
             
-            if not is_mistakes:
-                st.session_state.current_index += 1
-            else:
-                if not (is_correct_answer and not is_too_late):
-                    st.session_state.current_index += 1
-                    
-            st.rerun()
+            st.session_state.current_index += 1
+            st.rerun()  # nieuwe vraag: de hele pagina
         st.markdown('</div>', unsafe_allow_html=True)
 
 def screen_session_done(total_questions):
@@ -520,75 +871,92 @@ def screen_session_done(total_questions):
         st.rerun()
     st.markdown('</div>', unsafe_allow_html=True)
 
-def init_exam(df):
-    q_pool = random.sample(df['id'].tolist(), min(len(df), 25))
-    st.session_state.exam_state = {"ids": q_pool, "answers": {}, "idx": 0}
+@st.cache_resource(max_entries=2)
+def get_exam_pool(_bank, fingerprint):
+    # Voorraad kant-en-klare examens per versie van de vragenbank
+    return ExamPool(_bank, EXAM_QUOTAS, EXAM_SIZE)
+
+def init_exam(bank):
+    recent = st.session_state.user_data.get('recent_exam_ids', [])
+    q_pool = get_exam_pool(bank, bank.fingerprint).draw(recent)
+    st.session_state.exam_state = {"ids": q_pool, "answers": {}, "details": {}, "idx": 0}
     st.session_state.mode = 'exam_active'; st.rerun()
 
-def screen_exam(df):
-    est = st.session_state.exam_state
-    if est['idx'] >= len(est['ids']): st.session_state.mode = 'exam_result'; st.rerun(); return
-    qid = est['ids'][est['idx']]
-    row = df[df['id'] == str(qid)].iloc[0]
+def screen_exam(bank):
+    exam_question(bank)
+
+def record_exam_answer(qid, opt, answer, category, timer_seconds, audio_delay):
+    # on_click: antwoord vastleggen en door naar de volgende vraag
+    thinking_time, is_too_late, skew = measure_thinking_time(qid, timer_seconds, audio_delay)
     
-    question_text = make_question_audio(row)
+    fields = answer_fields(qid, category, str(opt) == str(answer), thinking_time, is_too_late, skew, timer_seconds)
     
-    if st.session_state.question_start_time == 0:
-        duration = estimate_speech_duration(question_text)
-        st.session_state.audio_duration_cache = duration
-        st.session_state.question_start_time = time.time()
-
-    try:
-        timer_seconds = int(row.get('timer', 15))
-    except:
-        timer_seconds = 15
+    st.session_state.exam_state['answers'][qid] = fields['correct']
+    st.session_state.exam_state.setdefault('details', {})[qid] = fields
     
-    audio_delay = st.session_state.audio_duration_cache
+    st.session_state.question_start_time = 0
+    st.session_state.audio_duration_cache = 0
+    st.session_state.exam_state['idx'] += 1
 
-    st.markdown(f"**Examen Vraag {est['idx']+1}/{len(est['ids'])}**")
-    st.progress((est['idx']) / len(est['ids']))
-    
-    st.markdown(get_timer_html(timer_seconds, audio_delay), unsafe_allow_html=True)
+@st.fragment
+def exam_question(bank):
+    """
+    Eén examenvraag als fragment: een antwoord tekent alleen de vraag opnieuw,
+    niet de CSS en navbar. Pas na de laatste vraag volgt een volledige rerun.
+    """
+    with eva_metrics.rerun(st.session_state.session_token, st.session_state.mode, "fragment"):
+        est = st.session_state.exam_state
+        if est['idx'] >= len(est['ids']): st.session_state.mode = 'exam_result'; st.rerun(); return
+        qid = est['ids'][est['idx']]
+        with span("bank_lookup"): row = bank.get(qid)
+        
+        question_text = make_question_audio(row)
+        
+        if st.session_state.question_start_time == 0:
+            claim_prefetched(row, question_text)
+            generate_audio_bytes(question_text)  # is hieronder toch nodig; daarna is de duur bekend
+            duration = get_speech_duration(question_text)
+            st.session_state.audio_duration_cache = duration
+            st.session_state.question_start_time = time.time()
 
-    img_prompt = urllib.parse.quote(row.get('image_desc', 'traffic situation car netherlands'))
-    ai_img_url = f"https://image.pollinations.ai/prompt/driver%20view%20inside%20car%20{img_prompt}?width=600&height=400&nologo=true"
-    st.image(ai_img_url, use_container_width=True)
-    
-    st.markdown(f"<div class='question-content'>{row['question']}</div>", unsafe_allow_html=True)
-    
-    with st.empty():
-        audio_ex_bytes = generate_audio_bytes(question_text)
-        if audio_ex_bytes:
-            st.audio(audio_ex_bytes, format='audio/mp3', start_time=0, autoplay=True)
-
-    # BUTTONS SHUFFLE VOOR EXAMEN
-    options = [row['opt1'], row['opt2'], row['opt3']]
-    valid_opts = [str(o) for o in options if str(o).lower() != 'nan']
-    random.shuffle(valid_opts)
-
-    for opt in valid_opts:
-        if st.button(str(opt), key=f"ex_{qid}_{opt}"):
-            elapsed_total = time.time() - st.session_state.question_start_time
-            thinking_time = elapsed_total - audio_delay
-            is_too_late = thinking_time > timer_seconds
-            
-            is_correct_choice = (str(opt) == str(row['answer']))
-            final_result = is_correct_choice and not is_too_late
-            
-            st.session_state.exam_state['answers'][qid] = final_result
-            
-            st.session_state.question_start_time = 0
-            st.session_state.audio_duration_cache = 0
-            st.session_state.exam_state['idx'] += 1
-            st.rerun()
+        timer_seconds = row.timer  # al een int: QuestionBank parst de timer bij het laden
+        
+        audio_delay = st.session_state.audio_duration_cache
+
+        st.markdown(f"**Examen Vraag {est['idx']+1}/{len(est['ids'])}**")
+        st.progress((est['idx']) / len(est['ids']))
+        
+        st.markdown(get_timer_html(timer_seconds, audio_delay, qid), unsafe_allow_html=True)
+
+        with span("render_html"):
+            ai_img_url = get_scenario_image_url(row)
+            st.markdown(f'<img src="{ai_img_url}" style="width:100%; display:block; min-height:200px; background-color: #eee; border-radius: 8px; margin-bottom: 10px;">', unsafe_allow_html=True)
+            st.markdown(f"<div class='question-content'>{row['question']}</div>", unsafe_allow_html=True)
+        
+        play_audio(audio_source_key(question_text), lambda: generate_audio_bytes(question_text))
+
+        if est['idx'] + 1 < len(est['ids']):
+            next_row = bank.get(est['ids'][est['idx'] + 1])
+            if next_row is not None: prefetch_question(next_row)
 
-def screen_exam_result(df):
+        # BUTTONS SHUFFLE VOOR EXAMEN
+        valid_opts = shuffled_options(row)
+
+        reaction_timer(qid, audio_delay, timer_seconds, valid_opts,
+                       lambda opt: record_exam_answer(qid, opt, row['answer'], row['category'], timer_seconds, audio_delay))
+        for opt in valid_opts:
+            st.button(str(opt), key=f"ex_{qid}_{opt}", on_click=record_exam_answer, args=(qid, opt, row['answer'], row['category'], timer_seconds, audio_delay))
+
+def screen_exam_result(bank):
     ans = st.session_state.exam_state['answers']
     score = sum(1 for v in ans.values() if v)
     passed = score >= EXAM_PASS_SCORE
     if 'last_exam_saved' not in st.session_state or st.session_state.last_exam_saved != len(ans):
-        st.session_state.user_data['exams_history'].append({"date": datetime.now().strftime("%d-%m"), "score": f"{score}/{len(ans)}", "passed": passed})
-        save_history(st.session_state.user_data); st.session_state.last_exam_saved = len(ans)
+        est = st.session_state.exam_state
+        event = {"type": "exam", "date": datetime.now().strftime("%d-%m"), "score": f"{score}/{len(ans)}", "passed": passed, "ids": list(est['ids']), "ts": time.time(),
+                 "answers": [est['details'][qid] for qid in est['ids'] if qid in est.get('details', {})]}
+        apply_event(st.session_state.user_data, event)
+        save_history(st.session_state.user_data, event); st.session_state.last_exam_saved = len(ans)
 
     st.markdown(f"<div class='insta-card' style='text-align:center; padding:30px;'><h1 style='color:{'green' if passed else 'red'}'>{'GESLAAGD! 🎓' if passed else 'GEZAKT 🛑'}</h1><h3>Score: {score}/{len(ans)}</h3></div>", unsafe_allow_html=True)
     if passed: st.balloons()
@@ -597,22 +965,78 @@ def screen_exam_result(df):
     st.link_button("📱 Deel uitslag", f"https://wa.me/?text={msg}")
     if st.button("Terug"): st.session_state.mode = 'dashboard'; st.rerun()
 
+def screen_stats(bank):
+    # Alles komt uit de lopende tellers in user_data['stats']; geen geschiedenis doorlopen
+    stats = st.session_state.user_data['stats']
+    st.markdown("<h2 style='text-align:center;'>📊 Statistieken</h2>", unsafe_allow_html=True)
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Goed", f"{ratio(stats['correct'], stats['answers']):.0%}")
+    c2.metric("Gem. denktijd", f"{ratio(stats['rt_sum'], stats['rt_count']):.1f}s")
+    c3.metric("Examens gehaald", f"{stats['exams_passed']}/{stats['exams']}")
+    st.caption(f"{stats['answers']} antwoorden · {stats['late']} te laat · gemiddelde examenscore {ratio(stats['exam_points'], stats['exam_max']):.0%}")
+
+    st.write("---")
+    for cat, c in sorted(stats['categories'].items()):
+        acc = ratio(c['correct'], c['answers'])
+        st.markdown(f"**{cat}** · {acc:.0%} goed · {c['late']} te laat · {ratio(c['rt_sum'], c['rt_count']):.1f}s gem.")
+        st.progress(acc)
+
+    if stats['rt_count']:
+        st.caption("Denktijd (na het voorlezen)")
+        labels = [f"≤{b}s" for b in RT_BUCKETS] + [f">{RT_BUCKETS[-1]}s"]
+        st.bar_chart({"denktijd": labels, "antwoorden": stats['rt_hist']}, x="denktijd", y="antwoorden", sort=False)
+
+    if stats['rt_client']:
+        # Hoeveel de servermeting (netwerk, rerun, laat startende audio) er extra bij telde
+        fmt = lambda s: f"≤{s}s" if s is not None else f">{SKEW_BUCKETS[-1]}s"
+        p50, p95 = (histogram_percentile(stats['skew_hist'], SKEW_BUCKETS, p) for p in (50, 95))
+        st.caption(f"Gemeten in de browser: {stats['rt_client']}/{stats['answers']} antwoorden · "
+                   f"vertraging p50 {fmt(p50)}, p95 {fmt(p95)} · {stats['late_rescued']}× ten onrechte 'te laat' voorkomen")
+
+    hardest = hardest_questions(stats, valid=bank.__contains__)
+    if hardest:
+        st.caption("Lastigste vragen")
+        for qid, (attempts, correct, late, _) in hardest:
+            row = bank.get(qid)
+            if row is None: continue
+            st.markdown(f"- {row['question']} · {correct}/{attempts} goed")
+
+    if st.button("Terug"): st.session_state.mode = 'dashboard'; st.rerun()
+
 def screen_panic():
     st.markdown("<h2 style='text-align:center;'>Adem in... Adem uit... 🌿</h2>", unsafe_allow_html=True)
     st.markdown("""<div style="display:flex; justify-content:center; align-items:center; height:200px;"><div style="width:150px; height:150px; background:#a5d6a7; border-radius:50%; animation:breathe 8s infinite ease-in-out;"></div></div><style>@keyframes breathe {0%, 100% {transform:scale(1);} 50% {transform:scale(1.5);}}</style>""", unsafe_allow_html=True)
     if st.button("Ik ben weer rustig"): st.session_state.mode = 'dashboard'; st.rerun()
 
+@st.cache_resource
+def get_metrics_server():
+    # Alleen met EVA_METRICS=1; één /metrics-endpoint per proces
+    return eva_metrics.start_http_server() if eva_metrics.ENABLED else None
+
 def main():
-    inject_custom_css()
-    df = load_data()
-    if df.empty: st.error("❌ 'vragen.csv' niet gevonden!"); return
+    get_metrics_server()
+    prebuild_feedback_audio()
+    with eva_metrics.rerun(st.session_state.session_token, st.session_state.mode):
+        render_app()
+
+def render_app():
+    with span("inject_css"): inject_custom_css()
+    bank = load_data()
+    if bank.empty: st.error("❌ 'vragen.csv' niet gevonden!"); return
+    sync_session_with_bank()
     render_navbar()
+    # Moduswissel: openstaande prefetches van deze sessie zijn niet meer nodig
+    if st.session_state.prefetch_mode != st.session_state.mode:
+        get_prefetcher().cancel(st.session_state.session_token)
+        st.session_state.prefetch_mode = st.session_state.mode
     if st.session_state.mode == 'dashboard': screen_dashboard()
-    elif st.session_state.mode == 'practice': screen_practice(df)
-    elif st.session_state.mode == 'mistakes': screen_practice(df)
-    elif st.session_state.mode == 'exam_init': init_exam(df)
-    elif st.session_state.mode == 'exam_active': screen_exam(df)
-    elif st.session_state.mode == 'exam_result': screen_exam_result(df)
+    elif st.session_state.mode == 'practice': screen_practice(bank)
+    elif st.session_state.mode == 'mistakes': screen_practice(bank)
+    elif st.session_state.mode == 'exam_init': init_exam(bank)
+    elif st.session_state.mode == 'exam_active': screen_exam(bank)
+    elif st.session_state.mode == 'exam_result': screen_exam_result(bank)
+    elif st.session_state.mode == 'stats': screen_stats(bank)
     elif st.session_state.mode == 'panic': screen_panic()
 
 if __name__ == "__main__":
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+
+"""
+🔊 EVA'S AUDIO OPSLAG
+-----------------------------------------------------
+Content-addressed schijfcache voor TTS-audio.
+- Sleutel = sha256 van (engine, taal, tekst), dus dezelfde zin wordt
+  maar één keer gesynthetiseerd, ook na een herstart of op een andere replica.
+- Schrijven gaat atomisch (tijdelijk bestand + os.replace), zodat een
+  andere sessie nooit een half geschreven MP3 leest.
+- Begrensd op bytes; bij overschrijding gaan de minst recent gebruikte
+  bestanden eruit (LRU op basis van mtime).
+- Prefetcher: zet de audio en afbeelding van de volgende vraag op de
+  achtergrond klaar terwijl de huidige vraag gelezen wordt.
+- Duur: bij het opslaan wordt de echte speelduur uit de MP3-frameheaders
+  gelezen en naast de audio bewaard (<key>.dur), voor de timer.
+- Zinnen: lange teksten worden per zin gesynthetiseerd (parallel, per zin
+  gecachet) en daarna op MP3-frameniveau aan elkaar geplakt, zonder
+  opnieuw te encoderen. Alleen frames met dezelfde samplerate: stukken van
+  verschillende stemmen (gTTS 24 kHz, espeak/lame 22,05 kHz) worden geweigerd.
+- AudioPublisher: zet clips onder static/ neer met de hash van de bytes als
+  naam, zodat de pagina een URL krijgt in plaats van de MP3 zelf. Dezelfde
+  clip (ook in een andere sessie) is dan dezelfde URL, en de browser haalt
+  hem uit zijn cache of met een range-request. Een pagina kan zo'n URL nog
+  laden nadat hij getekend is, dus daar gaat eviction nooit aan clips die
+  korter dan min_age geleden gebruikt zijn (de map mag dan even te groot zijn).
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AudioStore:
+    def __init__(self, root, max_bytes, min_age=0):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.min_age = min_age  # sec; jonger gebruikte clips worden niet ge-evict
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # key -> grootte, oudste eerst
+        self._used = {}  # key -> laatste gebruik (time.time)
+        self._total = 0
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def make_key(text, lang, engine):
+        raw = f"{engine}\0{lang}\0{text}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.mp3")
+
+    def _scan(self):
+        # Bestaande cache inlezen, gesorteerd op laatste gebruik
+        found = []
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith(".mp3"): continue
+                try: st = os.stat(os.path.join(dirpath, name))
+                except OSError: continue
+                found.append((st.st_mtime, name[:-4], st.st_size))
+        found.sort()
+        for mtime, key, size in found:
+            self._index[key] = size
+            self._used[key] = mtime
+            self._total += size
+
+    def duration_path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.dur")
+
+    def __contains__(self, key):
+        return os.path.exists(self.path_for(key))
+
+    def get(self, key):
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f: data = f.read()
+        except OSError:
+            with self._lock:
+                size = self._index.pop(key, None)
+                if size is not None: self._total -= size
+                self._used.pop(key, None)
+            return None
+        try: os.utime(path, None)
+        except OSError: pass
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+            else:
+                # Door een ander proces geschreven
+                self._index[key] = len(data)
+                self._total += len(data)
+            self._used[key] = time.time()
+        return data
+
+    def touch(self, key):
+        # Gebruikt zonder te lezen (bv. alleen de URL uitgedeeld): weer vooraan in de LRU
+        with self._lock:
+            if key not in self._index: return
+            self._index.move_to_end(key)
+            self._used[key] = time.time()
+
+    def put(self, key, data):
+        if not data: return
+        path = self.path_for(key)
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+        try:
+            _write_atomic(self.duration_path(key), f"{mp3_duration(data):.3f}".encode("ascii"))
+            _write_atomic(path, data)
+        except OSError:
+            return
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old is not None: self._total -= old
+            self._index[key] = len(data)
+            self._used[key] = time.time()
+            self._total += len(data)
+            self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            size = self._index.pop(key, None)
+            if size is not None: self._total -= size
+            self._used.pop(key, None)
+        for path in (self.path_for(key), self.duration_path(key)):
+            try: os.remove(path)
+            except OSError: pass
+
+    def duration(self, key):
+        """
+        Gemeten speelduur in seconden, of None als de audio niet in de cache zit.
+        """
+        try:
+            with open(self.duration_path(key), "rb") as f: return float(f.read())
+        except (OSError, ValueError):
+            pass
+        # Oudere cache zonder .dur: één keer uitrekenen en bewaren
+        try:
+            with open(self.path_for(key), "rb") as f: seconds = mp3_duration(f.read())
+        except OSError:
+            return None
+        try: _write_atomic(self.duration_path(key), f"{seconds:.3f}".encode("ascii"))
+        except OSError: pass
+        return seconds
+
+    def _evict(self):
+        now = time.time()
+        while self._total > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            # Oudste is nog te vers: de rest ook (LRU-volgorde), dus later opnieuw proberen
+            if self.min_age and now - self._used.get(key, 0) < self.min_age: break
+            size = self._index.pop(key)
+            self._used.pop(key, None)
+            self._total -= size
+            for path in (self.path_for(key), self.duration_path(key)):
+                try: os.remove(path)
+                except OSError: pass
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._index), "bytes": self._total, "max_bytes": self.max_bytes}
+
+
+class AudioPublisher:
+    """
+    Clips als statische bestanden: <prefix>/<hash[:2]>/<hash>.mp3, met een
+    AudioStore eronder (begrensd, LRU). Onthoudt per bronsleutel (bv. de
+    cachesleutel van een tekst) welke URL erbij hoort, dus bij een rerun
+    hoeven de bytes niet eens gelezen of gehasht te worden.
+    """
+
+    def __init__(self, store, url_prefix, max_entries=20000):
+        self.store = store
+        self.url_prefix = url_prefix.rstrip("/")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._urls = OrderedDict()  # bronsleutel -> content-hash
+
+    def _url(self, digest):
+        return f"{self.url_prefix}/{digest[:2]}/{digest}.mp3"
+
+    def publish(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self.store: self.store.touch(digest)
+        else: self.store.put(digest, data)
+        return self._url(digest)
+
+    def url_for(self, source_key, load):
+        """
+        URL voor source_key; load() levert de bytes alleen als die er nog niet
+        (of niet meer, na eviction) staan. None als load() niets oplevert.
+        """
+        with self._lock:
+            digest = self._urls.get(source_key)
+            if digest is not None: self._urls.move_to_end(source_key)
+        if digest is not None and digest in self.store:
+            self.store.touch(digest)  # de pagina gaat hem laden: niet meteen evicten
+            return self._url(digest)
+        data = load()
+        if not data: return None
+        url = self.publish(data)
+        with self._lock:
+            self._urls[source_key] = url.rsplit("/", 1)[1][:-4]
+            while len(self._urls) > self.max_entries: self._urls.popitem(last=False)
+        return url
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+
+
+class Prefetcher:
+    """
+    Achtergrond-pool die de volgende vraag alvast klaarzet.
+    Jobs hebben een sleutel (dubbel werk wordt overgeslagen) en een eigenaar
+    (de sessie), zodat ze bij een moduswissel geannuleerd kunnen worden.
+    """
+
+    def __init__(self, max_workers=2, max_pending=8):
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="eva-prefetch")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()  # key -> (owner, future)
+        self.counters = {"hits": 0, "misses": 0, "waits": 0, "dropped": 0, "cancelled": 0}
+
+    def submit(self, key, owner, fn, *args):
+        with self._lock:
+            if key in self._jobs: return False
+            self._prune()
+            pending = sum(1 for _, fut in self._jobs.values() if not fut.done())
+            if pending >= self.max_pending:
+                self.counters["dropped"] += 1
+                return False
+            self._jobs[key] = (owner, self._pool.submit(fn, *args))
+        return True
+
+    def claim(self, key, timeout=None):
+        """
+        Aanroepen als het item echt nodig is. Klaar = hit, nog bezig = wachten
+        op de lopende job in plaats van dubbel synthetiseren, onbekend = miss.
+        """
+        with self._lock:
+            job = self._jobs.pop(key, None)
+            if job is None:
+                self.counters["misses"] += 1
+                return False
+            fut = job[1]
+            self.counters["hits" if fut.done() else "waits"] += 1
+        if timeout != 0:
+            try: fut.result(timeout=timeout)
+            except Exception: pass
+        return True
+
+    def cancel(self, owner):
+        with self._lock:
+            for key in [k for k, (o, _) in self._jobs.items() if o == owner]:
+                _, fut = self._jobs.pop(key)
+                if fut.cancel(): self.counters["cancelled"] += 1
+
+    def _prune(self):
+        # Afgeronde maar nooit opgehaalde jobs niet eeuwig bewaren
+        done = [k for k, (_, fut) in self._jobs.items() if fut.done()]
+        for key in done[:max(0, len(done) - self.max_pending)]:
+            del self._jobs[key]
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, "pending": sum(1 for _, fut in self._jobs.values() if not fut.done())}
+
+
+# ----------------------------------------------------------------------
+# ZINNEN & MP3-FRAMES
+# ----------------------------------------------------------------------
+
+MAX_CHUNK_CHARS = 200
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_CLAUSE_END = re.compile(r'(?<=[,;:])\s+')
+
+def split_sentences(text, max_chars=MAX_CHUNK_CHARS):
+    """
+    Knipt tekst in zinnen; te lange zinnen worden verder op komma's geknipt.
+    Dezelfde zin geeft altijd hetzelfde stuk, dus ook dezelfde cachesleutel.
+    """
+    chunks = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence: continue
+        if len(sentence) <= max_chars:
+            chunks.append(sentence); continue
+        current = ""
+        for part in _CLAUSE_END.split(sentence):
+            if current and len(current) + len(part) + 1 > max_chars:
+                chunks.append(current); current = part
+            else:
+                current = f"{current} {part}".strip()
+        if current: chunks.append(current)
+    return chunks
+
+
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+def _parse_frame_header(data, pos):
+    # -> (framelengte, samples, samplerate) of None als hier geen geldige frame begint
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0: return None
+    version = (data[pos + 1] >> 3) & 3
+    layer = 4 - ((data[pos + 1] >> 1) & 3)
+    bitrate_idx = data[pos + 2] >> 4
+    rate_idx = (data[pos + 2] >> 2) & 3
+    padding = (data[pos + 2] >> 1) & 1
+    if version == 1 or layer == 4 or bitrate_idx in (0, 15) or rate_idx == 3: return None
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[(1 if mpeg1 else 2, layer)][bitrate_idx] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_idx]
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding, 576, sample_rate
+    return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+
+def _skip_id3v2(data, pos):
+    if data[pos:pos + 3] != b"ID3" or pos + 10 > len(data): return pos
+    size = 0
+    for b in data[pos + 6:pos + 10]: size = (size << 7) | (b & 0x7F)
+    footer = 10 if data[pos + 5] & 0x10 else 0
+    return pos + 10 + size + footer
+
+def iter_mp3_frames(data):
+    """
+    Loopt de audioframes af: (offset, lengte, samples, samplerate).
+    ID3-tags en Xing/Info/VBRI-headerframes worden overgeslagen; rommel
+    tussen frames wordt weggezocht tot de volgende geldige sync.
+    """
+    pos, end = 0, len(data)
+    if data[-128:-125] == b"TAG": end -= 128
+    first = True
+    while pos < end - 4:
+        nxt = _skip_id3v2(data, pos)
+        if nxt != pos: pos = nxt; continue
+        header = _parse_frame_header(data, pos)
+        if header is None or pos + header[0] > end:
+            pos += 1; continue
+        length, samples, rate = header
+        if first and any(tag in data[pos + 4:pos + 40] for tag in (b"Xing", b"Info", b"VBRI")):
+            first = False; pos += length; continue
+        first = False
+        yield pos, length, samples, rate
+        pos += length
+
+def mp3_duration(data):
+    # Som van samples/samplerate over alle frames: exact, ook bij VBR
+    return sum(samples / rate for _, _, samples, rate in iter_mp3_frames(data))
+
+def mp3_audio_frames(data):
+    return b"".join(data[off:off + length] for off, length, _, _ in iter_mp3_frames(data))
+
+
+class MixedSampleRates(ValueError):
+    pass
+
+def concat_mp3(parts):
+    """
+    Frames achter elkaar plakken: geen decode/encode, dus vrijwel gratis. Een
+    speler leest de samplerate uit de eerste frame, dus gemengd kan niet.
+    """
+    frames, rates = [], set()
+    for data in parts:
+        if not data: continue
+        for off, length, _, rate in iter_mp3_frames(data):
+            frames.append(data[off:off + length])
+            rates.add(rate)
+    if len(rates) > 1: raise MixedSampleRates(f"MP3-stukken met verschillende samplerates: {sorted(rates)}")
+    return b"".join(frames)
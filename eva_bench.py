@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+"""
+⏱️ EVA'S BENCHMARK
+-----------------------------------------------------
+Meet wat een klik kost: volledige reruns van main() via Streamlit's headless
+AppTest, op synthetische vragenbanken van verschillende grootte.
+- gTTS wordt vervangen door een deterministische lokale nep-TTS (geldige
+  MP3-frames, lengte naar aantal woorden), het netwerk staat uit.
+- Per bankgrootte een eigen subproces: schone caches en eerlijke piek-RSS.
+- Resultaat (p50/p95/max per scherm + piekgeheugen) gaat als JSON naar --out,
+  zodat versies met --compare naast elkaar gelegd kunnen worden.
+
+Gebruik:
+python eva_bench.py                          # 100, 10k en 100k vragen
+python eva_bench.py --sizes 100 10000 --out bench.json
+python eva_bench.py --compare vorige.json --out nieuw.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import types
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_FILE = os.path.join(APP_DIR, "eva_app.py")
+DEFAULT_SIZES = (100, 10_000, 100_000)
+CATEGORIES = ("Gevaarherkenning", "Kennis", "Inzicht")
+WORDS = ("auto", "fietser", "kruispunt", "voorrang", "remmen", "snelweg", "bord", "links", "rechts",
+         "inhalen", "afstand", "regen", "nacht", "voetganger", "bocht", "rotonde", "tram", "bus")
+
+
+# ----------------------------------------------------------------------
+# SYNTHETISCHE BANK & NEP-TTS
+# ----------------------------------------------------------------------
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize()
+
+def make_synthetic_bank(n, path, seed=42):
+    """
+    Schrijft een vragen.csv met n vragen in hetzelfde formaat als het echte bestand.
+    """
+    rng = random.Random(seed)
+    header = "id;category;timer;question;image_desc;opt1;opt2;opt3;answer;explanation;speech"
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(header + "\r\n")
+        for i in range(n):
+            opts = [_sentence(rng, rng.randint(1, 3)) + f" {i}-{k}" for k in range(3)]
+            row = [str(100000 + i), CATEGORIES[i % 3], str(rng.choice((8, 10, 15))),
+                   _sentence(rng, rng.randint(8, 20)) + "?", _sentence(rng, 8), *opts,
+                   rng.choice(opts), _sentence(rng, rng.randint(8, 25)) + ".", _sentence(rng, 10) + "."]
+            f.write(";".join(row) + "\r\n")
+    return path
+
+_FAKE_FRAME = bytes([0xFF, 0xF3, 0x44, 0xC4]) + b"\x00" * 92  # MPEG2 layer III, 32 kbps, 24 kHz
+
+class FakeTTS:
+    """
+    Zelfde interface als gTTS: ±0,4 s audio per woord, optioneel met vertraging.
+    """
+    latency = 0.0
+
+    def __init__(self, text, lang="nl", **kwargs):
+        self.text = text
+
+    def write_to_fp(self, fp):
+        if self.latency: time.sleep(self.latency)
+        fp.write(_FAKE_FRAME * (17 * max(1, len(self.text.split()))))
+
+    def save(self, path):
+        with open(path, "wb") as f: self.write_to_fp(f)
+
+def install_fakes(tts_latency=0.0):
+    # gTTS vervangen (ook als het pakket niet geïnstalleerd is) en netwerk uit
+    FakeTTS.latency = tts_latency
+    module = sys.modules.get("gtts") or types.ModuleType("gtts")
+    module.gTTS = FakeTTS
+    sys.modules["gtts"] = module
+
+    def no_network(*args, **kwargs):
+        raise urllib.error.URLError("benchmark: netwerk uit")
+    urllib.request.urlopen = no_network
+
+
+# ----------------------------------------------------------------------
+# SCENARIO
+# ----------------------------------------------------------------------
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered: return None
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+def summarize(samples):
+    return {"n": len(samples),
+            "p50_ms": round(_percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(_percentile(samples, 95) * 1000, 2),
+            "max_ms": round(max(samples) * 1000, 2)}
+
+def _click(at, label=None, key_prefix=None, index=0):
+    buttons = [b for b in at.button if (label is None or b.label == label) and (key_prefix is None or (b.key or "").startswith(key_prefix))]
+    buttons[index].click()
+
+def _timed_run(at, bucket, timings):
+    t = time.perf_counter()
+    at.run()
+    timings.setdefault(bucket, []).append(time.perf_counter() - t)
+    if at.exception: raise RuntimeError(f"{bucket}: {at.exception[0].message}")
+
+def run_scenario(size, questions=10, dashboard_reruns=10, timeout=600):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+    timings = {}
+    _timed_run(at, "cold_start", timings)
+    for _ in range(dashboard_reruns): _timed_run(at, "screen_dashboard", timings)
+
+    _click(at, "Start Oefenen"); _timed_run(at, "practice_start", timings)
+    for _ in range(questions):
+        _click(at, key_prefix="btn_"); _timed_run(at, "screen_practice_answer", timings)
+        _click(at, "Volgende ➡️"); _timed_run(at, "screen_practice_next", timings)
+
+    _click(at, "🏠"); _timed_run(at, "screen_dashboard", timings)
+    _click(at, "Examen Simulatie"); _timed_run(at, "exam_start", timings)
+    while at.session_state.mode == 'exam_active':
+        _click(at, key_prefix="ex_"); _timed_run(at, "screen_exam", timings)
+    for _ in range(3): _timed_run(at, "screen_exam_result", timings)
+    return {name: summarize(samples) for name, samples in timings.items()}
+
+def run_worker(size, args):
+    """
+    Eén bankgrootte in een schone werkmap; schrijft het resultaat als JSON naar stdout.
+    """
+    workdir = tempfile.mkdtemp(prefix=f"eva-bench-{size}-")
+    os.chdir(workdir)
+    os.environ["EVA_AUDIO_CACHE_DIR"] = os.path.join(workdir, "audio")
+    sys.path.insert(0, APP_DIR)
+    install_fakes(args.tts_latency_ms / 1000)
+    make_synthetic_bank(size, os.path.join(workdir, "vragen.csv"), seed=args.seed)
+    random.seed(args.seed)
+
+    screens = run_scenario(size, questions=args.questions, dashboard_reruns=args.reruns)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    json.dump({"screens": screens, "peak_rss_mb": round(peak_kb / 1024, 1)}, sys.stdout)
+
+
+# ----------------------------------------------------------------------
+# RAPPORT
+# ----------------------------------------------------------------------
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def print_report(results, baseline=None):
+    for size, res in results.items():
+        print(f"\n📊 {int(size):,} vragen — piek-RSS {res['peak_rss_mb']} MB")
+        for screen, s in res["screens"].items():
+            line = f"  {screen:<24} p50 {s['p50_ms']:>9.1f} ms   p95 {s['p95_ms']:>9.1f} ms   (n={s['n']})"
+            old = (((baseline or {}).get(size) or {}).get("screens") or {}).get(screen)
+            if old and old["p50_ms"]:
+                line += f"   p50 {s['p50_ms'] / old['p50_ms']:.2f}× t.o.v. baseline"
+            print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rerun-latency benchmark voor Eva's Theorie")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--questions", type=int, default=10, help="aantal oefenvragen per run")
+    parser.add_argument("--reruns", type=int, default=10, help="dashboard-reruns per run")
+    parser.add_argument("--tts-latency-ms", type=float, default=0.0, help="gesimuleerde TTS-vertraging")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="eerder resultaatbestand om tegen te vergelijken")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args.worker, args); return
+
+    results = {}
+    for size in args.sizes:
+        print(f"⏳ {size:,} vragen...", file=sys.stderr)
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", str(size), "--questions", str(args.questions),
+               "--reruns", str(args.reruns), "--tts-latency-ms", str(args.tts_latency_ms), "--seed", str(args.seed)]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr[-2000:], file=sys.stderr)
+            raise SystemExit(f"❌ benchmark voor {size} vragen mislukt")
+        results[str(size)] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    report = {"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "git": _git_revision(),
+                       "python": platform.python_version(), "platform": platform.platform(),
+                       "questions": args.questions, "reruns": args.reruns, "tts_latency_ms": args.tts_latency_ms},
+              "results": results}
+    with open(args.out, "w") as f: json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f: baseline = json.load(f).get("results")
+    print_report(results, baseline)
+    print(f"\n✅ Resultaten → {args.out}")
+
+if __name__ == "__main__":
+    main()
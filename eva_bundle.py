@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+"""
+📦 EVA'S OFFLINE BUNDEL
+-----------------------------------------------------
+Compileert de vragenbank naar een statische map die zonder server werkt:
+- data.json: alle vragen (tekst, opties, antwoord, uitleg, timer) plus de
+  examenregels en papa's feedbackstukken.
+- audio/: vraag-, uitleg- en feedback-MP3's, met een content-hash als naam.
+  Komt uit dezelfde audiocache en TTS-keten als de app, dus wat de app al
+  gemaakt heeft kost hier niets.
+- images/: de voorgerenderde plaatjes (static/images) of een provider.
+- index.html + app.js: oefenen, Foutenbak en examen in de browser;
+  voortgang in localStorage. Feedback = intro en uitleg achter elkaar afgespeeld.
+- sw.js + manifest: service worker die de hele bundel vooraf cachet, dus na
+  één keer openen werkt alles offline (ook als app op het beginscherm).
+
+Gebruik:
+python eva_bundle.py --out bundle
+python eva_bundle.py --out bundle --images placeholder --tts silent
+python -m http.server -d bundle 8000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from eva_audio import AudioStore, split_sentences, concat_mp3, mp3_duration, MixedSampleRates
+from eva_data import QuestionBank, read_question_csv, effective_quotas, EXAM_SIZE, EXAM_PASS_SCORE, EXAM_QUOTAS
+from eva_images import PROVIDERS, compress_image, image_path
+from eva_progress import GRADUATE_STREAK, ReviewSchedule
+from eva_speech import FEEDBACK_TOO_LATE, FEEDBACK_CORRECT, FEEDBACK_WRONG, FEEDBACK_WRONG_SUFFIX
+from eva_tts import TTSChain
+
+CLIENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bundle_client")
+CLIENT_FILES = ("index.html", "app.js", "manifest.webmanifest")
+DEFAULT_LANG = "nl"
+
+
+# --- AUDIO ---
+
+def clip_audio(store, tts, text, lang=DEFAULT_LANG):
+    """
+    Zelfde cachesleutels als de app: eerst de hele clip, anders per zin
+    (uit de cache of via de TTS-keten) en dan op frameniveau plakken. Komen de
+    zinnen uit verschillende stemmen, dan de hele clip in één call.
+    """
+    data = store.get(store.make_key(text, lang, tts.primary))
+    if data is not None: return data
+    parts = []
+    for chunk in split_sentences(text) or [text]:
+        part = store.get(store.make_key(chunk, lang, tts.primary))
+        if part is None:
+            part, engine = tts.synthesize(chunk, lang, cached=lambda name: store.get(store.make_key(chunk, lang, name)))
+            if part is not None and store.make_key(chunk, lang, engine) not in store:
+                store.put(store.make_key(chunk, lang, engine), part)
+        if part: parts.append(part)
+    try:
+        return concat_mp3(parts) or None
+    except MixedSampleRates:
+        data, engine = tts.synthesize(text, lang, cached=lambda name: store.get(store.make_key(text, lang, name)))
+        if data is not None: store.put(store.make_key(text, lang, engine), data)
+        return data
+
+class AudioWriter:
+    """
+    Schrijft elke unieke tekst één keer naar audio/<hash>.mp3 en onthoudt de naam.
+    """
+
+    def __init__(self, out_dir, store, tts, workers=4, lang=DEFAULT_LANG):
+        self.folder = os.path.join(out_dir, "audio")
+        self.store, self.tts, self.lang = store, tts, lang
+        self.workers = workers
+        self.files = {}  # tekst -> {"src": ..., "duration": ...} of None
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _build(self, text):
+        data = clip_audio(self.store, self.tts, text, self.lang)
+        if not data: return text, None
+        name = f"audio/{hashlib.sha256(data).hexdigest()[:16]}.mp3"
+        path = os.path.join(os.path.dirname(self.folder), name)
+        if not os.path.exists(path):
+            with open(path, "wb") as f: f.write(data)
+        return text, {"src": name, "duration": round(mp3_duration(data), 2)}
+
+    def build_all(self, texts):
+        todo = [t for t in dict.fromkeys(texts) if t and t not in self.files]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for text, entry in pool.map(self._build, todo):
+                self.files[text] = entry
+        return sum(1 for t in todo if self.files.get(t))
+
+    def __getitem__(self, text):
+        return self.files.get(text)
+
+
+# --- PLAATJES ---
+
+def bundle_image(question, out_dir, provider=None):
+    target = os.path.join(out_dir, "images", f"{question.id}.jpg")
+    if os.path.exists(image_path(question.id)):
+        shutil.copyfile(image_path(question.id), target)
+    elif provider is not None:
+        try:
+            with open(target, "wb") as f: f.write(compress_image(provider.fetch(question)))
+        except Exception as e:
+            print(f"⚠️ plaatje {question.id}: {e}")
+            return None
+    else:
+        return None
+    return f"images/{question.id}.jpg"
+
+
+# --- BUNDEL ---
+
+def review_days():
+    # Dagen tot een fout weer aan de beurt is na 1, 2, ... keer goed: zelfde schema als de app
+    srs, days = ReviewSchedule(), []
+    srs.review("q", False, 0)
+    for _ in range(GRADUATE_STREAK - 1):
+        srs.review("q", True, 0)
+        days.append(srs["q"][0])
+    return days
+
+def _feedback_entry(audio, text):
+    return {"text": text, "audio": audio[text]}
+
+def build_bundle(bank, out_dir, store, tts, image_provider=None, with_audio=True, workers=4):
+    os.makedirs(os.path.join(out_dir, "images"), exist_ok=True)
+    audio = AudioWriter(out_dir, store, tts, workers)
+    questions = list(bank.by_id.values())
+
+    if with_audio and tts.available:
+        texts = [FEEDBACK_TOO_LATE, FEEDBACK_WRONG_SUFFIX, *FEEDBACK_CORRECT, *FEEDBACK_WRONG]
+        texts += [q.speech_question for q in questions] + [q.speech_explanation for q in questions]
+        print(f"🔊 {audio.build_all(texts)} clips")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        images = dict(zip((q.id for q in questions), pool.map(lambda q: bundle_image(q, out_dir, image_provider), questions)))
+
+    data = {
+        "generated": time.strftime("%Y-%m-%d %H:%M"),
+        "exam": {"size": EXAM_SIZE, "pass_score": EXAM_PASS_SCORE,
+                 "quotas": effective_quotas({c: len(ids) for c, ids in bank.by_category.items()}, EXAM_QUOTAS, EXAM_SIZE)},
+        "categories": sorted(bank.by_category),
+        "graduate_streak": GRADUATE_STREAK,
+        "review_days": review_days(),
+        "feedback": {"too_late": _feedback_entry(audio, FEEDBACK_TOO_LATE),
+                     "wrong_suffix": _feedback_entry(audio, FEEDBACK_WRONG_SUFFIX),
+                     "correct": [_feedback_entry(audio, t) for t in FEEDBACK_CORRECT],
+                     "wrong": [_feedback_entry(audio, t) for t in FEEDBACK_WRONG]},
+        "questions": [{"id": q.id, "category": q.category, "timer": q.timer, "question": q.question,
+                       "options": q.options(), "answer": q.answer, "explanation": q.explanation,
+                       "audio": {"question": audio[q.speech_question], "explanation": audio[q.speech_explanation]},
+                       "image": images.get(q.id)} for q in questions],
+    }
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    with open(os.path.join(out_dir, "data.json"), "wb") as f: f.write(payload)
+
+    for name in CLIENT_FILES:
+        shutil.copyfile(os.path.join(CLIENT_DIR, name), os.path.join(out_dir, name))
+    write_service_worker(out_dir)
+    return len(questions)
+
+def write_service_worker(out_dir):
+    """
+    sw.js met de volledige precache-lijst; de versie is een hash over alle
+    bestanden, dus een nieuwe export ververst de cache op de telefoon.
+    """
+    files, digest = [], hashlib.sha256()
+    for root, _, names in os.walk(out_dir):
+        for name in sorted(names):
+            if name == "sw.js": continue
+            rel = os.path.relpath(os.path.join(root, name), out_dir).replace(os.sep, "/")
+            files.append(rel)
+            with open(os.path.join(root, name), "rb") as f: digest.update(rel.encode() + f.read())
+    files.sort()
+    with open(os.path.join(CLIENT_DIR, "sw.js"), "r", encoding="utf-8") as f: template = f.read()
+    sw = template.replace("__VERSION__", f"eva-{digest.hexdigest()[:12]}").replace("__PRECACHE__", json.dumps(["./", *files]))
+    with open(os.path.join(out_dir, "sw.js"), "w", encoding="utf-8") as f: f.write(sw)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline bundel (HTML + audio + plaatjes) exporteren")
+    parser.add_argument("--csv", default="vragen.csv")
+    parser.add_argument("--out", default="bundle")
+    parser.add_argument("--images", choices=["local", *sorted(PROVIDERS)], default="local",
+                        help="local = alleen wat eva_images.py al gerenderd heeft")
+    parser.add_argument("--tts", default=os.environ.get("EVA_TTS_BACKENDS", "gtts,espeak"), help="TTS-backends op volgorde")
+    parser.add_argument("--no-audio", action="store_true")
+    parser.add_argument("--audio-cache", default=os.environ.get("EVA_AUDIO_CACHE_DIR", ".audio_cache"))
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    bank = QuestionBank(read_question_csv(args.csv))
+    store = AudioStore(args.audio_cache, 1 << 40)  # export: niets uit de cache gooien
+    tts = TTSChain.from_names(args.tts.split(","))
+    provider = None if args.images == "local" else PROVIDERS[args.images]()
+    n = build_bundle(bank, args.out, store, tts, provider, with_audio=not args.no_audio, workers=args.workers)
+    print(f"✅ {n} vragen → {args.out} (serveer met: python -m http.server -d {args.out})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+# -*- coding: utf-8 -*-
+
+"""
+📚 EVA'S VRAGENBANK
+-----------------------------------------------------
+Gecompileerde index over vragen.csv, één keer opgebouwd bij het laden.
+- by_id: id -> Question (compact object met __slots__), O(1) opzoeken.
+- by_category: categorie -> tuple met ids, zodat een sessie bouwen O(k) is
+  in plaats van een volledige DataFrame-scan per rerun.
+- Binaire cache: vragen.csv wordt gecompileerd naar een getypeerd Arrow-bestand
+  (timers als int, categorie als dictionary, tekst memory-mappable), mét de
+  voorleesteksten erbij: die worden één keer bij het compileren gemaakt.
+  De Question-objecten komen direct uit de Arrow-kolommen, zonder DataFrame.
+  Opnieuw compileren gebeurt alleen als mtime/grootte én hash van de CSV
+  wijzigen, of als de uitspraakregels (fingerprint) anders zijn.
+- BankWatcher: ziet wijzigingen in vragen.csv terwijl de app draait, diff't op id
+  en meldt alleen de toegevoegde / gewijzigde / verwijderde vragen door.
+  Ongewijzigde vragen worden uit de vorige bank hergebruikt; alleen nieuwe en
+  gewijzigde rijen gaan door de normalizer. De diffs van de laatste
+  HISTORY_VERSIONS versies blijven bewaard; wie verder achterloopt, resynct volledig.
+- ExamPool: genereert examens per categorie-quotum in bulk (numpy, zonder
+  rejection sampling) en houdt een voorraad klaar waar een examenstart uit pakt.
+  Recent geziene vragen worden bij het trekken vervangen door andere uit
+  dezelfde categorie, zolang die er genoeg zijn.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import eva_metrics
+from eva_speech import default_normalizer
+
+log = logging.getLogger(__name__)
+
+QUESTION_FIELDS = ("id", "category", "timer", "question", "image_desc",
+                   "opt1", "opt2", "opt3", "answer", "explanation", "speech")
+SPEECH_FIELDS = ("speech_question", "speech_explanation")  # afgeleid bij het compileren, niet uit de CSV
+DEFAULT_TIMER = 15
+EXAM_SIZE = 25
+EXAM_PASS_SCORE = 18
+# Verhouding zoals bij het CBR (25 / 12 / 28 van 65), teruggeschaald naar 25 vragen
+EXAM_QUOTAS = {"Gevaarherkenning": 10, "Kennis": 5, "Inzicht": 10}
+MAX_RANDOM_CELLS = 4_000_000  # begrenst het geheugen van één batch random keys
+INT_COLUMNS = {"timer": pa.int16()}
+CACHE_FORMAT = b"2"  # 2: ids altijd als tekst ("007" blijft "007")
+HISTORY_VERSIONS = 64  # bewaarde diffs voor removed_since
+CATEGORY_COLUMNS = ("category",)
+
+
+class Question:
+    __slots__ = QUESTION_FIELDS + SPEECH_FIELDS
+
+    def __init__(self, **values):
+        for field in self.__slots__:
+            setattr(self, field, values.get(field, ""))
+
+    # Dict-achtige toegang, zodat bestaande code met row['question'] blijft werken
+    def __getitem__(self, key):
+        try: return getattr(self, key)
+        except AttributeError: raise KeyError(key)
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None)
+        return default if value in (None, "") else value
+
+    def options(self):
+        return [o for o in (self.opt1, self.opt2, self.opt3) if o]
+
+    def as_tuple(self):
+        return tuple(getattr(self, f) for f in QUESTION_FIELDS)
+
+    def __repr__(self):
+        return f"Question({self.id!r}, {self.category!r})"
+
+
+def _parse_timer(value):
+    try: return int(float(value))
+    except (TypeError, ValueError): return DEFAULT_TIMER
+
+
+def _text_column(table, name):
+    # Arrow-kolom (tekst, int of dictionary) -> lijst nette Python-strings
+    if name not in table.column_names: return [""] * table.num_rows
+    column = pc.fill_null(pc.cast(table.column(name), pa.string()), "")
+    return pc.utf8_trim_whitespace(column).to_pylist()
+
+def speech_columns(text, normalizer=None):
+    # Voorleesteksten in één keer voor alle rijen; text = veld -> lijst nette strings
+    normalizer = normalizer or default_normalizer()
+    text = {c: pd.Series(text[c], dtype="string") for c in ("question", "opt1", "opt2", "opt3", "explanation")}
+    return {"speech_question": normalizer.question_scripts(text["question"], text["opt1"], text["opt2"], text["opt3"]).tolist(),
+            "speech_explanation": normalizer.normalize_series(text["explanation"]).tolist()}
+
+def _set_speech_columns(table, columns):
+    for name in SPEECH_FIELDS:
+        if name in table.column_names: table = table.drop_columns([name])
+        table = table.append_column(name, pa.array(columns[name], type=pa.string()))
+    return table
+
+def add_speech_columns(table, normalizer=None):
+    text = {c: _text_column(table, c) for c in ("question", "opt1", "opt2", "opt3", "explanation")}
+    return _set_speech_columns(table, speech_columns(text, normalizer))
+
+def bank_speech_columns(table, bank):
+    # Voorleesteksten uit een al gebouwde bank aan de ruwe tabel hangen (voor de cache)
+    questions = [bank.by_id.get(qid) for qid in _text_column(table, "id")]
+    return _set_speech_columns(table, {name: [getattr(q, name) if q else "" for q in questions] for name in SPEECH_FIELDS})
+
+
+class QuestionBank:
+    """
+    Gebouwd uit een gecompileerde Arrow-tabel (zie compile_question_table);
+    een DataFrame met strings mag ook, die wordt eerst gecompileerd.
+    Zonder SPEECH_FIELDS in de tabel worden de voorleesteksten hier gemaakt,
+    behalve voor vragen die ongewijzigd in `previous` staan: die worden hergebruikt.
+    """
+
+    def __init__(self, table, normalizer=None, previous=None):
+        if isinstance(table, pd.DataFrame): table = compile_raw_table(table)
+        with_speech = set(SPEECH_FIELDS) <= set(table.column_names)
+        self.by_id = {}
+        self.reused = 0
+        cats = {}
+        pending = []  # nieuwe of gewijzigde rijen die nog voorleesteksten nodig hebben
+        if table.num_rows:
+            fields = QUESTION_FIELDS + (SPEECH_FIELDS if with_speech else ())
+            values = [table.column("timer").to_pylist() if f == "timer" and f in table.column_names else _text_column(table, f)
+                      for f in fields]
+            for row in zip(*values):
+                rec = dict(zip(fields, row))
+                rec["timer"] = _parse_timer(rec["timer"])
+                qid = rec["id"]
+                if not qid or qid in self.by_id: continue  # eerste wint, net als .iloc[0]
+                old = previous.by_id.get(qid) if previous is not None else None
+                if old is not None and old.as_tuple() == tuple(rec[f] for f in QUESTION_FIELDS):
+                    self.by_id[qid] = old
+                    self.reused += 1
+                elif with_speech:
+                    self.by_id[qid] = Question(**rec)
+                else:
+                    self.by_id[qid] = None  # plek vasthouden: de volgorde van by_id is die van de CSV
+                    pending.append(rec)
+                cats.setdefault(rec["category"], []).append(qid)
+        if pending:
+            speech = speech_columns({c: [rec[c] for rec in pending] for c in ("question", "opt1", "opt2", "opt3", "explanation")}, normalizer)
+            for rec, sq, se in zip(pending, speech["speech_question"], speech["speech_explanation"]):
+                self.by_id[rec["id"]] = Question(**rec, speech_question=sq, speech_explanation=se)
+        self.by_category = {cat: tuple(ids) for cat, ids in cats.items()}
+        self.ids = tuple(self.by_id)
+        self.fingerprint = hashlib.sha1("\0".join(f"{q.id}\1{q.category}" for q in self.by_id.values()).encode("utf-8")).hexdigest()
+
+    @property
+    def empty(self):
+        return not self.by_id
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, qid):
+        return str(qid) in self.by_id
+
+    def get(self, qid):
+        return self.by_id.get(str(qid))
+
+    def ids_for_categories(self, categories):
+        # Zelfde semantiek als vroeger: categorie telt mee als een gekozen naam erin voorkomt
+        ids = []
+        for cat, cat_ids in self.by_category.items():
+            if any(c in cat for c in categories): ids.extend(cat_ids)
+        return ids
+
+    def filter_valid(self, ids):
+        return [qid for qid in ids if str(qid) in self.by_id]
+
+
+
+# ----------------------------------------------------------------------
+# INLEZEN & BINAIRE CACHE
+# ----------------------------------------------------------------------
+
+def read_question_csv(path):
+    df = pd.read_csv(path, sep=';', dtype=str)
+    df.columns = [c.strip().lower() for c in df.columns]
+    return df
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""): h.update(block)
+    return h.hexdigest()
+
+def compile_raw_table(df):
+    """
+    DataFrame met strings -> getypeerde Arrow-tabel, zonder SPEECH_FIELDS. Ids
+    blijven tekst zoals ze in de CSV staan (voortgang is op die tekst gesleuteld);
+    een lege of rare timer wordt DEFAULT_TIMER.
+    """
+    arrays, names = [], []
+    for col in df.columns:
+        series = df[col]
+        if col == "timer":
+            timers = pd.to_numeric(series, errors="coerce").fillna(DEFAULT_TIMER).astype("int64")
+            arrays.append(pa.array(timers, type=INT_COLUMNS["timer"]))
+        elif col in CATEGORY_COLUMNS:
+            arrays.append(pa.array(series.astype(object).where(series.notna(), None), type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(series.astype(object).where(series.notna(), None), type=pa.string()))
+        names.append(col)
+    return pa.Table.from_arrays(arrays, names=names)
+
+def compile_question_table(df, normalizer=None):
+    return add_speech_columns(compile_raw_table(df), normalizer)
+
+def _source_meta(csv_path, sha=None, normalizer=None):
+    st = os.stat(csv_path)
+    return {b"source_mtime_ns": str(st.st_mtime_ns).encode(), b"source_size": str(st.st_size).encode(),
+            b"source_sha256": (sha or file_sha256(csv_path)).encode(),
+            b"speech_fingerprint": (normalizer or default_normalizer()).fingerprint.encode(), b"format": CACHE_FORMAT}
+
+def write_compiled(table, out_path, meta):
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    table = table.replace_schema_metadata(meta)
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer: writer.write_table(table)
+    os.replace(tmp, out_path)
+
+def compile_bank(csv_path, out_path, normalizer=None):
+    meta = _source_meta(csv_path, normalizer=normalizer)
+    table = compile_question_table(read_question_csv(csv_path), normalizer)
+    write_compiled(table, out_path, meta)
+    return table
+
+def _open_compiled(path):
+    # Memory-mapped: tekstkolommen worden pas gelezen als ze nodig zijn, en
+    # meerdere workers delen dezelfde pagina's uit de OS-cache
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+def load_compiled_table(csv_path, cache_path, normalizer=None):
+    """
+    Gecompileerde tabel als die nog bij de CSV, het cacheformaat en de
+    uitspraakregels hoort, anders opnieuw compileren. Eerst goedkoop (mtime + grootte), bij twijfel de hash.
+    """
+    try:
+        table = _open_compiled(cache_path)
+        meta = table.schema.metadata or {}
+        if (meta.get(b"format") != CACHE_FORMAT
+                or meta.get(b"speech_fingerprint") != (normalizer or default_normalizer()).fingerprint.encode()):
+            return compile_bank(csv_path, cache_path, normalizer)
+        st = os.stat(csv_path)
+        if meta.get(b"source_mtime_ns") == str(st.st_mtime_ns).encode() and meta.get(b"source_size") == str(st.st_size).encode():
+            return table
+        sha = file_sha256(csv_path)
+        if meta.get(b"source_sha256") == sha.encode():
+            # Alleen aangeraakt (checkout, kopie): metadata bijwerken, niet hercompileren
+            write_compiled(table, cache_path, _source_meta(csv_path, sha, normalizer))
+            return table
+    except (OSError, pa.ArrowInvalid):
+        pass
+    return compile_bank(csv_path, cache_path, normalizer)
+
+def load_question_table(csv_path, cache_path):
+    try:
+        return load_compiled_table(csv_path, cache_path)
+    except (OSError, pa.ArrowException):
+        # Cache niet schrijfbaar o.i.d.: dan maar direct de CSV
+        return compile_question_table(read_question_csv(csv_path))
+
+
+
+# ----------------------------------------------------------------------
+# HOT RELOAD
+# ----------------------------------------------------------------------
+
+class BankDiff:
+    __slots__ = ("added", "removed", "changed")
+
+    def __init__(self, added=(), removed=(), changed=()):
+        self.added, self.removed, self.changed = set(added), set(removed), set(changed)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return f"BankDiff(+{len(self.added)} -{len(self.removed)} ~{len(self.changed)})"
+
+def diff_banks(old, new):
+    old_ids, new_ids = set(old.by_id), set(new.by_id)
+    # Hergebruikte Question-objecten zijn per definitie ongewijzigd
+    changed = {qid for qid in old_ids & new_ids
+               if old.by_id[qid] is not new.by_id[qid] and old.by_id[qid].as_tuple() != new.by_id[qid].as_tuple()}
+    return BankDiff(new_ids - old_ids, old_ids - new_ids, changed)
+
+
+class BankWatcher:
+    """
+    Houdt de actuele QuestionBank vast en pollt de CSV (mtime + grootte).
+    Bij een wijziging: nieuwe bank bouwen, diffen, en on_change(diff, oud, nieuw)
+    aanroepen, zodat alleen caches van echt gewijzigde vragen weg hoeven.
+    Er wordt pas herladen als mtime en grootte twee polls achter elkaar gelijk
+    zijn: een editor die ter plekke opslaat, laat anders een half bestand zien
+    dat gewoon parst, alleen met rijen te weinig. Onleesbare versies worden genegeerd.
+    """
+
+    def __init__(self, csv_path, cache_path, on_change=None, interval=2.0):
+        self.csv_path = csv_path
+        self.cache_path = cache_path
+        self.on_change = on_change
+        self.interval = interval
+        self.version = 0
+        self._history = deque(maxlen=HISTORY_VERSIONS)  # (versie, BankDiff)
+        self._lock = threading.Lock()
+        self._stamp = self._stat()
+        self._pending = None  # gewijzigde stamp die nog één poll stil moet staan
+        self.bank = self._build() or QuestionBank(pd.DataFrame())
+        threading.Thread(target=self._poll, daemon=True, name="eva-bank-watcher").start()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.csv_path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _build(self, previous=None):
+        if not os.path.exists(self.csv_path): return None
+        try:
+            if previous is None:
+                bank = QuestionBank(load_question_table(self.csv_path, self.cache_path))
+            else:
+                meta = _source_meta(self.csv_path)
+                table = compile_raw_table(read_question_csv(self.csv_path))
+                bank = QuestionBank(table, previous=previous)
+                if not bank.empty: self._write_cache(bank_speech_columns(table, bank), meta)
+        except Exception as e:
+            eva_metrics.count("eva_bank_reload_failures_total", error=type(e).__name__)
+            log.warning("Vragenbank %s niet geladen", self.csv_path, exc_info=True)
+            return None
+        if bank.empty:
+            eva_metrics.count("eva_bank_reload_failures_total", error="Empty")
+            log.warning("Vragenbank %s is leeg, niet geladen", self.csv_path)
+            return None
+        return bank
+
+    def _write_cache(self, table, meta):
+        # Zodat de volgende koude start de nieuwe versie meteen uit de cache haalt
+        try: write_compiled(table, self.cache_path, meta)
+        except (OSError, pa.ArrowException): pass
+
+    def _poll(self):
+        while True:
+            time.sleep(self.interval)
+            try: self.check()
+            except Exception:
+                eva_metrics.count("eva_bank_watcher_errors_total")
+                log.exception("Bank-watcher: fout bij het verwerken van %s", self.csv_path)
+
+    def check(self):
+        stamp = self._stat()
+        if stamp == self._stamp:
+            self._pending = None
+            return None
+        if stamp != self._pending:
+            self._pending = stamp  # nog aan het schrijven? volgende poll nog eens kijken
+            return None
+        self._pending = None
+        self._stamp = stamp
+        return self.reload()
+
+    def reload(self):
+        new = self._build(self.bank)
+        if new is None: return None
+        with self._lock:
+            old = self.bank
+            diff = diff_banks(old, new)
+            if not diff: return diff
+            self.bank = new
+            self.version += 1
+            self._history.append((self.version, diff))
+        if self.on_change: self.on_change(diff, old, new)
+        return diff
+
+    def removed_since(self, version):
+        """
+        Ids die sinds `version` verdwenen zijn (en niet later teruggekomen).
+        None als `version` ouder is dan de bewaarde diffs: dan volledig resyncen.
+        """
+        removed = set()
+        with self._lock:
+            if version < self.version - len(self._history): return None
+            for v, diff in self._history:
+                if v <= version: continue
+                removed |= diff.removed
+                removed -= diff.added
+        return removed
+
+
+def effective_quotas(available, quotas, size):
+    """
+    Quota per categorie, begrensd op wat er in de bank zit. Een tekort wordt
+    aangevuld uit categorieën met de meeste ruimte over, zodat het examen
+    altijd `size` vragen heeft (zolang de bank groot genoeg is).
+    """
+    result = {cat: min(quotas.get(cat, 0), n) for cat, n in available.items()}
+    missing = min(size, sum(available.values())) - sum(result.values())
+    while missing > 0:
+        spare = {cat: available[cat] - result[cat] for cat in available if available[cat] > result[cat]}
+        if not spare: break
+        for cat in sorted(spare, key=spare.get, reverse=True):
+            if missing == 0: break
+            result[cat] += 1; missing -= 1
+    return {cat: q for cat, q in result.items() if q > 0}
+
+
+class ExamPool:
+    def __init__(self, bank, quotas, size, target=200, low_water=50, seed=None):
+        self.size = size
+        self.target = target
+        self.low_water = low_water
+        self._rng = np.random.default_rng(seed)
+        self._ids = np.array(bank.ids, dtype=object)
+        self._position = {qid: i for i, qid in enumerate(bank.ids)}
+        self._cat_index = {cat: np.array([self._position[q] for q in ids], dtype=np.int32) for cat, ids in bank.by_category.items()}
+        self._cats = list(self._cat_index)
+        self._cat_of = np.zeros(len(bank.ids), dtype=np.int32)
+        for code, cat in enumerate(self._cats): self._cat_of[self._cat_index[cat]] = code
+        self.quotas = effective_quotas({c: len(ix) for c, ix in self._cat_index.items()}, quotas, size)
+        self._pool = deque()
+        self._lock = threading.Lock()
+        self._rng_lock = threading.Lock()  # Generator is niet thread-safe; refill draait in de achtergrond
+        self._refilling = False
+
+    def generate(self, n):
+        """
+        n examens tegelijk: per categorie een (n, m) matrix random keys en
+        argpartition pakt per rij de q kleinste. Geen lussen per examen.
+        """
+        with self._rng_lock: return self._generate(n)
+
+    def _generate(self, n):
+        parts = []
+        for cat, q in self.quotas.items():
+            idx = self._cat_index[cat]
+            m = len(idx)
+            if q >= m:
+                parts.append(np.tile(idx, (n, 1))); continue
+            rows = max(1, MAX_RANDOM_CELLS // m)
+            picks = []
+            for start in range(0, n, rows):
+                keys = self._rng.random((min(rows, n - start), m))
+                picks.append(idx[np.argpartition(keys, q - 1, axis=1)[:, :q]])
+            parts.append(np.concatenate(picks))
+        exams = np.concatenate(parts, axis=1)
+        return self._rng.permuted(exams, axis=1)
+
+    def refill(self):
+        with self._lock:
+            need = self.target - len(self._pool)
+        if need > 0:
+            batch = self.generate(need)
+            with self._lock: self._pool.extend(batch)
+        with self._lock: self._refilling = False
+
+    def _refill_in_background(self):
+        with self._lock:
+            if self._refilling or len(self._pool) > self.low_water: return
+            self._refilling = True
+        threading.Thread(target=self.refill, daemon=True).start()
+
+    def _avoid_recent(self, exam, recent):
+        # Recente vragen per categorie vervangen door niet-recente die nog niet in het examen zitten
+        recent_pos = [self._position[q] for q in recent if q in self._position]
+        hits = np.flatnonzero(np.isin(exam, recent_pos))
+        if not len(hits): return exam
+        exam = exam.copy()
+        blocked = np.union1d(exam, recent_pos)
+        for code in np.unique(self._cat_of[exam[hits]]):
+            slots = hits[self._cat_of[exam[hits]] == code]
+            idx = self._cat_index[self._cats[code]]
+            free = idx[~np.isin(idx, blocked)]
+            k = min(len(slots), len(free))
+            if k == 0: continue
+            with self._rng_lock: exam[slots[:k]] = self._rng.choice(free, k, replace=False)
+        return exam
+
+    def draw(self, recent=(), candidates=4):
+        """
+        Pakt een examen uit de voorraad (O(1)). Van een paar kandidaten wint
+        die met de minste overlap met recent geziene vragen; wat dan nog recent
+        is, wordt vervangen (zie _avoid_recent).
+        """
+        recent = set(recent)
+        with self._lock:
+            if len(self._pool) < candidates:
+                # Onder de lock: een gelijktijdige draw kan de voorraad niet tussendoor leegtrekken
+                self._pool.extend(self.generate(max(candidates, self.target - len(self._pool))))
+            options = [self._pool.popleft() for _ in range(candidates)]
+            best = min(range(len(options)), key=lambda i: sum(q in recent for q in self._ids[options[i]])) if recent else 0
+            for i, exam in enumerate(options):
+                if i != best: self._pool.append(exam)
+        exam = self._avoid_recent(options[best], recent) if recent else options[best]
+        self._refill_in_background()
+        return [str(q) for q in self._ids[exam]]
+
+
+if __name__ == "__main__":
+    # Deploy-stap: python eva_data.py [vragen.csv] [vragen.arrow]
+    import sys
+    src = sys.argv[1] if len(sys.argv) > 1 else "vragen.csv"
+    out = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + ".arrow"
+    table = compile_bank(src, out)
+    print(f"✅ {table.num_rows} vragen gecompileerd → {out}")
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""
+🖼️ EVA'S PLAATJES
+-----------------------------------------------------
+Offline build-stap voor de scenario-afbeeldingen.
+Elke vraag krijgt één keer een plaatje via een provider, dat verkleind en
+gecomprimeerd wordt opgeslagen als static/images/<id>.jpg. De app serveert
+die daarna lokaal (app/static/images/...) i.p.v. bij elke weergave de
+externe generator aan te roepen.
+
+Providers:
+- pollinations: de AI-generator die de app vroeger live gebruikte.
+- placeholder:  lokaal, deterministisch, geen netwerk (tests / offline).
+
+Gebruik:
+python eva_images.py --provider pollinations
+python eva_images.py --provider placeholder --force
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw, ImageOps
+
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "images")
+IMAGE_URL_PREFIX = "app/static/images"
+IMAGE_SIZE = (600, 400)
+IMAGE_QUALITY = 78
+DEFAULT_PROMPT = "traffic situation car netherlands"
+MANIFEST_NAME = "manifest.json"
+
+
+def image_prompt(question):
+    return question.get('image_desc', DEFAULT_PROMPT)
+
+def pollinations_url(prompt, size=IMAGE_SIZE):
+    return f"https://image.pollinations.ai/prompt/driver%20view%20inside%20car%20{urllib.parse.quote(prompt)}?width={size[0]}&height={size[1]}&nologo=true"
+
+def image_path(qid, folder=IMAGE_DIR):
+    return os.path.join(folder, f"{qid}.jpg")
+
+def image_url(qid):
+    return f"{IMAGE_URL_PREFIX}/{qid}.jpg"
+
+def prompt_hash(question):
+    return hashlib.sha1(image_prompt(question).encode("utf-8")).hexdigest()[:16]
+
+
+# --- PROVIDERS ---
+
+class PollinationsProvider:
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+
+    def fetch(self, question):
+        with urllib.request.urlopen(pollinations_url(image_prompt(question)), timeout=self.timeout) as resp:
+            return resp.read()
+
+
+class PlaceholderProvider:
+    """
+    Lokale stand-in: effen kleur afgeleid van de prompt, met categorie en id erop.
+    """
+
+    def fetch(self, question):
+        digest = hashlib.sha1(image_prompt(question).encode("utf-8")).digest()
+        img = Image.new("RGB", IMAGE_SIZE, (64 + digest[0] // 2, 64 + digest[1] // 2, 64 + digest[2] // 2))
+        draw = ImageDraw.Draw(img)
+        draw.text((20, 20), f"{question.get('category', '')} #{question.get('id', '')}", fill=(255, 255, 255))
+        draw.text((20, 50), image_prompt(question)[:80], fill=(230, 230, 230))
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        return buf.getvalue()
+
+
+PROVIDERS = {"pollinations": PollinationsProvider, "placeholder": PlaceholderProvider}
+
+
+# --- BUILD ---
+
+def compress_image(raw, size=IMAGE_SIZE, quality=IMAGE_QUALITY):
+    img = Image.open(io.BytesIO(raw)).convert("RGB")
+    img = ImageOps.fit(img, size, Image.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return buf.getvalue()
+
+def load_manifest(folder=IMAGE_DIR):
+    try:
+        with open(os.path.join(folder, MANIFEST_NAME), "r") as f: return json.load(f)
+    except (OSError, ValueError): return {}
+
+def save_manifest(manifest, folder=IMAGE_DIR):
+    path = os.path.join(folder, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f: json.dump(manifest, f, indent=0, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def drop_image(qid, folder=IMAGE_DIR):
+    """
+    Verouderd plaatje weghalen; de app valt dan terug op de live generator
+    tot de volgende build het opnieuw rendert.
+    """
+    try: os.remove(image_path(qid, folder))
+    except OSError: pass
+    manifest = load_manifest(folder)
+    if manifest.pop(str(qid), None) is not None: save_manifest(manifest, folder)
+
+def _write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f: f.write(data)
+    os.replace(tmp, path)
+
+def build_images(bank, provider, folder=IMAGE_DIR, force=False, workers=4):
+    """
+    Rendert ontbrekende of verouderde plaatjes (prompt gewijzigd t.o.v. de manifest).
+    Geeft (gebouwd, overgeslagen, mislukt) terug.
+    """
+    os.makedirs(folder, exist_ok=True)
+    manifest = load_manifest(folder)
+    todo = [q for q in bank.by_id.values()
+            if force or manifest.get(q.id) != prompt_hash(q) or not os.path.exists(image_path(q.id, folder))]
+
+    def build_one(q):
+        try:
+            _write_atomic(image_path(q.id, folder), compress_image(provider.fetch(q)))
+            return q.id, prompt_hash(q)
+        except Exception as e:
+            print(f"⚠️ {q.id}: {e}")
+            return q.id, None
+
+    built = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for qid, digest in pool.map(build_one, todo):
+            if digest is None: failed += 1; continue
+            manifest[qid] = digest; built += 1
+    save_manifest(manifest, folder)
+    return built, len(bank) - len(todo), failed
+
+
+def main():
+    from eva_data import QuestionBank, read_question_csv
+
+    parser = argparse.ArgumentParser(description="Scenario-afbeeldingen vooraf renderen")
+    parser.add_argument("--csv", default="vragen.csv")
+    parser.add_argument("--provider", choices=sorted(PROVIDERS), default="pollinations")
+    parser.add_argument("--out", default=IMAGE_DIR)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--force", action="store_true", help="alles opnieuw renderen")
+    args = parser.parse_args()
+
+    built, skipped, failed = build_images(QuestionBank(read_question_csv(args.csv)), PROVIDERS[args.provider](), args.out, args.force, args.workers)
+    print(f"✅ {built} gebouwd, {skipped} al up-to-date, {failed} mislukt → {args.out}")
+
+if __name__ == "__main__":
+    main()
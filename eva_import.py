@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+"""
+📥 EVA'S IMPORT
+-----------------------------------------------------
+Grote vragenbanken (honderdduizenden regels, meerdere bestanden) veilig
+samenvoegen tot één vragen.csv, in blokken in plaats van alles tegelijk.
+- Streaming: elk bronbestand wordt in blokken van CHUNK_ROWS gelezen,
+  gecontroleerd en meteen naar een tijdelijk uitvoerbestand geschreven.
+  In het geheugen blijft alleen per id een hash van de inhoud over.
+- Controle per rij (kolomsgewijs per blok): verplichte velden, numerieke
+  timer, antwoord moet letterlijk één van opt1..opt3 zijn, bekende categorie.
+  Kapotte regels (te veel velden) worden ook als fout gemeld. Elke fout
+  noemt het echte regelnummer in het bronbestand, ook na kapotte regels,
+  lege regels of velden met een enter erin.
+- Dubbelen: zelfde id met dezelfde inhoud wordt stil overgeslagen, zelfde id
+  met andere inhoud is een fout (eerste wint, net als in QuestionBank), en
+  dezelfde vraag onder een ander id wordt ook gemeld.
+- Fouten per rij (bestand, regel, id, veld, melding), optioneel als CSV.
+- Het resultaat vervangt het doelbestand atomisch (tmp + os.replace), dus de
+  BankWatcher van de app ziet nooit een half geschreven bank.
+
+Gebruik:
+python eva_import.py vragen.csv extra.csv kennis.csv:Kennis --out vragen.csv
+python eva_import.py groot.csv --check --errors fouten.csv
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+import pandas as pd
+
+from eva_data import QUESTION_FIELDS, DEFAULT_TIMER, EXAM_QUOTAS
+
+CHUNK_ROWS = 50_000
+REQUIRED_FIELDS = ("id", "category", "question", "opt1", "opt2", "answer")
+OPTION_FIELDS = ("opt1", "opt2", "opt3")
+CONTENT_FIELDS = ("question", "opt1", "opt2", "opt3", "answer")
+KNOWN_CATEGORIES = tuple(EXAM_QUOTAS)
+MAX_KEPT_ERRORS = 1000  # meer fouten worden alleen geteld (en naar --errors geschreven)
+MAX_TIMER = 120
+
+
+class RowError:
+    __slots__ = ("source", "row", "qid", "field", "message")
+
+    def __init__(self, source, row, qid, field, message):
+        self.source, self.row, self.qid, self.field, self.message = source, row, qid, field, message
+
+    def as_tuple(self):
+        return (self.source, self.row, self.qid, self.field, self.message)
+
+    def __str__(self):
+        return f"{os.path.basename(self.source)} regel {self.row} (id {self.qid or '?'}) {self.field}: {self.message}"
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors = []
+        self.by_category = {}
+
+    def add_errors(self, errors):
+        self.error_count += len(errors)
+        room = MAX_KEPT_ERRORS - len(self.errors)
+        if room > 0: self.errors.extend(errors[:room])
+
+    def summary(self):
+        cats = ", ".join(f"{c}: {n}" for c, n in sorted(self.by_category.items()))
+        return (f"{self.rows} rijen gelezen, {self.imported} geïmporteerd, {self.duplicates} dubbel, "
+                f"{self.error_count} fouten ({cats or 'geen vragen'})")
+
+
+# --- INLEZEN ---
+
+def read_chunks(path, chunksize, bad_line):
+    """
+    CSV in blokken van chunksize rijen, alles als tekst. De index van elk blok
+    is het regelnummer waar de rij in het bestand begint. Een rij met te weinig
+    velden wordt aangevuld met lege velden (zoals read_csv); te veel velden gaat
+    naar bad_line(regel, velden, verwacht).
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f, delimiter=";")
+        header = next(reader, None)
+        if header is None: return
+        rows, lines = [], []
+        while True:
+            start = reader.line_num + 1
+            fields = next(reader, None)
+            if fields is None: break
+            if not fields: continue  # lege regel
+            if len(fields) > len(header):
+                bad_line(start, fields, len(header))
+                continue
+            rows.append(fields + [""] * (len(header) - len(fields)))
+            lines.append(start)
+            if len(rows) == chunksize:
+                yield pd.DataFrame(rows, columns=header, index=lines)
+                rows, lines = [], []
+        if rows: yield pd.DataFrame(rows, columns=header, index=lines)
+
+
+# --- CONTROLE PER BLOK ---
+
+def normalize_chunk(df, default_category=None):
+    """
+    Kolomnamen als read_question_csv, alle QUESTION_FIELDS aanwezig, strings gestript.
+    """
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    out = pd.DataFrame(index=df.index)
+    for field in QUESTION_FIELDS:
+        out[field] = df[field].fillna("").astype(str).str.strip() if field in df.columns else ""
+    if default_category:
+        out["category"] = out["category"].mask(out["category"] == "", default_category)
+    return out
+
+def validate_chunk(df, source, categories=KNOWN_CATEGORIES):
+    """
+    -> (geldige rijen, [RowError]). df komt uit normalize_chunk, met regelnummers
+    als index; categories=None accepteert elke categorie. Bekende categorieën
+    worden hoofdletter-ongevoelig herkend.
+    """
+    problems = []  # (masker, veld, melding)
+    for field in REQUIRED_FIELDS:
+        problems.append((df[field] == "", field, "verplicht veld is leeg"))
+
+    timers = pd.to_numeric(df["timer"].mask(df["timer"] == ""), errors="coerce")
+    bad_timer = (df["timer"] != "") & (timers.isna() | (timers % 1 != 0) | (timers <= 0) | (timers > MAX_TIMER))
+    problems.append((bad_timer, "timer", f"geen geheel aantal seconden (1-{MAX_TIMER})"))
+    df["timer"] = timers.fillna(DEFAULT_TIMER).where(~bad_timer, DEFAULT_TIMER).astype("int64").astype(str)
+
+    in_options = pd.Series(False, index=df.index)
+    for field in OPTION_FIELDS:
+        in_options |= (df[field] != "") & (df[field] == df["answer"])
+    problems.append(((df["answer"] != "") & ~in_options, "answer", "antwoord is geen van opt1..opt3"))
+
+    if categories is not None:
+        canonical = {c.lower(): c for c in categories}
+        mapped = df["category"].str.lower().map(canonical)
+        problems.append(((df["category"] != "") & mapped.isna(), "category", f"onbekende categorie (bekend: {', '.join(categories)})"))
+        df["category"] = mapped.fillna(df["category"])
+
+    bad = pd.Series(False, index=df.index)
+    errors = []
+    for mask, field, message in problems:
+        if not mask.any(): continue
+        bad |= mask
+        for idx, qid in df.loc[mask, "id"].items():
+            errors.append(RowError(source, idx, qid, field, message))
+    errors.sort(key=lambda e: e.row)
+    return df[~bad], errors
+
+def content_hashes(df):
+    # Eén uint64 per rij over de vraaginhoud; goedkoper dan de tekst zelf bewaren
+    return pd.util.hash_pandas_object(df[list(CONTENT_FIELDS)], index=False)
+
+
+# --- IMPORTEUR ---
+
+class BankImporter:
+    """
+    Voegt bronnen één voor één samen. add_source() mag vaker; finish() zet het
+    resultaat op zijn plek. Zonder out_path wordt er alleen gecontroleerd.
+    """
+
+    def __init__(self, out_path=None, chunksize=CHUNK_ROWS, categories=KNOWN_CATEGORIES, errors_path=None):
+        self.out_path = out_path
+        self.chunksize = chunksize
+        self.categories = categories
+        self.report = ImportReport()
+        self._ids = {}      # id -> inhoudshash (eerste wint)
+        self._content = {}  # inhoudshash -> id
+        self._tmp = f"{out_path}.{os.getpid()}.tmp" if out_path else None
+        self._out = open(self._tmp, "w", encoding="utf-8", newline="") if out_path else None
+        self._header = True
+        self._errors_file = open(errors_path, "w", encoding="utf-8", newline="") if errors_path else None
+        self._errors_csv = csv.writer(self._errors_file, delimiter=";") if errors_path else None
+        if self._errors_csv: self._errors_csv.writerow(("bestand", "regel", "id", "veld", "melding"))
+
+    def _record_errors(self, errors):
+        self.report.add_errors(errors)
+        if self._errors_csv: self._errors_csv.writerows(e.as_tuple() for e in errors)
+
+    def _dedupe(self, df, source):
+        hashes = content_hashes(df)
+        keep = pd.Series(True, index=df.index)
+        errors = []
+        # Per rij, maar alleen dict-lookups: de tekst zelf wordt niet bewaard
+        for idx, qid, h in zip(df.index, df["id"], hashes):
+            seen = self._ids.get(qid)
+            if seen is not None:
+                keep[idx] = False
+                if seen == h: self.report.duplicates += 1
+                else: errors.append(RowError(source, idx, qid, "id", "id komt al voor met een andere vraag"))
+                continue
+            other = self._content.get(h)
+            if other is not None:
+                keep[idx] = False
+                errors.append(RowError(source, idx, qid, "question", f"zelfde vraag als id {other}"))
+                continue
+            self._ids[qid] = h
+            self._content[h] = qid
+        return df[keep], errors
+
+    def add_source(self, path, category=None):
+        bad = []
+
+        def bad_line(line, fields, expected):
+            bad.append(RowError(path, line, fields[0], "regel", f"{len(fields)} velden in plaats van {expected}"))
+
+        for chunk in read_chunks(path, self.chunksize, bad_line):
+            valid, errors = validate_chunk(normalize_chunk(chunk, category), path, self.categories)
+            valid, dup_errors = self._dedupe(valid, path)
+            # Kapotte regels tellen als gelezen rij en komen op volgorde tussen de andere fouten
+            self.report.rows += len(chunk) + len(bad)
+            self._record_errors(sorted(bad + errors + dup_errors, key=lambda e: e.row))
+            bad.clear()
+            self._write(valid)
+        self.report.rows += len(bad)  # kapotte regels na de laatste goede rij
+        self._record_errors(bad)
+        return self.report
+
+    def _write(self, df):
+        if df.empty: return
+        self.report.imported += len(df)
+        for cat, n in df["category"].value_counts().items():
+            self.report.by_category[cat] = self.report.by_category.get(cat, 0) + int(n)
+        if self._out is None: return
+        df.to_csv(self._out, sep=";", index=False, header=self._header, lineterminator="\r\n")
+        self._header = False
+
+    def finish(self):
+        if self._errors_file: self._errors_file.close()
+        if self._out is None: return self.report
+        if self._header:  # niets geïmporteerd: toch een geldige (lege) bank met kolommen
+            self._out.write(";".join(QUESTION_FIELDS) + "\r\n")
+        self._out.flush()
+        os.fsync(self._out.fileno())
+        self._out.close()
+        os.replace(self._tmp, self.out_path)
+        return self.report
+
+    def abort(self):
+        for f in (self._out, self._errors_file):
+            if f: f.close()
+        if self._tmp and os.path.exists(self._tmp): os.remove(self._tmp)
+
+
+def parse_source(spec):
+    # "pad" of "pad:Categorie" (categorie voor rijen zonder eigen categorie)
+    path, sep, category = spec.rpartition(":")
+    if sep and path and not os.path.exists(spec): return path, category
+    return spec, None
+
+def import_banks(sources, out_path=None, **kwargs):
+    importer = BankImporter(out_path, **kwargs)
+    try:
+        for spec in sources:
+            importer.add_source(*parse_source(spec))
+    except BaseException:
+        importer.abort()
+        raise
+    return importer.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vragenbanken controleren en samenvoegen")
+    parser.add_argument("sources", nargs="+", help="CSV-bestanden; pad:Categorie vult lege categorieën")
+    parser.add_argument("--out", default="vragen.csv")
+    parser.add_argument("--check", action="store_true", help="alleen controleren, niets schrijven")
+    parser.add_argument("--errors", help="alle fouten als CSV hierheen")
+    parser.add_argument("--chunk", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--any-category", action="store_true", help="ook onbekende categorieën toestaan")
+    parser.add_argument("--strict", action="store_true", help="bij fouten niets schrijven")
+    args = parser.parse_args()
+
+    categories = None if args.any_category else KNOWN_CATEGORIES
+    out = None if args.check or args.strict else args.out
+    report = import_banks(args.sources, out, chunksize=args.chunk, categories=categories, errors_path=args.errors)
+    if args.strict and not args.check and not report.error_count:
+        # Eerst gecontroleerd zonder te schrijven; alles goed, dus nu echt
+        report = import_banks(args.sources, args.out, chunksize=args.chunk, categories=categories)
+    for error in report.errors[:20]: print(f"⚠️ {error}")
+    if report.error_count > 20: print(f"... en nog {report.error_count - 20} fouten")
+    print(("✅ " if not report.error_count else "⚠️ ") + report.summary())
+    return 1 if report.error_count else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
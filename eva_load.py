@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+"""
+👥 EVA'S LOADTEST
+-----------------------------------------------------
+Hoeveel leerlingen tegelijk kan één server aan? Synthetische leerlingen
+lopen dashboard → oefenen → examen door tegen de echte app (AppTest).
+- Elk werkproces speelt één server: zijn leerlingen delen cache_resource
+  (bank, TTS, prefetcher) en worden om de beurt bediend, net als sessies in
+  één Streamlit-proces. Alle processen delen één werkmap, dus progress.json,
+  het journaal en de audiocache worden écht tegelijk beschreven.
+- Elke leerling heeft een eigen seed: kans op goed, denktijd (lognormaal),
+  af en toe expres fout. Denktijden worden met --think-scale ingekort.
+- Nep-TTS en netwerk uit zoals in eva_bench.py (--tts-latency-ms voor een trage stem).
+- Per N: doorvoer (stappen en antwoorden per seconde), p50/p95/p99 per stap
+  gemeten vanaf het moment dat de leerling klikt (dus inclusief wachten tot
+  het proces klaar is met de anderen),
+  hit-ratio van de audiocache, en schrijfdruk op het journaal: duur van
+  append (fsync), compacties gelukt / overgeslagen (lock bezet) en of er na
+  afloop evenveel antwoorden in het journaal staan als er gegeven zijn.
+
+Gebruik:
+python eva_load.py --learners 1 4 16
+python eva_load.py --learners 8 32 --procs 4 --think-scale 0.2 --out load.json
+"""
+
+import argparse
+import heapq
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from eva_bench import APP_FILE, APP_DIR, install_fakes, make_synthetic_bank, summarize, _percentile
+
+DEFAULT_LEARNERS = (1, 4, 16)
+DEFAULT_BANK = 2000
+PRACTICE_QUESTIONS = 10
+
+
+# ----------------------------------------------------------------------
+# INSTRUMENTATIE (alleen in het werkproces)
+# ----------------------------------------------------------------------
+
+class Probe:
+    """
+    Telt in het werkproces mee via een paar gepatchte methodes, zonder de app aan te passen.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cache = {"hit": 0, "miss": 0}
+        self.appends = []
+        self.compactions = {"ok": 0, "skipped": 0}
+
+    def install(self):
+        from eva_audio import AudioStore
+        from eva_progress import ProgressJournal
+        probe = self
+        get, append, compact = AudioStore.get, ProgressJournal.append, ProgressJournal.compact
+
+        def counted_get(store, key):
+            data = get(store, key)
+            with probe.lock: probe.cache["hit" if data is not None else "miss"] += 1
+            return data
+
+        def timed_append(journal, event):
+            t = time.perf_counter()
+            try: return append(journal, event)
+            finally:
+                with probe.lock: probe.appends.append(time.perf_counter() - t)
+
+        def counted_compact(journal):
+            ok = compact(journal)
+            with probe.lock: probe.compactions["ok" if ok else "skipped"] += 1
+            return ok
+
+        AudioStore.get, ProgressJournal.append, ProgressJournal.compact = counted_get, timed_append, counted_compact
+
+
+# ----------------------------------------------------------------------
+# LEERLING
+# ----------------------------------------------------------------------
+
+class Learner:
+    """
+    Eén sessie. steps() is een generator: elke yield = (staplabel, denktijd
+    vóór de volgende klik). De scheduler voert de bijbehorende rerun uit.
+    """
+
+    def __init__(self, name, seed, bank, think_scale, questions):
+        self.name = name
+        self.rng = random.Random(seed)
+        self.skill = self.rng.uniform(0.55, 0.95)
+        self.think_mean = self.rng.uniform(2.0, 8.0)
+        self.bank = bank
+        self.think_scale = think_scale
+        self.questions = questions
+        self.answers = 0
+        self.exams = 0
+        self.at = None
+
+    def think(self):
+        seconds = self.rng.lognormvariate(math.log(self.think_mean), 0.5)
+        return seconds * self.think_scale
+
+    def _answer(self, prefix, qid):
+        # Goed met kans `skill`, anders een willekeurige andere optie
+        buttons = [b for b in self.at.button if (b.key or "").startswith(f"{prefix}{qid}_")]
+        if not buttons: raise RuntimeError(f"{self.name}: geen antwoordknoppen voor vraag {qid}")
+        answer = self.bank.get(qid).answer
+        right = [b for b in buttons if b.key == f"{prefix}{qid}_{answer}"]
+        wrong = [b for b in buttons if b not in right]
+        pick = right[0] if right and (self.rng.random() < self.skill or not wrong) else self.rng.choice(wrong)
+        pick.click()
+        self.answers += 1
+
+    def _click(self, label):
+        [b for b in self.at.button if b.label == label][0].click()
+
+    def steps(self):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(APP_FILE, default_timeout=600)
+        yield "cold_start", self.think()
+        yield "dashboard", self.think()
+
+        self._click("Start Oefenen")
+        yield "practice_start", self.think()
+        state = self.at.session_state
+        for _ in range(self.questions):
+            if state.mode != "practice" or state.current_index >= len(state.practice_ids): break
+            self._answer("btn_", state.practice_ids[state.current_index])
+            yield "practice_answer", self.think()
+            self._click("Volgende ➡️")
+            yield "practice_next", self.think()
+
+        self._click("🏠")
+        yield "dashboard", self.think()
+        self._click("Examen Simulatie")
+        yield "exam_start", self.think()
+        while state.mode == "exam_active":
+            est = state.exam_state
+            self._answer("ex_", est["ids"][est["idx"]])
+            yield "exam_answer", self.think()
+        self.exams += 1
+        yield "exam_result", 0.0
+
+
+def run_learners(learners):
+    """
+    Om de beurt bedienen, op volgorde van wanneer elke leerling weer klikt.
+    De tijd loopt vanaf `ready` (het klikmoment), niet vanaf at.run(): een
+    leerling die moet wachten omdat het proces nog een ander bedient, merkt
+    dat net zo goed als de rerun zelf.
+    -> {stap: [seconden]}
+    """
+    timings, queue = {}, []
+    for i, learner in enumerate(learners):
+        queue.append((time.monotonic(), i, learner.steps()))
+    heapq.heapify(queue)
+    while queue:
+        ready, i, steps = heapq.heappop(queue)
+        try:
+            label, think = next(steps)
+        except StopIteration:
+            continue
+        wait = ready - time.monotonic()
+        if wait > 0: time.sleep(wait)
+        at = learners[i].at
+        at.run()
+        timings.setdefault(label, []).append(time.monotonic() - ready)
+        if at.exception: raise RuntimeError(f"{learners[i].name} {label}: {at.exception[0].message}")
+        heapq.heappush(queue, (time.monotonic() + think, i, steps))
+    return timings
+
+def worker(workdir, seeds, args):
+    os.chdir(workdir)
+    os.environ["EVA_AUDIO_CACHE_DIR"] = os.path.join(workdir, "audio")
+    sys.path.insert(0, APP_DIR)
+    install_fakes(args["tts_latency_ms"] / 1000)
+    logging.getLogger("streamlit").setLevel(logging.ERROR)  # label-waarschuwingen per rerun maken de uitvoer onleesbaar
+    probe = Probe()
+    probe.install()
+
+    from eva_data import QuestionBank, read_question_csv
+    bank = QuestionBank(read_question_csv(os.path.join(workdir, "vragen.csv")))
+    random.seed(seeds[0] if seeds else 0)  # app gebruikt de globale random voor volgorde en feedback
+    learners = [Learner(f"leerling-{s}", s, bank, args["think_scale"], args["questions"]) for s in seeds]
+    t0 = time.perf_counter()
+    timings = run_learners(learners)
+    return {"timings": timings, "elapsed": time.perf_counter() - t0, "answers": sum(l.answers for l in learners),
+            "journaled": {"answers": sum(l.answers for l in learners), "exams": sum(l.exams for l in learners)},
+            "cache": probe.cache, "appends": probe.appends, "compactions": probe.compactions}
+
+
+# ----------------------------------------------------------------------
+# AANSTUREN & RAPPORT
+# ----------------------------------------------------------------------
+
+def count_stored_events(workdir):
+    # Antwoorden (oefenen en examen) en examens zoals ze na afloop uit snapshot + journaal komen
+    sys.path.insert(0, APP_DIR)
+    from eva_progress import ProgressJournal
+    stats = ProgressJournal(os.path.join(workdir, "progress.json")).load().get("stats") or {}
+    return {"answers": stats.get("answers", 0), "exams": stats.get("exams", 0)}
+
+def run_level(n, args):
+    workdir = tempfile.mkdtemp(prefix=f"eva-load-{n}-")
+    make_synthetic_bank(args.bank, os.path.join(workdir, "vragen.csv"), seed=args.seed)
+    procs = max(1, min(args.procs or os.cpu_count() or 1, n))
+    seeds = [args.seed * 1000 + i for i in range(n)]
+    groups = [seeds[i::procs] for i in range(procs)]
+    options = {"think_scale": args.think_scale, "questions": args.questions, "tts_latency_ms": args.tts_latency_ms}
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procs) as pool:
+        parts = list(pool.map(worker, [workdir] * procs, groups, [options] * procs))
+    wall = time.perf_counter() - t0
+
+    timings, appends, cache, compactions = {}, [], {"hit": 0, "miss": 0}, {"ok": 0, "skipped": 0}
+    for part in parts:
+        for label, samples in part["timings"].items(): timings.setdefault(label, []).extend(samples)
+        appends.extend(part["appends"])
+        for k in cache: cache[k] += part["cache"][k]
+        for k in compactions: compactions[k] += part["compactions"][k]
+    all_steps = [s for samples in timings.values() for s in samples]
+    answers = sum(part["answers"] for part in parts)
+    given = {k: sum(part["journaled"][k] for part in parts) for k in ("answers", "exams")}
+    stored = count_stored_events(workdir)
+    if not args.keep: shutil.rmtree(workdir, ignore_errors=True)
+
+    return {"learners": n, "procs": procs, "wall_s": round(wall, 2),
+            "steps_per_s": round(len(all_steps) / wall, 2), "answers_per_s": round(answers / wall, 2),
+            "latency": {"n": len(all_steps), "p50_ms": round(_percentile(all_steps, 50) * 1000, 2),
+                        "p95_ms": round(_percentile(all_steps, 95) * 1000, 2),
+                        "p99_ms": round(_percentile(all_steps, 99) * 1000, 2)},
+            "steps": {label: summarize(samples) for label, samples in timings.items()},
+            "audio_cache_hit_ratio": round(cache["hit"] / max(1, cache["hit"] + cache["miss"]), 3),
+            "journal": {"appends": len(appends), "append": summarize(appends) if appends else None,
+                        "compactions": compactions, "events_given": given, "events_stored": stored}}
+
+def print_level(res):
+    j = res["journal"]
+    print(f"\n👥 {res['learners']} leerlingen over {res['procs']} processen — {res['wall_s']} s")
+    print(f"  doorvoer      {res['steps_per_s']:>8.2f} stappen/s   {res['answers_per_s']:>8.2f} antwoorden/s")
+    print(f"  latency       p50 {res['latency']['p50_ms']:>8.1f} ms   p95 {res['latency']['p95_ms']:>8.1f} ms   p99 {res['latency']['p99_ms']:>8.1f} ms")
+    for label, s in res["steps"].items():
+        print(f"    {label:<16} p50 {s['p50_ms']:>8.1f} ms   p95 {s['p95_ms']:>8.1f} ms   (n={s['n']})")
+    print(f"  audiocache    {res['audio_cache_hit_ratio']:.0%} hits")
+    if j["append"]:
+        print(f"  journaal      append p95 {j['append']['p95_ms']:.2f} ms, max {j['append']['max_ms']:.2f} ms · "
+              f"compacties {j['compactions']['ok']} ok / {j['compactions']['skipped']} overgeslagen")
+    given, stored = j["events_given"], j["events_stored"]
+    lost = sum(given[k] - stored[k] for k in given)
+    print(f"  opgeslagen    {stored['answers']}/{given['answers']} antwoorden, {stored['exams']}/{given['exams']} examens"
+          + (f"  ❌ {lost} kwijt" if lost else "  ✅"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Loadtest met synthetische leerlingen")
+    parser.add_argument("--learners", type=int, nargs="+", default=list(DEFAULT_LEARNERS), help="N leerlingen per ronde")
+    parser.add_argument("--procs", type=int, help="werkprocessen (standaard: aantal CPU's, max N)")
+    parser.add_argument("--bank", type=int, default=DEFAULT_BANK, help="grootte van de synthetische vragenbank")
+    parser.add_argument("--questions", type=int, default=PRACTICE_QUESTIONS, help="oefenvragen per leerling")
+    parser.add_argument("--think-scale", type=float, default=0.05, help="factor op de gesimuleerde denktijd")
+    parser.add_argument("--tts-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="werkmappen niet opruimen")
+    parser.add_argument("--out", default="load_results.json")
+    args = parser.parse_args()
+
+    levels = []
+    for n in args.learners:
+        print(f"⏳ {n} leerlingen...", file=sys.stderr)
+        levels.append(run_level(n, args))
+        print_level(levels[-1])
+
+    report = {"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "bank": args.bank,
+                       "questions": args.questions, "think_scale": args.think_scale, "tts_latency_ms": args.tts_latency_ms},
+              "levels": levels}
+    with open(args.out, "w") as f: json.dump(report, f, indent=2)
+    print(f"\n✅ Resultaten → {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+"""
+📈 EVA'S METINGEN
+-----------------------------------------------------
+Lichte instrumentatie voor de hete paden van de app.
+- Spans: hoe lang een stap duurde (load_data, opzoeken, audio, HTML,
+  save_history, ...). Binnen een rerun worden ze verzameld en per rerun als
+  één JSON-regel weggeschreven (EVA_METRICS_FILE).
+- Tellers: TTS-cache hit/miss, mislukte TTS-calls, fouten per stap.
+- Histogrammen + tellers zijn live op te vragen in Prometheus-tekstformaat
+  via http://localhost:<EVA_METRICS_PORT>/metrics.
+
+Staat standaard UIT. Aanzetten met EVA_METRICS=1. Uit betekent: span()
+geeft een gedeelde lege context terug, count() doet niets en @timed
+geeft de functie ongewijzigd terug.
+
+Gebruik:
+EVA_METRICS=1 streamlit run eva_app.py
+python eva_metrics.py eva_metrics.jsonl      # p50/p95 per span
+"""
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("EVA_METRICS", "").lower() in ("1", "true", "yes", "on")
+METRICS_FILE = os.environ.get("EVA_METRICS_FILE", "eva_metrics.jsonl")
+METRICS_PORT = int(os.environ.get("EVA_METRICS_PORT", "9464"))
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Streamlit gebruikt exceptions voor st.rerun()/st.stop(); dat zijn geen fouten
+CONTROL_FLOW = ("RerunException", "StopException")
+
+
+class Registry:
+    """
+    Tellers en histogrammen, per (naam, labels). Thread-safe; de TTS- en
+    prefetch-threads schrijven er ook in.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}  # key -> [tellingen per bucket..., som, aantal]
+
+    def inc(self, name, n=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None: hist = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: hist[i] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    @staticmethod
+    def _labels(pairs, extra=()):
+        pairs = list(pairs) + list(extra)
+        if not pairs: return ""
+        return "{" + ",".join(f'{k}="{str(v).replace(chr(34), "")}"' for k, v in pairs) + "}"
+
+    def render(self):
+        # Prometheus exposition format (text/plain; version=0.0.4)
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((k, list(v)) for k, v in self._histograms.items())
+        lines, typed = [], set()
+        for (name, labels), value in counters:
+            if name not in typed: lines.append(f"# TYPE {name} counter"); typed.add(name)
+            lines.append(f"{name}{self._labels(labels)} {value}")
+        for (name, labels), hist in histograms:
+            if name not in typed: lines.append(f"# TYPE {name} histogram"); typed.add(name)
+            for bound, n in zip(self.buckets, hist):
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {n}")
+            lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {hist[-1]}")
+            lines.append(f"{name}_sum{self._labels(labels)} {hist[-2]:.6f}")
+            lines.append(f"{name}_count{self._labels(labels)} {hist[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+_local = threading.local()
+_file_lock = threading.Lock()
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.t0
+        REGISTRY.observe("eva_span_seconds", seconds, span=self.name)
+        error = exc_type.__name__ if exc_type is not None and exc_type.__name__ not in CONTROL_FLOW else None
+        if error: REGISTRY.inc("eva_errors_total", span=self.name, error=error)
+        trace = getattr(_local, "trace", None)
+        if trace is not None:
+            entry = {"name": self.name, "ms": round(seconds * 1000, 3)}
+            if error: entry["error"] = error
+            trace["spans"].append(entry)
+        return False
+
+
+class _Rerun(_Span):
+    __slots__ = ("session", "mode", "trace")
+
+    def __init__(self, session, mode, name):
+        super().__init__(name)
+        self.session, self.mode = session, mode
+
+    def __enter__(self):
+        # Een fragment binnen een volledige rerun is gewoon een span van die rerun
+        self.trace = None if getattr(_local, "trace", None) is not None else {"spans": []}
+        if self.trace is not None: _local.trace = self.trace
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.trace is None: return super().__exit__(exc_type, exc, tb)
+        _local.trace = None
+        super().__exit__(exc_type, exc, tb)
+        record = {"ts": round(time.time(), 3), "session": self.session, "mode": self.mode, "kind": self.name,
+                  "ms": round((time.perf_counter() - self.t0) * 1000, 3), "spans": self.trace["spans"]}
+        if exc_type is not None: record["exit"] = exc_type.__name__
+        write_record(record)
+        return False
+
+
+_NOOP = contextlib.nullcontext()
+
+def span(name):
+    return _Span(name) if ENABLED else _NOOP
+
+def rerun(session, mode, kind="rerun"):
+    """
+    Omhult één rerun (kind="rerun") of fragment-rerun (kind="fragment"); alle
+    spans daarbinnen (zelfde thread) komen in één JSONL-regel.
+    """
+    return _Rerun(session, mode, kind) if ENABLED else _NOOP
+
+def count(name, n=1, **labels):
+    if ENABLED: REGISTRY.inc(name, n, **labels)
+
+def observe(name, value, **labels):
+    if ENABLED: REGISTRY.observe(name, value, **labels)
+
+def timed(name):
+    # Decorator; met metingen uit blijft de functie precies dezelfde functie
+    def wrap(fn):
+        if not ENABLED: return fn
+        def timed_fn(*args, **kwargs):
+            with _Span(name): return fn(*args, **kwargs)
+        timed_fn.__name__, timed_fn.__doc__, timed_fn.__wrapped__ = fn.__name__, fn.__doc__, fn
+        return timed_fn
+    return wrap
+
+def write_record(record, path=None):
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    try:
+        with _file_lock, open(path or METRICS_FILE, "a", encoding="utf-8") as f: f.write(line)
+    except OSError:
+        REGISTRY.inc("eva_metrics_write_errors_total")
+
+
+# --- PROMETHEUS ENDPOINT ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404); return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_http_server(port=METRICS_PORT, host="127.0.0.1"):
+    """
+    /metrics in een daemon-thread. None als de poort al bezet is (bv. een tweede app-proces).
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="eva-metrics", daemon=True).start()
+    return server
+
+
+# --- SAMENVATTING ---
+
+def summarize_file(path):
+    samples = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try: record = json.loads(line)
+            except ValueError: continue
+            samples.setdefault(record.get("kind", "rerun"), []).append(record["ms"])
+            for s in record.get("spans", []): samples.setdefault(s["name"], []).append(s["ms"])
+    out = {}
+    for name, values in samples.items():
+        values.sort()
+        pick = lambda pct: values[min(len(values) - 1, int(round((len(values) - 1) * pct)))]
+        out[name] = {"n": len(values), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": values[-1]}
+    return out
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else METRICS_FILE
+    for name, s in sorted(summarize_file(path).items(), key=lambda kv: -kv[1]["p95_ms"]):
+        print(f"{name:<24} p50 {s['p50_ms']:>9.1f} ms   p95 {s['p95_ms']:>9.1f} ms   max {s['max_ms']:>9.1f} ms   (n={s['n']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+
+"""
+💾 EVA'S VOORTGANG
+-----------------------------------------------------
+Append-only journaal in plaats van progress.json bij elk antwoord herschrijven.
+- Elk antwoord / examen is één JSON-regel (O_APPEND + fsync): O(1) per klik
+  en meerdere sessies schrijven niet meer over elkaar heen.
+- Bij het opstarten: snapshot + journaal opnieuw afspelen tot user_data.
+- Compactie: het journaal wordt atomisch weggedraaid naar een segment, in de
+  snapshot verwerkt (tmp + fsync + os.replace) en daarna opgeruimd.
+  Appends houden een gedeelde flock op <naam>.journal.lock, de compactie een
+  exclusieve; zo kan geen regel meer in een al weggedraaid segment belanden.
+  De snapshot onthoudt welke segmenten er al in zitten, zodat een crash
+  halverwege nooit dubbel telt.
+- ReviewSchedule: spaced repetition (SM-2-achtig) per vraag, met een heap op
+  vervaldatum. Volgende vraag kiezen en bijwerken na een antwoord zijn O(log n).
+  Vervangt de oude lineaire mistakes_list.
+- Statistieken: lopende tellers per vraag en per categorie (pogingen, goed,
+  te laat, som van de denktijd), een denktijd-histogram en examentotalen.
+  Plus hoeveel de servermeting van de denktijd afwijkt van die in de browser
+  (netwerk + rerun + laat startende audio) en hoe vaak dat "te laat" scheelde.
+  Elk antwoord werkt ze in O(1) bij, dus het dashboard hoeft nooit meer door
+  de hele geschiedenis te lopen.
+"""
+
+import contextlib
+import glob
+import heapq
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: geen flock, dan alleen de lock binnen het proces
+    fcntl = None
+
+DEFAULT_PROGRESS = {"total_score": 0, "srs": {}, "exams_history": [], "streak": 0, "recent_exam_ids": [], "stats": None}
+RECENT_EXAM_IDS = 75  # vragen van de laatste ~3 examens vermijden
+COMPACT_BYTES = 64 * 1024
+LOCK_STALE_SECONDS = 60
+
+DAY = 86400
+START_EASE = 2.5
+MIN_EASE = 1.3
+GRADUATE_STREAK = 3  # zo vaak achter elkaar goed en de vraag is uit de Foutenbak
+RT_BUCKETS = (1, 2, 3, 5, 8, 13, 20)  # sec denktijd; laatste vakje = langer
+SKEW_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5)  # sec verschil server- vs. browsermeting
+
+
+class ReviewSchedule(dict):
+    """
+    qid -> [interval_dagen, ease, vervaltijd, reeks_goed, aantal_fout].
+    Is gewoon een dict (dus direct JSON), met twee heaps ernaast: alle vragen
+    en alleen de fouten, beide op vervaltijd. Verouderde heap-items worden
+    lui overgeslagen bij het uitlezen.
+    """
+
+    def __init__(self, states=None):
+        super().__init__((str(k), list(v)) for k, v in (states or {}).items())
+        self._rebuild()
+
+    def _rebuild(self):
+        self._heap = [(s[2], qid) for qid, s in self.items()]
+        self._mistakes = [(s[2], qid) for qid, s in self.items() if self.is_mistake(qid)]
+        heapq.heapify(self._heap)
+        heapq.heapify(self._mistakes)
+
+    def is_mistake(self, qid):
+        s = self.get(str(qid))
+        return s is not None and s[4] > 0 and s[3] < GRADUATE_STREAK
+
+    def mistakes(self):
+        return [qid for qid in self if self.is_mistake(qid)]
+
+    def review(self, qid, correct, now):
+        qid = str(qid)
+        interval, ease, _, streak, lapses = self.get(qid, [0, START_EASE, 0, 0, 0])
+        if correct:
+            streak += 1
+            interval = 1 if streak == 1 else 6 if streak == 2 else round(interval * ease, 2)
+        else:
+            # Fout: meteen weer aan de beurt, en de vraag wordt "moeilijker"
+            streak, interval, lapses = 0, 0, lapses + 1
+            ease = max(MIN_EASE, round(ease - 0.2, 2))
+        due = round(now + interval * DAY, 3)
+        self[qid] = [interval, ease, due, streak, lapses]
+        heapq.heappush(self._heap, (due, qid))
+        if self.is_mistake(qid): heapq.heappush(self._mistakes, (due, qid))
+        if len(self._heap) > 2 * len(self) + 64: self._rebuild()
+
+    def add_mistake(self, qid, now=0):
+        # Voor migratie van de oude mistakes_list
+        if str(qid) not in self: self.review(qid, False, now)
+
+    def _take(self, heap, now, limit, valid):
+        out, seen, picked = [], [], set()
+        while heap and heap[0][0] <= now and (limit is None or len(out) < limit):
+            entry = heapq.heappop(heap)
+            due, qid = entry
+            state = self.get(qid)
+            if state is None or state[2] != due or not valid(qid) or qid in picked: continue
+            seen.append(entry)
+            out.append(qid)
+            picked.add(qid)
+        for entry in seen: heapq.heappush(heap, entry)
+        return out
+
+    def due(self, now, limit=None):
+        return self._take(self._heap, now, limit, lambda qid: True)
+
+    def due_mistakes(self, now, limit=None):
+        return self._take(self._mistakes, now, limit, self.is_mistake)
+
+
+# --- STATISTIEKEN ---
+
+def new_stats():
+    # questions: qid -> [pogingen, goed, te_laat, som_denktijd]; categories: naam -> dict
+    return {"answers": 0, "correct": 0, "late": 0, "rt_sum": 0.0, "rt_count": 0,
+            "rt_hist": [0] * (len(RT_BUCKETS) + 1), "questions": {}, "categories": {},
+            "exams": 0, "exams_passed": 0, "exam_points": 0, "exam_max": 0,
+            "rt_client": 0, "skew_hist": [0] * (len(SKEW_BUCKETS) + 1), "late_rescued": 0}
+
+def _bucket(seconds, bounds):
+    for i, bound in enumerate(bounds):
+        if seconds <= bound: return i
+    return len(bounds)
+
+def _rt_bucket(seconds):
+    return _bucket(seconds, RT_BUCKETS)
+
+def _parse_score(score):
+    # "18/25" -> (18, 25)
+    try:
+        got, total = str(score).split("/")
+        return int(got), int(total)
+    except ValueError:
+        return 0, 0
+
+def record_answer(stats, qid, category, correct, late=False, rt=None, skew=None, rescued=False):
+    stats["answers"] += 1
+    if skew is not None:
+        # Denktijd kwam uit de browser; skew = wat de server er extra bij telde
+        stats["rt_client"] += 1
+        stats["skew_hist"][_bucket(max(0.0, float(skew)), SKEW_BUCKETS)] += 1
+        stats["late_rescued"] += bool(rescued)
+    stats["correct"] += bool(correct)
+    stats["late"] += bool(late)
+    q = stats["questions"].setdefault(str(qid), [0, 0, 0, 0.0])
+    q[0] += 1; q[1] += bool(correct); q[2] += bool(late)
+    cat = stats["categories"].setdefault(category, {"answers": 0, "correct": 0, "late": 0, "rt_sum": 0.0, "rt_count": 0,
+                                                    "rt_hist": [0] * (len(RT_BUCKETS) + 1)}) if category else None
+    if cat is not None:
+        cat["answers"] += 1; cat["correct"] += bool(correct); cat["late"] += bool(late)
+    if rt is None: return  # oude events zonder denktijd
+    rt = max(0.0, float(rt))
+    q[3] = round(q[3] + rt, 3)
+    for agg in (stats, cat) if cat is not None else (stats,):
+        agg["rt_sum"] = round(agg["rt_sum"] + rt, 3)
+        agg["rt_count"] += 1
+        agg["rt_hist"][_rt_bucket(rt)] += 1
+
+def record_exam(stats, passed, score):
+    got, total = _parse_score(score)
+    stats["exams"] += 1
+    stats["exams_passed"] += bool(passed)
+    stats["exam_points"] += got
+    stats["exam_max"] += total
+
+def stats_from_history(exams_history):
+    # Voor voortgang van vóór de statistieken: examens zijn na te tellen, losse antwoorden niet
+    stats = new_stats()
+    for exam in exams_history: record_exam(stats, exam.get("passed"), exam.get("score"))
+    return stats
+
+def ratio(part, whole):
+    return part / whole if whole else 0.0
+
+def histogram_percentile(hist, bounds, pct):
+    # Bovengrens van het vakje waar het percentiel in valt (None = boven de laatste grens)
+    total = sum(hist)
+    if not total: return 0.0
+    seen = 0
+    for i, n in enumerate(hist):
+        seen += n
+        if seen >= total * pct / 100: return bounds[i] if i < len(bounds) else None
+    return None
+
+def hardest_questions(stats, n=10, min_attempts=2, valid=None):
+    # Alleen voor het statistiekenscherm; het dashboard gebruikt de totalen. valid(qid): staat nog in de bank
+    eligible = ((qid, q) for qid, q in stats["questions"].items() if q[0] >= min_attempts and (valid is None or valid(qid)))
+    return heapq.nsmallest(n, eligible, key=lambda item: (ratio(item[1][1], item[1][0]), -item[1][0]))
+
+
+def default_progress():
+    data = json.loads(json.dumps(DEFAULT_PROGRESS))
+    data["srs"] = ReviewSchedule()
+    data["stats"] = new_stats()
+    return data
+
+def normalize_progress(data):
+    # srs als ReviewSchedule; een oude mistakes_list wordt één keer omgezet
+    srs = data["srs"] if isinstance(data.get("srs"), ReviewSchedule) else ReviewSchedule(data.get("srs"))
+    for qid in data.pop("mistakes_list", None) or []: srs.add_mistake(qid)
+    data["srs"] = srs
+    if not isinstance(data.get("stats"), dict) or "questions" not in data["stats"]:
+        data["stats"] = stats_from_history(data.get("exams_history", []))
+    for key, value in new_stats().items(): data["stats"].setdefault(key, value)  # tellers van na de snapshot
+    return data
+
+def _apply_answer(data, answer, ts):
+    data["srs"].review(answer["qid"], answer.get("correct"), ts)
+    record_answer(data["stats"], answer["qid"], answer.get("cat"), answer.get("correct"), answer.get("late"), answer.get("rt"),
+                  answer.get("skew"), answer.get("rescued", False))
+
+def apply_event(data, event):
+    """
+    Eén event verwerken in user_data. Wordt zowel live (na een klik) als bij
+    het afspelen van het journaal gebruikt, dus er is maar één waarheid.
+    """
+    kind = event.get("type")
+    if kind == "answer":
+        if event.get("correct"): data["total_score"] += 1
+        _apply_answer(data, event, event.get("ts", 0))
+    elif kind == "forget":
+        # Alleen nog in oude journaals: de app wist niets meer als vragen uit de bank verdwijnen
+        for qid in event.get("qids", []):
+            data["srs"].pop(str(qid), None)
+            data["stats"]["questions"].pop(str(qid), None)
+    elif kind == "exam":
+        data["exams_history"].append({"date": event["date"], "score": event["score"], "passed": event["passed"]})
+        record_exam(data["stats"], event["passed"], event["score"])
+        # Examenantwoorden tellen mee in de vraag- en categoriestatistiek (niet in de oefenscore)
+        for answer in event.get("answers", []): _apply_answer(data, answer, event.get("ts", 0))
+        if event.get("ids"):
+            data["recent_exam_ids"] = (list(event["ids"]) + data["recent_exam_ids"])[:RECENT_EXAM_IDS]
+    return data
+
+
+class ProgressJournal:
+    def __init__(self, snapshot_path, compact_bytes=COMPACT_BYTES):
+        self.snapshot_path = snapshot_path
+        base = os.path.splitext(snapshot_path)[0]
+        self.journal_path = base + ".journal.jsonl"
+        self.segment_glob = base + ".journal.*.seg"
+        self.lock_path = base + ".compact.lock"
+        self.journal_lock_path = base + ".journal.lock"
+        self.compact_bytes = compact_bytes
+        self._compacting = threading.Lock()
+        self._local = threading.RLock() if fcntl is None else None
+
+    # --- lezen ---
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_path, "r") as f: snap = json.load(f)
+        except (OSError, ValueError):
+            return default_progress(), []
+        folded = snap.pop("_compacted", [])
+        snap.setdefault("stats", None)  # oude snapshot: normalize_progress telt de examens na
+        return normalize_progress({**default_progress(), **snap}), folded
+
+    @staticmethod
+    def _replay(data, path):
+        try:
+            with open(path, "r") as f:
+                for line in f:
+                    try: event = json.loads(line)
+                    except ValueError: continue  # afgebroken laatste regel na een crash
+                    apply_event(data, event)
+        except OSError:
+            pass
+
+    def load(self):
+        data, folded = self._read_snapshot()
+        for seg in sorted(glob.glob(self.segment_glob)):
+            if os.path.basename(seg) not in folded: self._replay(data, seg)
+        self._replay(data, self.journal_path)
+        return data
+
+    # --- schrijven ---
+
+    @contextlib.contextmanager
+    def _journal_lock(self, exclusive):
+        """
+        Gedeeld: appends (mogen tegelijk, O_APPEND houdt regels heel).
+        Exclusief: compactie, zodat niemand nog in het oude journaal schrijft
+        terwijl het hernoemd, verwerkt en verwijderd wordt. Per open() een
+        eigen lock, dus het werkt ook tussen threads van één proces.
+        """
+        if fcntl is None:
+            with self._local: yield
+            return
+        fd = os.open(self.journal_lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)  # geeft de flock ook vrij
+
+    def append(self, event):
+        line = (json.dumps(event) + "\n").encode("utf-8")
+        with self._journal_lock(exclusive=False):
+            fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+        if size >= self.compact_bytes:
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def write_snapshot(self, data, folded=()):
+        folder = os.path.dirname(os.path.abspath(self.snapshot_path))
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({**data, "_compacted": list(folded)}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+        except BaseException:
+            try: os.remove(tmp)
+            except OSError: pass
+            raise
+
+    def compact(self):
+        if not self._compacting.acquire(blocking=False): return False
+        try:
+            if not self._acquire_lock(): return False
+            try:
+                with self._journal_lock(exclusive=True):
+                    self._rotate()
+                    data, folded = self._read_snapshot()
+                    segments = sorted(glob.glob(self.segment_glob))
+                    for seg in segments:
+                        if os.path.basename(seg) not in folded: self._replay(data, seg)
+                    self.write_snapshot(data, [os.path.basename(s) for s in segments])
+                    for seg in segments: self._remove(seg)
+                    # Segmenten zijn weg, dus de lijst in de snapshot mag weer leeg
+                    self.write_snapshot(data)
+                return True
+            finally:
+                self._remove(self.lock_path)
+        except OSError:
+            return False
+        finally:
+            self._compacting.release()
+
+    def _rotate(self):
+        # Journaal atomisch hernoemen; nieuwe appends komen in een vers bestand
+        seg = self.journal_path.replace(".journal.jsonl", f".journal.{time.time_ns():020d}-{os.getpid()}.seg")
+        try: os.replace(self.journal_path, seg)
+        except FileNotFoundError: return sorted(glob.glob(self.segment_glob))
+        return sorted(glob.glob(self.segment_glob))
+
+    def _acquire_lock(self):
+        # Lockbestand over processen heen; een achtergebleven lock verloopt vanzelf
+        try:
+            if time.time() - os.path.getmtime(self.lock_path) > LOCK_STALE_SECONDS: self._remove(self.lock_path)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    @staticmethod
+    def _remove(path):
+        try: os.remove(path)
+        except OSError: pass
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+⏱️ EVA'S REACTIETIJD
+-----------------------------------------------------
+De denktijd meten waar hij gebeurt: in de browser.
+- Een onzichtbaar component (reaction_client/index.html, geen build-stap)
+  haakt in op de <audio> van de vraag en op de antwoordknoppen van de pagina.
+  Start = einde van het voorlezen (het echte 'ended'-event), stop = het
+  moment dat de knop ingedrukt wordt (pointerdown, vóór de klik zelf).
+- De klik zelf onderschept het component: keuze (positie van de knop) en
+  meting gaan samen als één componentwaarde naar de app, zodat er maar één
+  rerun is. on_change geeft de gekozen optie door aan hetzelfde antwoordpad
+  als de knop. Zonder component (AppTest, oude browser) werkt de knop zoals
+  altijd en geldt de oude serverberekening.
+- Het verschil tussen server en browser (skew) zegt hoeveel netwerk, rerun
+  en laat startende audio de beoordeling scheef trokken.
+"""
+
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+CLIENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reaction_client")
+SLACK = 1.0  # sec; een browsermeting mag nooit (veel) langer zijn dan wat de server zag
+
+_component = components.declare_component("eva_reaction", path=CLIENT_DIR)
+
+
+def state_key(qid):
+    return f"rt_{qid}"
+
+def reaction_timer(qid, audio_delay, timer_seconds, options, on_answer):
+    """
+    Onzichtbaar; één per vraag (key per qid, dus geen meting van de vorige vraag).
+    audio_delay = geschatte voorleesduur, voor als autoplay geblokkeerd is.
+    options = de knoppen in getekende volgorde; on_answer(optie) bij een klik.
+    """
+    def clicked():
+        opt = chosen_option(st.session_state.get(state_key(qid)), qid, options)
+        if opt is not None: on_answer(opt)
+
+    return _component(qid=str(qid), delay=float(audio_delay), timer=int(timer_seconds),
+                      key=state_key(qid), default=None, on_change=clicked)
+
+def chosen_option(measured, qid, options):
+    """
+    -> de aangeklikte optie uit de componentwaarde, of None (andere vraag,
+    geen of onbekende knop).
+    """
+    if not isinstance(measured, dict) or str(measured.get("q")) != str(qid):
+        return None
+    choice = measured.get("choice")
+    if isinstance(choice, bool) or not isinstance(choice, int) or not 0 <= choice < len(options):
+        return None
+    return options[choice]
+
+def choose_reaction_time(measured, qid, server_rt, elapsed_total):
+    """
+    -> (denktijd, skew). skew is None als de servermeting gebruikt is.
+    measured = componentwaarde {"q": qid, "rt": seconden, ...} of None.
+    """
+    if not isinstance(measured, dict) or str(measured.get("q")) != str(qid):
+        return server_rt, None
+    try:
+        rt = float(measured["rt"])
+    except (KeyError, TypeError, ValueError):
+        return server_rt, None
+    if not 0 <= rt <= elapsed_total + SLACK:
+        return server_rt, None
+    return rt, server_rt - rt
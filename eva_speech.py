@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+"""
+🗣️ EVA'S UITSPRAAK
+-----------------------------------------------------
+Tekst klaarmaken voor de TTS, één keer per vragenbank in plaats van per rerun.
+- Eén gecompileerd patroon met benoemde groepen: opmaaktekens weg, ; en : naar
+  een komma, afkortingen voluit, "/" wordt "of", losse A/B/C wordt "optie A",
+  dubbele spaties samen. Elke string gaat er precies één keer doorheen.
+- Afkortingen zijn een gewone dict (DEFAULT_ABBREVIATIONS), aan te vullen met
+  een JSON-bestand via EVA_SPEECH_ABBREVIATIONS.
+- Vragen worden informeel voorgelezen: "u"/"uw" wordt "je", alleen als los
+  woord (dus "nu" en "uur" blijven heel).
+- normalize_series / question_scripts werken op hele kolommen; bij het
+  compileren van vragen.csv worden er speech_question en speech_explanation
+  van gemaakt en in het Arrow-bestand opgeslagen. Dezelfde tekst geeft zo
+  altijd dezelfde audio-cachesleutel. Wijzigen de regels (fingerprint), dan
+  wordt de bank opnieuw gecompileerd.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+DEFAULT_ABBREVIATIONS = {
+    "km/u": "kilometer per uur",
+    "km/h": "kilometer per uur",
+    "bijv.": "bijvoorbeeld",
+    "bv.": "bijvoorbeeld",
+    "o.a.": "onder andere",
+    "i.p.v.": "in plaats van",
+    "d.w.z.": "dat wil zeggen",
+    "m.b.t.": "met betrekking tot",
+    "enz.": "enzovoort",
+    "etc.": "enzovoort",
+}
+INFORMAL = {"u": "je", "U": "Je", "uw": "je", "Uw": "Je"}
+MARKUP_CHARS = "*_#`"
+ABBREVIATIONS_ENV = "EVA_SPEECH_ABBREVIATIONS"
+RULES_VERSION = 1  # ophogen bij een wijziging in _replace of question_scripts
+
+# Papa's feedback: losse stukken die apart gesynthetiseerd en daarna geplakt worden
+FEEDBACK_TOO_LATE = "Te laat! Je moet sneller beslissen Eef. De tijd ging in ná de vraag."
+FEEDBACK_CORRECT = ["Kijk, dat is mijn dochter! Goed.", "Lekker bezig Eef!", "Hoppa! In the pocket.", "Zie je wel dat je het kan? 😉", "De poesjes zijn trots!", "Gas erop Eef, dit is goed!", "Keurig."]
+FEEDBACK_WRONG = ["Kom op frikandel, even dat koppie erbij!", "Hé Truus, zat je te slapen?", "Serieus Eef? Zelfs de poesjes wisten deze.", "Nee joh, dat meen je niet.", "Ai ai ai... dat gaat geld kosten.", "Je rijdt nu als een dweil, Eef. Focus!", "Niet gokken Truus, nadenken!", "Fout! Opletten jij."]
+FEEDBACK_WRONG_SUFFIX = "Het antwoord was fout."
+# Vaste stukken: één keer synthetiseren, daarna alleen nog plakken
+FEEDBACK_VOCABULARY = [FEEDBACK_TOO_LATE, FEEDBACK_WRONG_SUFFIX, *FEEDBACK_CORRECT, *FEEDBACK_WRONG]
+
+
+class SpeechNormalizer:
+    def __init__(self, abbreviations=None, informal=INFORMAL):
+        self.abbreviations = dict(DEFAULT_ABBREVIATIONS if abbreviations is None else abbreviations)
+        self.informal = dict(informal)
+        # Langste afkorting eerst, zodat "km/u" wint van een losse "/"
+        abbr = "|".join(re.escape(a) for a in sorted(self.abbreviations, key=len, reverse=True)) or "(?!)"
+        base = (rf"(?P<markup>[{re.escape(MARKUP_CHARS)}])|(?P<abbr>(?<!\w)(?:{abbr})(?!\w))"
+                r"|(?P<pause>[;:])|(?P<slash>/)|(?P<option>\b[ABC]\b)|(?P<space>\s{2,})")
+        pronoun = "|".join(sorted(self.informal, key=len, reverse=True)) or "(?!)"
+        self.pattern = re.compile(base)
+        self.informal_pattern = re.compile(rf"{base}|(?P<pronoun>\b(?:{pronoun})\b)")
+        self.fingerprint = hashlib.sha1(json.dumps([RULES_VERSION, self.informal_pattern.pattern, self.abbreviations, self.informal],
+                                                   sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _replace(self, m):
+        kind = m.lastgroup
+        if kind == "markup": return ""
+        if kind == "abbr": return self.abbreviations[m.group()]
+        if kind == "pause": return ","
+        if kind == "slash": return " of "
+        if kind == "option": return f"optie {m.group()}"
+        if kind == "space": return " "
+        return self.informal[m.group()]
+
+    def normalize(self, text, informal=False):
+        if not text: return ""
+        return (self.informal_pattern if informal else self.pattern).sub(self._replace, text).strip()
+
+    def normalize_series(self, series, informal=False):
+        pattern = self.informal_pattern if informal else self.pattern
+        return series.fillna("").str.replace(pattern, self._replace, regex=True).str.strip()
+
+    def question_scripts(self, question, opt1, opt2, opt3):
+        """
+        Voorleestekst voor een hele kolom vragen tegelijk (pandas Series in, Series uit).
+        """
+        # Eigen leesteken van de vraag eraf, anders wordt het "op.. Is het"
+        script = ("Vraag: " + self.normalize_series(question, informal=True).str.rstrip(".!? ")
+                  + ". Is het: " + self.normalize_series(opt1) + "? " + self.normalize_series(opt2) + "? "
+                  + self.normalize_series(opt3))
+        return script.str.strip()
+
+
+def load_abbreviations(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return {**DEFAULT_ABBREVIATIONS, **json.load(f)}
+
+_default = None
+
+def default_normalizer():
+    global _default
+    if _default is None:
+        path = os.environ.get(ABBREVIATIONS_ENV)
+        _default = SpeechNormalizer(load_abbreviations(path) if path else None)
+    return _default
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""
+🗣️ EVA'S STEMMEN
+-----------------------------------------------------
+Verwisselbare TTS-backends achter één interface: synthesize(text, lang, timeout) -> MP3-bytes.
+- gtts:   Google TTS via internet (de oorspronkelijke stem).
+- espeak: lokaal en offline (espeak-ng + lame of ffmpeg voor MP3).
+- silent: stille MP3 met een lengte naar het aantal woorden; geen netwerk,
+          geen binaries. Voor tests en demo's zonder geluid.
+
+TTSChain probeert de backends op volgorde:
+- elke call heeft een harde timeout, dus een trage backend kost hoogstens
+  TTS_TIMEOUT per poging in plaats van een hangende rerun;
+- elke backend heeft zijn eigen kleine threadpool: een backend die blijft
+  hangen bezet alleen zijn eigen plekken, nooit die van de terugvaller.
+  Wachten op een vrije plek valt binnen dezelfde timeout; komt er geen vrij,
+  dan telt dat als fout voor de breaker;
+- per backend een circuit breaker: na een paar fouten op rij wordt hij een
+  cooldown lang overgeslagen, daarna mag één proefcall kijken of hij terug is;
+- de cache wordt per backend geraadpleegd, dus met gTTS plat komt de
+  eerder gemaakte offline-audio meteen uit de cache.
+
+Gebruik:
+EVA_TTS_BACKENDS=gtts,espeak streamlit run eva_app.py
+EVA_TTS_BACKENDS=silent streamlit run eva_app.py     # volledig offline
+"""
+
+import io
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import eva_metrics
+
+DEFAULT_TIMEOUT = 8.0
+BREAKER_FAILURES = 3
+BREAKER_COOLDOWN = 60.0
+
+
+# --- BACKENDS ---
+
+class GTTSBackend:
+    name = "gtts"
+
+    def available(self):
+        try: from gtts import gTTS
+        except ImportError: return False
+        return True
+
+    def synthesize(self, text, lang, timeout):
+        from gtts import gTTS
+        buf = io.BytesIO()
+        gTTS(text=text, lang=lang, timeout=timeout).write_to_fp(buf)
+        return buf.getvalue()
+
+
+class EspeakBackend:
+    name = "espeak"
+
+    def __init__(self, speed=165, bitrate=48):
+        self.speed, self.bitrate = speed, bitrate
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+        self.lame = shutil.which("lame")
+        self.ffmpeg = None if self.lame else shutil.which("ffmpeg")
+
+    def available(self):
+        return bool(self.binary and (self.lame or self.ffmpeg))
+
+    def synthesize(self, text, lang, timeout):
+        deadline = time.monotonic() + timeout
+        wav = subprocess.run([self.binary, "-v", lang, "-s", str(self.speed), "--stdout", "--stdin"],
+                             input=text.encode("utf-8"), capture_output=True, timeout=timeout, check=True).stdout
+        if self.lame:
+            cmd = [self.lame, "--quiet", "-b", str(self.bitrate), "-", "-"]
+        else:
+            cmd = [self.ffmpeg, "-loglevel", "error", "-f", "wav", "-i", "pipe:0", "-f", "mp3", "-b:a", f"{self.bitrate}k", "pipe:1"]
+        remaining = max(0.1, deadline - time.monotonic())
+        return subprocess.run(cmd, input=wav, capture_output=True, timeout=remaining, check=True).stdout
+
+
+class SilentBackend:
+    name = "silent"
+    # MPEG2 layer III, 32 kbps, 24 kHz: 96 bytes en 24 ms per frame
+    FRAME = bytes([0xFF, 0xF3, 0x44, 0xC4]) + b"\x00" * 92
+    FRAMES_PER_WORD = 17  # ±0,4 s per woord, net als de schatting voor de timer
+
+    def available(self):
+        return True
+
+    def synthesize(self, text, lang, timeout):
+        return self.FRAME * (self.FRAMES_PER_WORD * max(1, len(text.split())))
+
+
+BACKENDS = {"gtts": GTTSBackend, "espeak": EspeakBackend, "silent": SilentBackend}
+
+
+# --- CIRCUIT BREAKER ---
+
+class CircuitBreaker:
+    """
+    closed: alles mag. open: overslaan tot de cooldown voorbij is.
+    half-open: één proefcall; gelukt = weer closed, mislukt = weer open.
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failures, self.cooldown = failures, cooldown
+        self._lock = threading.Lock()
+        self._errors = 0
+        self._open_until = 0.0
+        self._trial = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._errors < self.failures: return "closed"
+            return "open" if time.monotonic() < self._open_until or self._trial else "half-open"
+
+    def allow(self):
+        with self._lock:
+            if self._errors < self.failures: return True
+            if time.monotonic() < self._open_until or self._trial: return False
+            self._trial = True
+            return True
+
+    def record(self, ok):
+        with self._lock:
+            self._trial = False
+            if ok:
+                self._errors = 0
+                return False
+            self._errors += 1
+            if self._errors >= self.failures:
+                self._open_until = time.monotonic() + self.cooldown
+                return True
+            return False
+
+
+# --- KETEN ---
+
+class TTSChain:
+    def __init__(self, backends, timeout=DEFAULT_TIMEOUT, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN, workers=4):
+        self.backends = [b for b in backends if b.available()]
+        self.timeout = timeout
+        self.breakers = {b.name: CircuitBreaker(failures, cooldown) for b in self.backends}
+        # Calls draaien hier, zodat een hangende backend de aanroeper niet meeneemt.
+        # Per backend een pool + evenveel plekken: er wacht nooit iets in een wachtrij
+        self._pools = {b.name: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"eva-tts-{b.name}")
+                       for b in self.backends}
+        self._slots = {b.name: threading.BoundedSemaphore(workers) for b in self.backends}
+
+    @classmethod
+    def from_names(cls, names, **kwargs):
+        return cls([BACKENDS[n.strip()]() for n in names if n.strip() in BACKENDS], **kwargs)
+
+    @property
+    def available(self):
+        return bool(self.backends)
+
+    @property
+    def primary(self):
+        # Naam van de voorkeursstem; ook de naamruimte voor de audiocache
+        return self.backends[0].name if self.backends else None
+
+    def _call(self, backend, text, lang):
+        deadline = time.monotonic() + self.timeout
+        slot = self._slots[backend.name]
+        if not slot.acquire(timeout=self.timeout):
+            return None, "Saturated"  # alle threads hangen nog in eerdere calls
+        fut = self._pools[backend.name].submit(backend.synthesize, text, lang, self.timeout)
+        fut.add_done_callback(lambda _: slot.release())
+        try:
+            return fut.result(timeout=max(0.0, deadline - time.monotonic())) or None, None
+        except FutureTimeout:
+            fut.cancel()
+            return None, "Timeout"
+        except Exception as e:
+            return None, type(e).__name__
+
+    def synthesize(self, text, lang, cached=None):
+        """
+        -> (mp3-bytes, backendnaam) of (None, None).
+        cached(naam) mag audio van die backend uit de cache teruggeven; de
+        eerste backend is dan al door de aanroeper geprobeerd.
+        """
+        for i, backend in enumerate(self.backends):
+            if i > 0 and cached is not None:
+                data = cached(backend.name)
+                if data: return data, backend.name
+            breaker = self.breakers[backend.name]
+            if not breaker.allow():
+                eva_metrics.count("eva_tts_skipped_total", backend=backend.name)
+                continue
+            with eva_metrics.span(f"tts_{backend.name}"):
+                data, error = self._call(backend, text, lang)
+            opened = breaker.record(data is not None)
+            if data is not None: return data, backend.name
+            eva_metrics.count("eva_tts_failures_total", backend=backend.name, error=error or "Empty")
+            if opened: eva_metrics.count("eva_tts_circuit_open_total", backend=backend.name)
+        return None, None
+
+    def stats(self):
+        return {name: breaker.state for name, breaker in self.breakers.items()}
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# De eva_*-modules staan naast de app, niet in een pakket
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
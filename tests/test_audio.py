@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+import os
+import types
+
+import pytest
+
+import eva_audio
+from eva_audio import AudioPublisher, AudioStore, MixedSampleRates, concat_mp3, iter_mp3_frames, mp3_duration
+from eva_tts import SilentBackend
+
+
+def clip(words):
+    return SilentBackend().synthesize(" ".join(["woord"] * words), "nl", 1)
+
+
+# MPEG1 layer III, 128 kbps, 44,1 kHz: 417 bytes en 1152 samples per frame
+MPEG1_FRAME = bytes([0xFF, 0xFB, 0x90, 0x00]) + b"\x00" * 413
+
+
+def id3v2(payload):
+    size = len(payload)
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b"ID3\x04\x00\x00" + syncsafe + payload
+
+
+def leftovers(root):
+    return [name for _, _, files in os.walk(root) for name in files if name.endswith(".tmp")]
+
+
+def test_put_writes_audio_and_duration_atomically(tmp_path):
+    store = AudioStore(str(tmp_path), 1 << 20)
+    data = clip(3)
+    store.put("ab" * 32, data)
+    assert store.get("ab" * 32) == data
+    assert abs(store.duration("ab" * 32) - 3 * 17 * 0.024) < 0.001
+    assert os.path.exists(store.duration_path("ab" * 32))
+    assert leftovers(tmp_path) == []
+
+
+def test_failed_write_leaves_no_partial_file(tmp_path, monkeypatch):
+    store = AudioStore(str(tmp_path), 1 << 20)
+
+    def broken_replace(src, dst):
+        raise OSError("schijf vol")
+
+    monkeypatch.setattr(eva_audio.os, "replace", broken_replace)
+    store.put("cd" * 32, clip(2))
+    monkeypatch.undo()
+    assert "cd" * 32 not in store
+    assert store.stats()["entries"] == 0
+    assert leftovers(tmp_path) == []
+
+
+def test_eviction_drops_least_recently_used_with_duration(tmp_path):
+    size = len(clip(1))
+    store = AudioStore(str(tmp_path), 3 * size)
+    keys = [c * 64 for c in "abcd"]
+    for key in keys[:3]: store.put(key, clip(1))
+    store.get(keys[0])  # a is weer recent, b is nu de oudste
+    store.put(keys[3], clip(1))
+    assert keys[1] not in store
+    assert not os.path.exists(store.duration_path(keys[1]))
+    assert all(key in store for key in (keys[0], keys[2], keys[3]))
+    assert store.stats()["bytes"] == 3 * size
+
+
+def test_restart_orders_existing_files_by_mtime(tmp_path):
+    size = len(clip(1))
+    store = AudioStore(str(tmp_path), 3 * size)
+    keys = [c * 64 for c in "abc"]
+    for key in keys: store.put(key, clip(1))
+    # Op schijf is c het langst niet gebruikt, a het meest recent
+    for age, key in zip((10, 20, 30), keys): os.utime(store.path_for(key), (1000 - age, 1000 - age))
+
+    reopened = AudioStore(str(tmp_path), 3 * size)
+    reopened.put("d" * 64, clip(1))
+    assert keys[2] not in reopened
+    assert keys[0] in reopened and keys[1] in reopened
+
+
+def test_delete_removes_duration_file(tmp_path):
+    store = AudioStore(str(tmp_path), 1 << 20)
+    store.put("ef" * 32, clip(1))
+    store.delete("ef" * 32)
+    assert "ef" * 32 not in store
+    assert not os.path.exists(store.duration_path("ef" * 32))
+    assert store.stats() == {"entries": 0, "bytes": 0, "max_bytes": 1 << 20}
+
+
+def test_publisher_does_not_evict_urls_a_page_may_still_load(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(eva_audio, "time", types.SimpleNamespace(time=lambda: now[0]))
+    store = AudioStore(str(tmp_path), 1, min_age=60)  # altijd te vol: alleen de leeftijd beslist
+    publisher = AudioPublisher(store, "app/static/audio")
+    digest = lambda url: url.rsplit("/", 1)[1][:-4]
+    a = publisher.url_for("a", lambda: clip(1))
+    b = publisher.url_for("b", lambda: clip(2))
+    assert digest(a) in store and digest(b) in store  # allebei net uitgedeeld
+    now[0] += 30
+    assert publisher.url_for("a", lambda: pytest.fail("a staat er nog")) == a  # opnieuw uitgedeeld
+    now[0] += 45
+    c = publisher.url_for("c", lambda: clip(3))
+    assert digest(b) not in store  # 75 s niet gebruikt
+    assert digest(a) in store and digest(c) in store
+
+
+def test_silent_backend_frames_are_parsed():
+    data = clip(2)
+    frames = list(iter_mp3_frames(data))
+    assert len(frames) == 2 * SilentBackend.FRAMES_PER_WORD
+    assert all(length == 96 and samples == 576 and rate == 24000 for _, length, samples, rate in frames)
+    assert mp3_duration(data) == pytest.approx(len(frames) * 0.024)
+
+
+def test_id3v2_tag_is_skipped():
+    # Het label bevat zelf een sync-patroon; dat mag niet als frame meetellen
+    data = id3v2(b"\xff\xfb\x90\x00" + b"x" * 60) + clip(1)
+    frames = list(iter_mp3_frames(data))
+    assert len(frames) == SilentBackend.FRAMES_PER_WORD
+    assert frames[0][0] == 10 + 64
+    assert mp3_duration(data) == pytest.approx(mp3_duration(clip(1)))
+
+
+def test_truncated_trailing_frame_is_ignored():
+    data = clip(1) + SilentBackend.FRAME[:50]
+    assert len(list(iter_mp3_frames(data))) == SilentBackend.FRAMES_PER_WORD
+    assert concat_mp3([data]) == clip(1)
+
+
+def test_mpeg1_frames_and_junk_between_frames():
+    data = MPEG1_FRAME + b"rommel" + MPEG1_FRAME
+    frames = list(iter_mp3_frames(data))
+    assert [(off, length, samples, rate) for off, length, samples, rate in frames] == [(0, 417, 1152, 44100), (423, 417, 1152, 44100)]
+    assert mp3_duration(data) == pytest.approx(2 * 1152 / 44100)
+
+
+def test_concat_joins_frames_of_one_sample_rate():
+    assert concat_mp3([clip(1), b"", None, id3v2(b"tag") + clip(2)]) == clip(3)
+
+
+def test_concat_rejects_mixed_sample_rates():
+    with pytest.raises(MixedSampleRates):
+        concat_mp3([clip(1), MPEG1_FRAME])
+
+
+def test_bundle_clip_falls_back_to_one_voice(tmp_path):
+    from eva_bundle import clip_audio
+    from eva_tts import TTSChain
+
+    class Picky:
+        # Andere samplerate dan SilentBackend, en faalt op sommige zinnen
+        name = "picky"
+
+        def available(self):
+            return True
+
+        def synthesize(self, text, lang, timeout):
+            if "twee" in text.lower(): raise RuntimeError("kan dit niet")
+            return MPEG1_FRAME * len(text.split())
+
+    tts = TTSChain([Picky(), SilentBackend()], timeout=1, failures=99)
+    data = clip_audio(AudioStore(str(tmp_path), 1 << 20), tts, "Zin een. Zin twee.")
+    assert {rate for _, _, _, rate in iter_mp3_frames(data)} == {24000}
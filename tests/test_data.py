@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import eva_data
+from eva_data import (BankWatcher, ExamPool, QuestionBank, EXAM_QUOTAS, EXAM_SIZE, SPEECH_FIELDS,
+                      load_compiled_table)
+from eva_speech import SpeechNormalizer
+
+HEADER = "id;category;timer;question;image_desc;opt1;opt2;opt3;answer;explanation;speech\n"
+
+
+def write_bank(path, rows):
+    path.write_text(HEADER + "".join(";".join(map(str, r)) + "\n" for r in rows), encoding="utf-8")
+
+
+def test_speech_fields_are_compiled_into_arrow_file(tmp_path):
+    csv, cache = tmp_path / "vragen.csv", tmp_path / "vragen.arrow"
+    write_bank(csv, [(1, "Kennis", 10, "Hoe hard mag u hier?", "", "50 km/u", "80 km/u", "", "50 km/u", "Bebouwde kom.", "")])
+    table = load_compiled_table(str(csv), str(cache))
+    assert set(SPEECH_FIELDS) <= set(table.column_names)
+    assert "kilometer per uur" in table.column("speech_question")[0].as_py()
+
+    bank = QuestionBank(table)
+    q = bank.get(1)
+    assert q.timer == 10 and q.id == "1"
+    assert q.speech_question.startswith("Vraag: Hoe hard mag je hier")
+    assert not hasattr(bank, "df")
+
+
+def test_changed_speech_rules_recompile(tmp_path):
+    csv, cache = tmp_path / "vragen.csv", tmp_path / "vragen.arrow"
+    write_bank(csv, [(1, "Kennis", 10, "Wat betekent bv. dit bord?", "", "Ja", "Nee", "", "Ja", "", "")])
+    load_compiled_table(str(csv), str(cache))
+    other = SpeechNormalizer({"bv.": "bij voorbeeld"})
+    table = load_compiled_table(str(csv), str(cache), other)
+    assert "bij voorbeeld" in table.column("speech_question")[0].as_py()
+
+
+def test_dataframe_and_table_give_same_bank(tmp_path):
+    csv, cache = tmp_path / "vragen.csv", tmp_path / "vragen.arrow"
+    write_bank(csv, [(1, "Kennis", "", "Vraag een", "", "A", "B", "", "A", "", ""),
+                     (1, "Kennis", 12, "Dubbel", "", "A", "B", "", "A", "", ""),
+                     (2, "Inzicht", 8, "Vraag twee", "", "A", "B", "C", "C", "Uitleg", "")])
+    from_frame = QuestionBank(pd.read_csv(csv, sep=";", dtype=str))
+    from_table = QuestionBank(load_compiled_table(str(csv), str(cache)))
+    assert list(from_frame.by_id) == list(from_table.by_id) == ["1", "2"]
+    for qid in from_frame.by_id:
+        a, b = from_frame.get(qid), from_table.get(qid)
+        assert a.as_tuple() == b.as_tuple()
+        assert (a.speech_question, a.speech_explanation) == (b.speech_question, b.speech_explanation)
+    assert from_table.get(1).question == "Vraag een" and from_table.get(1).timer == 15
+
+
+def test_reload_reuses_unchanged_questions(tmp_path, monkeypatch):
+    csv, cache = tmp_path / "vragen.csv", tmp_path / "vragen.arrow"
+    rows = [(i, "Kennis", 10, f"Vraag {i}", "", "A", "B", "", "A", "", "") for i in range(1, 6)]
+    write_bank(csv, rows)
+    watcher = BankWatcher(str(csv), str(cache), interval=3600)
+    before = watcher.bank
+
+    normalized = []
+    real = eva_data.speech_columns
+    monkeypatch.setattr(eva_data, "speech_columns", lambda text, normalizer=None: normalized.append(len(text["question"])) or real(text, normalizer))
+    rows[1] = (2, "Kennis", 10, "Vraag twee, nu anders", "", "A", "B", "", "A", "", "")
+    write_bank(csv, rows[:4] + [(9, "Inzicht", 8, "Nieuw", "", "A", "B", "", "B", "", "")])
+    diff = watcher.reload()
+
+    assert (diff.added, diff.removed, diff.changed) == ({"9"}, {"5"}, {"2"})
+    assert normalized == [2]  # alleen de gewijzigde en de nieuwe vraag
+    assert all(watcher.bank.get(q) is before.get(q) for q in ("1", "3", "4"))
+    assert watcher.bank.get(2).speech_question.startswith("Vraag: Vraag twee, nu anders")
+    # De cache is bijgewerkt: een koude start ziet de nieuwe bank mét voorleesteksten
+    table = load_compiled_table(str(csv), str(cache))
+    assert QuestionBank(table).get(2).speech_question == watcher.bank.get(2).speech_question
+
+
+def test_history_is_bounded_and_old_versions_resync(tmp_path, monkeypatch):
+    monkeypatch.setattr(eva_data, "HISTORY_VERSIONS", 3)
+    csv, cache = tmp_path / "vragen.csv", tmp_path / "vragen.arrow"
+    write_bank(csv, [(1, "Kennis", 10, "Vraag", "", "A", "B", "", "A", "", "")])
+    watcher = BankWatcher(str(csv), str(cache), interval=3600)
+    for v in range(2, 8):
+        write_bank(csv, [(v, "Kennis", 10, "Vraag", "", "A", "B", "", "A", "", "")])
+        watcher.reload()
+    assert watcher.version == 6 and len(watcher._history) == 3
+    assert watcher.removed_since(5) == {"6"}
+    assert watcher.removed_since(3) == {"4", "5", "6"}
+    assert watcher.removed_since(2) is None
+
+
+def make_bank(per_category):
+    rows = []
+    for cat, n in per_category.items():
+        rows += [{"id": f"{cat[0]}{i}", "category": cat, "question": f"{cat} {i}", "opt1": "A", "opt2": "B", "answer": "A"}
+                 for i in range(n)]
+    return QuestionBank(pd.DataFrame(rows))
+
+
+def test_two_sessions_drawing_at_once_get_different_exams():
+    bank = make_bank({"Gevaarherkenning": 20, "Kennis": 10, "Inzicht": 20})
+    pool = ExamPool(bank, EXAM_QUOTAS, EXAM_SIZE, target=2, low_water=-1, seed=1)
+    # Precies twee examens op voorraad, zonder gemeenschappelijke vragen
+    first = np.r_[0:10, 20:25, 30:40]
+    second = np.r_[10:20, 25:30, 40:50]
+    pool._pool.extend([first, second])
+    start = threading.Barrier(2)
+    results = [None, None]
+
+    def session(i):
+        start.wait()
+        results[i] = pool.draw(candidates=1)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(2)]
+    for t in threads: t.start()
+    for t in threads: t.join(5)
+    assert all(len(exam) == EXAM_SIZE == len(set(exam)) for exam in results)
+    assert not set(results[0]) & set(results[1])
+    assert sorted(map(sorted, results)) == sorted(sorted(bank.ids[i] for i in exam) for exam in (first, second))
+
+
+def test_concurrent_draws_from_a_small_pool_are_valid():
+    pool = ExamPool(make_bank({"Gevaarherkenning": 40, "Kennis": 20, "Inzicht": 40}), EXAM_QUOTAS, EXAM_SIZE,
+                    target=4, low_water=1, seed=1)
+    start = threading.Barrier(8)
+    results = []
+
+    def session():
+        start.wait()
+        for _ in range(50): results.append(pool.draw())
+
+    threads = [threading.Thread(target=session) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join(30)
+    assert len(results) == 400
+    assert all(len(exam) == EXAM_SIZE == len(set(exam)) for exam in results)
+
+
+def test_draw_avoids_recent_questions_when_possible():
+    bank = make_bank({"Gevaarherkenning": 30, "Kennis": 6, "Inzicht": 30})
+    pool = ExamPool(bank, EXAM_QUOTAS, EXAM_SIZE, seed=2)
+    recent = pool.draw()
+    exam = pool.draw(recent=recent)
+    assert len(exam) == EXAM_SIZE == len(set(exam))
+    overlap = set(exam) & set(recent)
+    # Gevaarherkenning en Inzicht hebben genoeg andere vragen; Kennis (6 voor 5 plekken) niet
+    assert all(bank.get(q).category == "Kennis" for q in overlap)
+    counts = {cat: sum(bank.get(q).category == cat for q in exam) for cat in EXAM_QUOTAS}
+    assert counts == EXAM_QUOTAS
+
+
+def test_ids_keep_their_original_text(tmp_path):
+    csv, cache = tmp_path / "vragen.csv", tmp_path / "vragen.arrow"
+    write_bank(csv, [("007", "Kennis", 10, "Vraag", "", "A", "B", "", "A", "", ""),
+                     ("7", "Kennis", 10, "Andere vraag", "", "A", "B", "", "A", "", "")])
+    table = load_compiled_table(str(csv), str(cache))
+    assert table.column("id").to_pylist() == ["007", "7"]
+    bank = QuestionBank(table)
+    assert bank.ids == ("007", "7")
+    assert bank.get("007").question == "Vraag"
+
+
+def test_cache_with_numeric_ids_is_recompiled(tmp_path):
+    csv, cache = tmp_path / "vragen.csv", tmp_path / "vragen.arrow"
+    write_bank(csv, [("007", "Kennis", 10, "Vraag", "", "A", "B", "", "A", "", "")])
+    load_compiled_table(str(csv), str(cache))
+    table = eva_data._open_compiled(str(cache))
+    # Cache van vóór CACHE_FORMAT 2: id als int64
+    old = table.set_column(0, "id", pa.array([7], type=pa.int64()))
+    meta = {k: v for k, v in table.schema.metadata.items() if k != b"format"}
+    eva_data.write_compiled(old, str(cache), meta)
+    assert load_compiled_table(str(csv), str(cache)).column("id").to_pylist() == ["007"]
+
+
+def test_reload_waits_until_the_file_stands_still(tmp_path):
+    csv, cache = tmp_path / "vragen.csv", tmp_path / "vragen.arrow"
+    rows = [(i, "Kennis", 10, f"Vraag {i}", "", "A", "B", "", "A", "", "") for i in range(1, 4)]
+    write_bank(csv, rows)
+    watcher = BankWatcher(str(csv), str(cache), interval=3600)
+    # Half opgeslagen: parst prima, maar vraag 3 ontbreekt nog
+    write_bank(csv, rows[:2])
+    assert watcher.check() is None and len(watcher.bank) == 3
+    write_bank(csv, rows + [(4, "Kennis", 10, "Vraag 4", "", "A", "B", "", "A", "", "")])
+    assert watcher.check() is None and len(watcher.bank) == 3  # nog steeds in beweging
+    diff = watcher.check()
+    assert (diff.added, diff.removed) == ({"4"}, set())
+    assert watcher.check() is None and watcher.version == 1
+
+
+def test_failed_reload_is_logged_and_counted(tmp_path, monkeypatch, caplog):
+    import eva_metrics
+    csv, cache = tmp_path / "vragen.csv", tmp_path / "vragen.arrow"
+    write_bank(csv, [(1, "Kennis", 10, "Vraag", "", "A", "B", "", "A", "", "")])
+    watcher = BankWatcher(str(csv), str(cache), interval=3600)
+    monkeypatch.setattr(eva_metrics, "ENABLED", True)
+    monkeypatch.setattr(eva_metrics, "REGISTRY", eva_metrics.Registry())
+
+    def broken(df):
+        raise ValueError("kapotte kolom")
+
+    monkeypatch.setattr(eva_data, "compile_raw_table", broken)
+    assert watcher.reload() is None
+    assert watcher.bank.get(1) is not None
+    assert "niet geladen" in caplog.text and "kapotte kolom" in caplog.text
+    assert eva_metrics.REGISTRY._counters == {("eva_bank_reload_failures_total", (("error", "ValueError"),)): 1}
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from eva_import import import_banks
+
+HEADER = "id;category;timer;question;image_desc;opt1;opt2;opt3;answer;explanation;speech\n"
+
+
+def test_errors_report_physical_line_numbers(tmp_path):
+    src = tmp_path / "bron.csv"
+    src.write_text(HEADER
+                   + "1;Kennis;10;Vraag een;;A;B;;A;;\n"                          # regel 2
+                   + "2;Kennis;10;Kapot;;A;B;;A;;;;te;veel\n"                     # regel 3: te veel velden
+                   + "\n"                                                         # regel 4: leeg
+                   + '3;Kennis;10;"Vraag met\nenter";;A;B;;A;;\n'                 # regel 5-6
+                   + "4;Kennis;10;Vraag vier;;A;B;;C;;\n",                        # regel 7: antwoord fout
+                   encoding="utf-8")
+    report = import_banks([str(src)], chunksize=2)
+    assert [(e.row, e.field) for e in report.errors] == [(3, "regel"), (7, "answer")]
+    assert report.rows == 4 and report.imported == 2
+    assert "regel 7 (id 4)" in str(report.errors[1])
+
+
+def test_duplicate_errors_point_at_the_later_line(tmp_path):
+    src = tmp_path / "bron.csv"
+    src.write_text(HEADER
+                   + "1;Kennis;10;Vraag;;A;B;;A;;\n"
+                   + "1;Kennis;10;Andere vraag;;A;B;;A;;;;\n"
+                   + "1;Kennis;10;Nog een andere;;A;B;;A;;\n",
+                   encoding="utf-8")
+    report = import_banks([str(src)], chunksize=10)
+    assert [(e.row, e.field) for e in report.errors] == [(3, "regel"), (4, "id")]
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+from eva_progress import (DAY, GRADUATE_STREAK, MIN_EASE, START_EASE, ProgressJournal, ReviewSchedule,
+                          apply_event, default_progress, hardest_questions, normalize_progress)
+
+WORKERS = 4
+ANSWERS = 400
+
+
+def _answer_loop(path, worker):
+    # Klein compactiedrempel: er wordt voortdurend weggedraaid terwijl anderen schrijven
+    journal = ProgressJournal(path, compact_bytes=2048)
+    for i in range(ANSWERS):
+        journal.append({"type": "answer", "qid": f"{worker}-{i}", "cat": "Gevaarherkenning", "correct": True, "ts": i})
+        if i % 10 == 0: journal.compact()
+
+
+def test_no_answers_lost_during_compaction(tmp_path):
+    path = str(tmp_path / "progress.json")
+    ctx = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+    procs = [ctx.Process(target=_answer_loop, args=(path, w)) for w in range(WORKERS)]
+    for p in procs: p.start()
+    for p in procs: p.join(60)
+    assert all(p.exitcode == 0 for p in procs)
+
+    journal = ProgressJournal(path)
+    data = journal.load()
+    assert data["stats"]["answers"] == WORKERS * ANSWERS
+    assert len(data["srs"]) == WORKERS * ANSWERS
+
+    # En na een laatste compactie staat alles in de snapshot, niets dubbel
+    journal._remove(journal.lock_path)
+    assert journal.compact()
+    assert ProgressJournal(path).load()["stats"]["answers"] == WORKERS * ANSWERS
+
+
+def test_append_after_compaction_lands_in_new_journal(tmp_path):
+    journal = ProgressJournal(str(tmp_path / "progress.json"), compact_bytes=1 << 20)
+    journal.append({"type": "answer", "qid": "1", "correct": True, "ts": 0})
+    assert journal.compact()
+    journal.append({"type": "answer", "qid": "2", "correct": False, "ts": 0})
+    data = journal.load()
+    assert data["total_score"] == 1
+    assert data["stats"]["answers"] == 2
+
+
+def test_compaction_waits_for_append_in_progress(tmp_path, monkeypatch):
+    # Append opent het journaal en blijft even hangen vóór het schrijven; een
+    # compactie in die tijd mag het bestand niet onder de append vandaan halen.
+    journal = ProgressJournal(str(tmp_path / "progress.json"), compact_bytes=1 << 20)
+    journal.append({"type": "answer", "qid": "0", "correct": True, "ts": 0})
+    real_open, opened = os.open, threading.Event()
+
+    def slow_open(path, *args, **kwargs):
+        fd = real_open(path, *args, **kwargs)
+        if path == journal.journal_path and threading.current_thread().name == "append":
+            opened.set()
+            time.sleep(0.2)
+        return fd
+
+    monkeypatch.setattr(os, "open", slow_open)
+    writer = threading.Thread(name="append", target=journal.append,
+                              args=({"type": "answer", "qid": "1", "correct": True, "ts": 0},))
+    writer.start()
+    assert opened.wait(5)
+    assert journal.compact()
+    writer.join()
+    assert journal.load()["stats"]["answers"] == 2
+
+
+def test_review_intervals_and_ease():
+    srs = ReviewSchedule()
+    srs.review(7, True, 0)
+    assert srs["7"] == [1, START_EASE, DAY, 1, 0]
+    srs.review("7", True, 0)
+    assert srs["7"][:2] == [6, START_EASE]
+    srs.review("7", True, 0)
+    assert srs["7"][0] == 15  # 6 * 2,5
+    srs.review("7", False, 100)
+    assert srs["7"] == [0, START_EASE - 0.2, 100, 0, 1]
+    for _ in range(20): srs.review("7", False, 100)
+    assert srs["7"][1] == MIN_EASE
+
+
+def test_due_in_order_of_due_time_with_limit():
+    srs = ReviewSchedule()
+    srs.review("a", True, 0)       # over 1 dag
+    srs.review("b", False, 50)     # meteen
+    srs.review("c", False, 10)     # meteen, eerder
+    assert srs.due(100) == ["c", "b"]
+    assert srs.due(DAY + 1) == ["c", "b", "a"]
+    assert srs.due(DAY + 1, limit=1) == ["c"]
+    assert srs.due(DAY + 1) == ["c", "b", "a"]  # uitlezen haalt niets weg
+
+
+def test_due_mistakes_until_graduated():
+    srs = ReviewSchedule()
+    srs.review("x", False, 0)
+    srs.review("y", True, 0)
+    assert srs.due_mistakes(0) == ["x"] and srs.mistakes() == ["x"]
+    now = 0
+    for _ in range(GRADUATE_STREAK - 1):
+        srs.review("x", True, now)
+        assert srs.due_mistakes(now) == []  # goed beantwoord: pas weer na het interval
+        now = srs["x"][2]
+        assert srs.due_mistakes(now) == ["x"]
+    srs.review("x", True, now)
+    assert not srs.is_mistake("x")
+    assert srs.due_mistakes(10 ** 12) == []
+
+
+def test_stale_heap_entries_are_skipped_lazily():
+    srs = ReviewSchedule()
+    srs.review("q", False, 0)
+    srs.review("q", False, 5)
+    srs.review("q", False, 9)
+    assert len(srs._heap) == 3
+    assert srs.due(10) == ["q"]  # alleen het actuele item, één keer
+    srs.review("q", True, 10)
+    assert srs.due(10) == [] and srs.due_mistakes(10) == []
+    assert srs.due(10 + DAY) == ["q"]
+    for i in range(200): srs.review("q", False, i)
+    assert len(srs._heap) <= 2 * len(srs) + 64  # heap wordt af en toe herbouwd
+
+
+def test_schedule_roundtrips_through_json():
+    srs = ReviewSchedule()
+    srs.review("1", False, 0)
+    srs.review("2", True, 0)
+    again = ReviewSchedule(json.loads(json.dumps(srs)))
+    assert again == srs and again.due_mistakes(0) == ["1"]
+
+
+def test_legacy_mistakes_list_is_migrated():
+    data = normalize_progress({"total_score": 3, "mistakes_list": ["5", 9, "5"], "exams_history": []})
+    assert "mistakes_list" not in data
+    assert isinstance(data["srs"], ReviewSchedule)
+    assert sorted(data["srs"].due_mistakes(0)) == ["5", "9"]
+    assert data["srs"]["5"][4] == 1  # dubbel in de oude lijst telt niet dubbel
+
+
+def test_hardest_questions_skips_questions_no_longer_in_the_bank():
+    data = default_progress()
+    for qid in ("1", "2", "3"):
+        for correct in (False, False, qid == "3"):
+            apply_event(data, {"type": "answer", "qid": qid, "cat": "Kennis", "correct": correct, "ts": 0})
+    assert [qid for qid, _ in hardest_questions(data["stats"], n=2)] == ["1", "2"]
+    assert [qid for qid, _ in hardest_questions(data["stats"], n=2, valid={"2", "3"}.__contains__)] == ["2", "3"]
+
+
+def test_exam_answers_count_per_question_and_category():
+    data = default_progress()
+    event = {"type": "exam", "date": "01-01", "score": "1/2", "passed": False, "ids": ["1", "2"], "ts": 0,
+             "answers": [{"qid": "1", "cat": "Kennis", "correct": True, "late": False, "rt": 2.0},
+                         {"qid": "2", "cat": "Inzicht", "correct": False, "late": True, "rt": 9.0}]}
+    apply_event(data, event)
+    stats = data["stats"]
+    assert (stats["exams"], stats["exam_points"], stats["answers"], stats["correct"], stats["late"]) == (1, 1, 2, 1, 1)
+    assert stats["questions"]["1"][:2] == [1, 1] and stats["questions"]["2"][:3] == [1, 0, 1]
+    assert stats["categories"]["Kennis"]["correct"] == 1 and stats["categories"]["Inzicht"]["answers"] == 1
+    assert data["srs"].due_mistakes(now=DAY) == ["2"]
+    assert data["total_score"] == 0  # de oefenscore blijft van de oefenmodus
+    # Oude examenevents zonder antwoorden tellen alleen het examen
+    apply_event(data, {"type": "exam", "date": "01-01", "score": "30/35", "passed": True, "ts": 0})
+    assert (stats["exams"], stats["answers"]) == (2, 2)
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+
+from eva_reaction import choose_reaction_time, chosen_option
+
+
+def test_chosen_option_maps_button_position_to_option():
+    options = ["Ja", "Nee", "Weet niet"]
+    assert chosen_option({"q": "7", "rt": 1.2, "choice": 1}, 7, options) == "Nee"
+    assert chosen_option({"q": "8", "rt": 1.2, "choice": 1}, 7, options) is None  # vorige vraag
+    for choice in (None, -1, 3, True, "1"):
+        assert chosen_option({"q": "7", "rt": 1.2, "choice": choice}, "7", options) is None
+    assert chosen_option(None, "7", options) is None
+
+
+def test_browser_time_only_when_plausible():
+    assert choose_reaction_time({"q": "7", "rt": 2.0}, "7", 3.5, 6.0) == (2.0, 1.5)
+    assert choose_reaction_time({"q": "7", "rt": 9.0}, "7", 3.5, 6.0) == (3.5, None)  # langer dan de server zag
+    assert choose_reaction_time({"q": "7"}, "7", 3.5, 6.0) == (3.5, None)
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from eva_tts import SilentBackend, TTSChain
+
+
+class HangingBackend:
+    name = "hangt"
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def available(self):
+        return True
+
+    def synthesize(self, text, lang, timeout):
+        self.release.wait()  # negeert de timeout, zoals een vastgelopen socket
+        return None
+
+
+def test_fallback_answers_within_deadline_when_primary_hangs():
+    hanging = HangingBackend()
+    chain = TTSChain([hanging, SilentBackend()], timeout=0.2, failures=3, cooldown=60, workers=2)
+    try:
+        def speak(i):
+            start = time.monotonic()
+            data, name = chain.synthesize(f"vraag {i}", "nl")
+            return data, name, time.monotonic() - start
+
+        # Meer gelijktijdige vragen dan de hangende backend threads heeft
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(speak, range(12)))
+        for data, name, took in results:
+            assert name == "silent" and data
+            assert took < chain.timeout + 0.5
+        # Volle pool telt als fout: de breaker staat open en de hangende backend wordt overgeslagen
+        assert chain.stats()["hangt"] == "open"
+        start = time.monotonic()
+        assert chain.synthesize("nog een", "nl")[1] == "silent"
+        assert time.monotonic() - start < 0.1
+    finally:
+        hanging.release.set()